@@ -1 +1,5 @@
+from . import lazy
+
 __version__ = "1.0.8"
+
+lazy.install()
@@ -8,7 +8,7 @@ from troposphere import elasticloadbalancing as elb
 from troposphere.autoscaling import Tag as ASTag
 from troposphere.route53 import RecordSetType
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import TroposphereType
 from stacker.blueprints.variables.types import (
     CFNCommaDelimitedList,
@@ -1,6 +1,6 @@
 import logging
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 
 from stacker.blueprints.variables.types import TroposphereType
 
@@ -29,6 +29,7 @@ from .policies import (
     lambda_basic_execution_statements,
     lambda_vpc_execution_statements,
 )
+from .policy_optimizer import optimize_policy
 
 
 logger = logging.getLogger(name=__name__)
@@ -192,6 +193,9 @@ class Function(Blueprint):
         },
     }
 
+    # Opt-in: collapse complete action lists of the policy to wildcards.
+    POLICY_WILDCARDS = False
+
     def code(self):
         return self.get_variables()["Code"]
 
@@ -266,8 +270,10 @@ class Function(Blueprint):
             iam.PolicyType(
                 "Policy",
                 PolicyName=Sub("${AWS::StackName}-policy"),
-                PolicyDocument=Policy(
-                    Statement=self.generate_policy_statements()
+                PolicyDocument=optimize_policy(
+                    Policy(Statement=self.generate_policy_statements()),
+                    "%s Policy" % self.name,
+                    self.POLICY_WILDCARDS,
                 ),
                 Roles=[self.role.Ref()],
             )
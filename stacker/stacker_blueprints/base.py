@@ -0,0 +1,241 @@
+"""The base blueprint shared by everything in stacker_blueprints."""
+import functools
+import hashlib
+import json
+import logging
+from types import MappingProxyType
+
+from stacker.blueprints import base
+
+from . import profile, serialize, split
+from .cache import get_template_cache, template_key
+
+logger = logging.getLogger(__name__)
+
+
+def variable_property(method):
+    """A read-only property that is computed once from a blueprint's variables.
+
+    The value is cached on the blueprint until :meth:`resolve_variables` is
+    called again, so only use this for values derived from variables (and
+    other variable properties), never for values that depend on resources
+    already added to the template.
+    """
+    key = method.__qualname__
+
+    @functools.wraps(method)
+    def getter(self):
+        # Drops the cache if the variables were replaced behind our back.
+        self.get_variables()
+        cache = self._variable_cache
+        try:
+            return cache[key]
+        except KeyError:
+            value = cache[key] = method(self)
+            return value
+
+    return property(getter)
+
+
+class Blueprint(base.Blueprint):
+    """A :class:`stacker.blueprints.base.Blueprint` with cached variables.
+
+    :meth:`get_variables` returns a read-only view of the resolved variables
+    that is built once per :meth:`resolve_variables` call, and any
+    :func:`variable_property` values are dropped whenever the variables are
+    resolved again.
+
+    Templates are serialized by :mod:`stacker_blueprints.serialize`, and
+    minified when ``COMPACT_TEMPLATE`` is set. They are built on a
+    :class:`stacker_blueprints.split.UnboundedTemplate`; one that ends up
+    over ``RESOURCE_LIMIT`` resources or ``TEMPLATE_SIZE_LIMIT`` bytes is
+    split into nested stacks, whose templates are kept in
+    :attr:`nested_templates`. Rendering never uploads them,
+    :meth:`upload_nested_templates` does.
+
+    Setting a :mod:`stacker_blueprints.profile` directory times every
+    ``create_*`` and ``generate_*`` method of the render.
+
+    When a :mod:`stacker_blueprints.cache` directory is configured, rendered
+    templates are served from it while the blueprint, its variables, its
+    context and its :meth:`cache_inputs` are unchanged.
+    """
+
+    COMPACT_TEMPLATE = False
+    RESOURCE_LIMIT = split.MAX_RESOURCES
+    TEMPLATE_SIZE_LIMIT = split.MAX_TEMPLATE_BYTES
+
+    def __init__(self, *args, **kwargs):
+        super(Blueprint, self).__init__(*args, **kwargs)
+        self._variables = None
+        self._variables_view = None
+        self._variable_cache = {}
+        self.profile = None
+
+    def reset_template(self):
+        super(Blueprint, self).reset_template()
+        self.template = split.UnboundedTemplate()
+        self.nested_templates = {}
+        # The rendered template, when it is not self.template (split or
+        # served from the cache).
+        self._rendered_template = None
+
+    def resolve_variables(self, provided_variables):
+        super(Blueprint, self).resolve_variables(provided_variables)
+        self._variables = None
+        self._variable_cache = {}
+        self._rendered_template = None
+
+    def get_variables(self):
+        """Return a read-only view of the resolved variables.
+
+        Raises:
+            :class:`stacker.exceptions.UnresolvedVariables`: If the variables
+                have not been resolved yet.
+        """
+        variables = super(Blueprint, self).get_variables()
+        if variables is not self._variables:
+            self._variables = variables
+            self._variables_view = MappingProxyType(variables)
+            self._variable_cache = {}
+        return self._variables_view
+
+    def cache_inputs(self):
+        """What the template depends on besides the blueprint's variables and
+        context, such as the contents of the files it reads.
+
+        The value is added to the :mod:`stacker_blueprints.cache` key of the
+        template, so it must be JSON serializable. None by default.
+        """
+        return None
+
+    @property
+    def template_indent(self):
+        """The indent of the rendered template, None when it is compact."""
+        if self.COMPACT_TEMPLATE or serialize.compact_enabled():
+            return None
+        return self.context.template_indent
+
+    def _create_template(self):
+        self.import_mappings()
+        self.create_template()
+        if self.description:
+            self.set_template_description(self.description)
+        self.setup_parameters()
+
+    def _build_template(self):
+        """Runs ``create_template()`` and returns the template as a dict.
+
+        The render is timed by :mod:`stacker_blueprints.profile` when a
+        profile directory is set, and the report is kept in :attr:`profile`.
+        """
+        directory = profile.profile_dir()
+        if directory is None:
+            self._create_template()
+            return self.template.to_dict()
+
+        profiler = profile.Profiler(self.template)
+        with profiler.profile(), profile.instrument(self, profiler):
+            self._create_template()
+            with profiler.phase("to_dict"):
+                template = self.template.to_dict()
+        self.profile = profile.build_report(self, profiler)
+        profile.write_report(self.profile, directory)
+        return template
+
+    def _split_template(self, template):
+        indent = self.template_indent
+        nested = {}
+
+        def template_url(name, child):
+            nested[name] = serialize.dumps(child, indent)
+            return split.nested_template_url(self, name, nested[name])
+
+        parent, _ = split.split_template(
+            template, template_url, self.RESOURCE_LIMIT,
+            self.TEMPLATE_SIZE_LIMIT)
+        logger.debug("Split %s into %d nested stacks.", self.name,
+                     len(nested))
+        self.nested_templates = nested
+        self._rendered_template = parent
+        return parent
+
+    def _render_template(self):
+        template = self._build_template()
+        rendered = serialize.dumps(template, self.template_indent)
+        if split.exceeds_limits(template, len(rendered.encode("utf-8")),
+                                self.RESOURCE_LIMIT,
+                                self.TEMPLATE_SIZE_LIMIT):
+            template = self._split_template(template)
+            rendered = serialize.dumps(template, self.template_indent)
+        version = hashlib.md5(rendered.encode()).hexdigest()[:8]
+        return version, rendered
+
+    def render_template(self):
+        cache = get_template_cache()
+        if cache is None:
+            return self._render_template()
+
+        try:
+            key = template_key(self)
+        except (TypeError, ValueError, OSError):
+            logger.debug("Cannot build a cache key for %s, rendering it.",
+                         self.name, exc_info=True)
+            return self._render_template()
+
+        rendered = cache.get(key)
+        if rendered is None:
+            version, rendered = self._render_template()
+            # Nested templates are not cached with their parent.
+            if not self.nested_templates:
+                cache.set(key, rendered)
+            return version, rendered
+
+        logger.debug("Using the cached template of %s.", self.name)
+        self._rendered_template = json.loads(rendered)
+        version = hashlib.md5(rendered.encode()).hexdigest()[:8]
+        return version, rendered
+
+    def write_template(self, fd):
+        """Renders the template and streams it to a text file object.
+
+        Unlike :meth:`render_template`, the template is never held in memory
+        as a single string (unless it comes from the template cache).
+
+        Returns:
+            tuple: The template version and the template size in bytes.
+        """
+        if get_template_cache() is not None:
+            version, rendered = self.render_template()
+            fd.write(rendered)
+            return version, len(rendered.encode("utf-8"))
+
+        template = self._build_template()
+        indent = self.template_indent
+        resources = len(template.get("Resources", {}))
+        if (resources > self.RESOURCE_LIMIT or
+                serialize.encoded_size(template, indent) >
+                self.TEMPLATE_SIZE_LIMIT):
+            template = self._split_template(template)
+        return serialize.dump(template, fd, indent)
+
+    def get_output_definitions(self):
+        if self._rendered_template is None:
+            return super(Blueprint, self).get_output_definitions()
+        return self._rendered_template.get("Outputs", {})
+
+    def upload_nested_templates(self, s3=None):
+        """Renders the template, and uploads the nested templates it was split
+        into to the stacker bucket.
+
+        :mod:`stacker_blueprints.builder` calls this before pushing the parent
+        template; see :func:`stacker_blueprints.split.upload_nested_templates`.
+        """
+        if self.rendered and self.nested_templates:
+            split.upload_nested_templates(self, s3)
+
+    @property
+    def requires_change_set(self):
+        if self._rendered_template is None:
+            return super(Blueprint, self).requires_change_set
+        return "Transform" in self._rendered_template
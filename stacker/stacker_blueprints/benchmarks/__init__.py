@@ -0,0 +1,14 @@
+"""Render benchmarks for the blueprints in stacker_blueprints.
+
+Every blueprint is rendered (``create_template()`` followed by
+``template.to_json()``) with small, medium and large variable fixtures,
+recording wall time, peak memory and the size of the rendered template.
+
+Run the whole suite, comparing against the stored baseline::
+
+    python -m stacker_blueprints.benchmarks
+
+Record a new baseline after an intentional change::
+
+    python -m stacker_blueprints.benchmarks --save-baseline
+"""
@@ -0,0 +1,545 @@
+"""Variable fixtures for the blueprint render benchmarks.
+
+Each :class:`Case` pairs a blueprint class path with a function that builds
+the blueprint's variables for a given scale ``n``. The ``sizes`` of a case map
+the ``small``/``medium``/``large`` size names onto that scale, so a "large"
+VPC means six availability zones while a "large" DNSRecords stack means
+close to two hundred record sets. "large" fixtures are sized to sit just
+under the template limits troposphere enforces (200 resources, 60 outputs).
+Blueprints whose shape does not depend on their variables only define a
+``small`` size. Cases with ``stacks`` greater than one render that many
+copies of the blueprint per measurement, like a config deploying a fleet of
+similar stacks.
+"""
+from collections import namedtuple
+
+from troposphere import awslambda
+
+Case = namedtuple("Case",
+                  ["name", "class_path", "variables", "sizes", "stacks"])
+Case.__new__.__defaults__ = (1,)
+
+SIZES = ("small", "medium", "large")
+
+ACCOUNT_ID = "123456789012"
+REGION = "us-east-1"
+
+FIXED = {"small": 1}
+
+
+def _subnets(n):
+    return ["subnet-%08x" % i for i in range(n)]
+
+
+def vpc(n):
+    return {
+        "AZCount": n,
+        "CidrBlock": "10.128.0.0/16",
+        "PublicSubnets": ["10.128.%d.0/24" % i for i in range(n)],
+        "PrivateSubnets": [
+            "10.128.%d.0/20" % (16 * (i + 1)) for i in range(n)
+        ],
+        "InternalDomain": "internal",
+        "BaseDomain": "example.com",
+        "CreateS3Endpoint": True,
+        "CreateDynamoEndpoint": True,
+    }
+
+
+def vpc_nat_instances(n):
+    variables = vpc(n)
+    variables.update({
+        "UseNatGateway": False,
+        "SshKeyName": "default",
+    })
+    return variables
+
+
+def vpc2(n):
+    return {
+        "VPC": {
+            "VPC": {
+                "CidrBlock": "10.128.0.0/16",
+                "EnableDnsHostnames": True,
+                "Tags": [
+                    {"Key": "tag%d" % i, "Value": "value%d" % i}
+                    for i in range(n)
+                ],
+            },
+        },
+        "InternalZone": {
+            "InternalZone": {
+                "Name": "internal.",
+                "HostedZoneConfig": {"Comment": "internal zone"},
+            },
+        },
+    }
+
+
+def network(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "InternetGatewayId": "igw-12345678",
+        "CreateNatGateway": True,
+        "AvailabilityZone": "us-east-1a",
+        "CidrBlock": "10.128.0.0/23",
+        "Tags": dict(("tag%d" % i, "value%d" % i) for i in range(n)),
+    }
+
+
+def dns_records(n):
+    record_sets = []
+    for i in range(n):
+        record_sets.append({
+            "Name": "host%d.example.com." % i,
+            "Type": "A",
+            "TTL": "300",
+            "ResourceRecords": ["10.0.%d.%d" % (i // 256 % 256, i % 256)],
+        })
+    record_sets.append({
+        "Name": "cdn.example.com.",
+        "Type": "A",
+        "AliasTarget": {"DNSName": "d111111abcdef8.cloudfront.net."},
+    })
+    record_sets.append({
+        "Name": "disabled.example.com.",
+        "Type": "CNAME",
+        "TTL": "300",
+        "ResourceRecords": ["example.com."],
+        "Enabled": False,
+    })
+    groups = {}
+    for i in range(max(1, n // 100)):
+        groups["Group%d" % i] = {
+            "RecordSets": [{
+                "Name": "weighted%d.example.com." % i,
+                "Type": "CNAME",
+                "TTL": "60",
+                "SetIdentifier": "primary",
+                "Weight": "1",
+                "ResourceRecords": ["primary.example.com."],
+            }],
+        }
+    return {
+        "HostedZoneName": "example.com.",
+        "Comment": "benchmark zone",
+        "RecordSets": record_sets,
+        "RecordSetGroups": groups,
+    }
+
+
+def dynamodb_tables(n):
+    tables = {}
+    for i in range(n):
+        tables["Table%d" % i] = {
+            "TableName": "table-%d" % i,
+            "KeySchema": [
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "name", "KeyType": "RANGE"},
+            ],
+            "AttributeDefinitions": [
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "name", "AttributeType": "S"},
+            ],
+            "ProvisionedThroughput": {
+                "ReadCapacityUnits": 5,
+                "WriteCapacityUnits": 5,
+            },
+            "StreamSpecification": {"StreamViewType": "NEW_IMAGE"},
+        }
+    return {"Tables": tables}
+
+
+def dynamodb_autoscaling(n):
+    configs = []
+    for i in range(n):
+        configs.append({
+            "table": "table-%d" % i,
+            "read": {"min": 5, "max": 100, "target": 75.0},
+            "write": {"min": 5, "max": 50, "target": 80.0},
+            "indexes": [{
+                "index": "index-table-%d" % i,
+                "read": {"min": 5, "max": 100},
+                "write": {"min": 5, "max": 50},
+            }],
+        })
+    return {"AutoScalingConfigs": configs}
+
+
+def ecs_app(n):
+    return {
+        "AppName": "app",
+        "TaskName": "app",
+        "Cluster": "cluster",
+        "Image": "%s.dkr.ecr.%s.amazonaws.com/app:latest" % (
+            ACCOUNT_ID, REGION),
+        "Command": ["bin/server", "--port", "8080"],
+        "CPU": 256,
+        "Memory": 512,
+        "Count": 2,
+        "ContainerPort": 8080,
+        "Environment": dict(("VAR_%d" % i, "value-%d" % i) for i in range(n)),
+        "LoadBalancerTargetGroupArns": [
+            "arn:aws:elasticloadbalancing:%s:%s:targetgroup/app/%d" % (
+                REGION, ACCOUNT_ID, i)
+            for i in range(max(1, n // 50))
+        ],
+        "HealthCheckGracePeriodSeconds": 30,
+    }
+
+
+def fargate_app(n):
+    variables = ecs_app(n)
+    variables.update({
+        "Subnets": _subnets(3),
+        "SecurityGroup": "sg-12345678",
+    })
+    return variables
+
+
+def lambda_function(n):
+    variables = {
+        "Code": awslambda.Code(S3Bucket="bucket", S3Key="function.zip"),
+        "Runtime": "python3.8",
+        "Description": "benchmark function",
+        "Environment": dict(("VAR_%d" % i, "value-%d" % i) for i in range(n)),
+        "VpcConfig": {
+            "SecurityGroupIds": ["sg-12345678"],
+            "SubnetIds": ",".join(_subnets(3)),
+        },
+        "AliasName": "live",
+    }
+    if n > 1:
+        variables["EventSourceMapping"] = {
+            "EventSourceArn": "arn:aws:kinesis:%s:%s:stream/events" % (
+                REGION, ACCOUNT_ID),
+            "StartingPosition": "LATEST",
+        }
+    return variables
+
+
+def elasticsearch_domain(n):
+    return {
+        "Roles": ["role-%d" % i for i in range(n)],
+        "TrustedNetworks": ["10.%d.0.0/16" % (i % 256) for i in range(n)],
+        "InternalZoneId": "Z123456",
+        "InternalZoneName": "internal.",
+        "InternalHostName": "es",
+        "Subnets": ",".join(_subnets(2)),
+        "VpcId": "vpc-12345678",
+        "CreateLinkedRole": True,
+    }
+
+
+def aurora_cluster(n):
+    return {
+        "DBFamily": "aurora-postgresql10",
+        "VpcId": "vpc-12345678",
+        "Subnets": ",".join(_subnets(3)),
+        "MasterUser": "root",
+        "MasterUserPassword": "password",
+        "ClusterParameters": dict(
+            ("parameter_%d" % i, str(i)) for i in range(n)),
+        "Tags": dict(("tag%d" % i, "value%d" % i) for i in range(n)),
+        "InternalZoneId": "Z123456",
+        "InternalZoneName": "internal.",
+        "InternalHostname": "db",
+    }
+
+
+def redis_replication_group(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "Subnets": ",".join(_subnets(3)),
+        "AutoMinorVersionUpgrade": True,
+        "CacheNodeType": "cache.m4.large",
+        "EngineVersion": "3.2.6",
+        "ParameterGroupFamily": "redis3.2",
+        "ClusterParameters": dict(
+            ("parameter-%d" % i, str(i)) for i in range(n)),
+        "InternalZoneId": "Z123456",
+        "InternalZoneName": "internal.",
+        "InternalHostname": "cache",
+    }
+
+
+def queues(n):
+    return {
+        "Queues": dict(
+            ("Queue%d" % i, {"VisibilityTimeout": 30}) for i in range(n)),
+    }
+
+
+def instances(n):
+    return {
+        "Instances": dict(
+            ("Instance%d" % i, {
+                "ImageId": "ami-12345678",
+                "InstanceType": "t2.micro",
+                "NetworkInterfaces": [{
+                    "DeviceIndex": "0",
+                    "AssociatePublicIpAddress": "true",
+                    "SubnetId": "subnet-12345678",
+                }],
+            }) for i in range(n)),
+    }
+
+
+def security_groups(n):
+    return {
+        "SecurityGroups": dict(
+            ("Group%d" % i, {
+                "GroupDescription": "group %d" % i,
+                "VpcId": "vpc-12345678",
+                "SecurityGroupIngress": [{
+                    "IpProtocol": "tcp",
+                    "FromPort": 443,
+                    "ToPort": 443,
+                    "CidrIp": "10.%d.0.0/16" % (i % 256),
+                }],
+            }) for i in range(n)),
+    }
+
+
+def security_rules(n):
+    ingress = {}
+    egress = {}
+    for i in range(n):
+        ingress["Ingress%d" % i] = {
+            "CidrIp": "10.%d.%d.0/24" % (i // 256 % 256, i % 256),
+            "FromPort": 443,
+            "ToPort": 443,
+            "GroupId": "sg-12345678",
+            "IpProtocol": "tcp",
+        }
+        egress["Egress%d" % i] = {
+            "CidrIp": "10.%d.%d.0/24" % (i // 256 % 256, i % 256),
+            "FromPort": 5432,
+            "ToPort": 5432,
+            "GroupId": "sg-12345678",
+            "IpProtocol": "tcp",
+        }
+    return {"IngressRules": ingress, "EgressRules": egress}
+
+
+def allow_list(n):
+    """A large ingress allow-list: the /24s of a few blocks opened to a few
+    ports, one group per block, with redundant host rules mixed in."""
+    ports = [(443, 443), (8080, 8080), (8081, 8089), (80, 80)]
+    ingress = {}
+    for i in range(n):
+        network = i // len(ports)
+        from_port, to_port = ports[i % len(ports)]
+        cidr = "10.%d.%d.0/24" % (network // 256 % 256, network % 256)
+        if i % 10 == 9:
+            # Already allowed by the first rule.
+            cidr, from_port, to_port = "10.0.0.%d/32" % (i % 256), 443, 443
+        ingress["Rule%d" % i] = {
+            "CidrIp": cidr,
+            "FromPort": from_port,
+            "ToPort": to_port,
+            "GroupId": "sg-%08d" % (network // 256),
+            "IpProtocol": "tcp",
+        }
+    return {"IngressRules": ingress}
+
+
+def compiled_allow_list(n):
+    variables = allow_list(n)
+    variables["CompileRules"] = True
+    return variables
+
+
+def buckets(n):
+    return {
+        "Buckets": dict(
+            ("Bucket%d" % i, {"AccessControl": "Private"}) for i in range(n)),
+        "ReadWriteRoles": ["writer"],
+        "ReadRoles": ["reader"],
+    }
+
+
+def streams(n):
+    return {
+        "Streams": dict(
+            ("Stream%d" % i, {"ShardCount": 1}) for i in range(n)),
+        "ReadWriteRoles": ["writer"],
+        "ReadRoles": ["reader"],
+    }
+
+
+def roles(n):
+    return {
+        "Ec2Roles": ["Ec2Role%d" % i for i in range(n)],
+        "LambdaRoles": ["LambdaRole%d" % i for i in range(n)],
+    }
+
+
+def topics(n):
+    return {
+        "Topics": dict(
+            ("Topic%d" % i, {
+                "DisplayName": "topic-%d" % i,
+                "Subscription": [{
+                    "Endpoint": "arn:aws:sqs:%s:%s:queue-%d" % (
+                        REGION, ACCOUNT_ID, i),
+                    "Protocol": "sqs",
+                }],
+            }) for i in range(n)),
+    }
+
+
+def repositories(n):
+    return {"Repositories": ["repo%d" % i for i in range(n)]}
+
+
+def ecs_cluster(n):
+    return {}
+
+
+def empire_daemon(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "DefaultSG": "sg-12345678",
+        "ExternalDomain": "empire.example.com",
+        "PrivateSubnets": ",".join(_subnets(3)),
+        "PublicSubnets": ",".join(_subnets(3)),
+        "AvailabilityZones": "us-east-1a,us-east-1b,us-east-1c",
+        "TrustedNetwork": "10.0.0.0/8",
+        "DatabaseHost": "db.internal",
+        "DatabaseUser": "empire",
+        "DatabasePassword": "password",
+        "InstanceSecurityGroup": "sg-87654321",
+        "InstanceRole": "empire-role",
+        "DockerImage": "remind101/empire:latest",
+        "Environment": "test",
+        "InternalZoneId": "Z123456",
+    }
+
+
+def empire_minion(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "DefaultSG": "sg-12345678",
+        "PrivateSubnets": ",".join(_subnets(3)),
+        "AvailabilityZones": "us-east-1a,us-east-1b,us-east-1c",
+        "SshKeyName": "default",
+        "DockerRegistryUser": "user",
+        "DockerRegistryPassword": "password",
+        "DockerRegistryEmail": "user@example.com",
+    }
+
+
+def empire_controller(n):
+    variables = empire_minion(n)
+    variables["DatabaseSecurityGroup"] = "sg-87654321"
+    return variables
+
+
+def bastion(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "DefaultSG": "sg-12345678",
+        "PublicSubnets": ",".join(_subnets(3)),
+        "PrivateSubnets": ",".join(_subnets(3)),
+        "AvailabilityZones": "us-east-1a,us-east-1b,us-east-1c",
+        "SshKeyName": "default",
+        "OfficeNetwork": "203.0.113.0/24",
+    }
+
+
+def flow_logs(n):
+    return {"VpcId": "vpc-12345678", "Retention": 30}
+
+
+def firehose_s3(n):
+    return {"BucketName": "firehose-bucket"}
+
+
+def rds_postgres(n):
+    return {
+        "VpcId": "vpc-12345678",
+        "Subnets": ",".join(_subnets(3)),
+        "DBFamily": "postgres9.6",
+        "EngineVersion": "9.6.3",
+        "EngineMajorVersion": "9.6",
+        "MasterUser": "root",
+        "MasterUserPassword": "password",
+        "DatabaseParameters": dict(
+            ("parameter_%d" % i, str(i)) for i in range(n)),
+        "Tags": dict(("tag%d" % i, "value%d" % i) for i in range(n)),
+    }
+
+
+CASES = [
+    Case("VPC", "stacker_blueprints.vpc.VPC", vpc,
+         {"small": 2, "medium": 4, "large": 6}),
+    Case("VPCNatInstances", "stacker_blueprints.vpc.VPC", vpc_nat_instances,
+         {"small": 2, "medium": 4, "large": 6}),
+    Case("VPC2", "stacker_blueprints.vpc.VPC2", vpc2,
+         {"small": 1, "medium": 10, "large": 50}),
+    Case("Network", "stacker_blueprints.network.Network", network,
+         {"small": 1, "medium": 10, "large": 50}),
+    Case("DNSRecords", "stacker_blueprints.route53.DNSRecords", dns_records,
+         {"small": 10, "medium": 100, "large": 190}),
+    Case("DynamoDB", "stacker_blueprints.dynamodb.DynamoDB", dynamodb_tables,
+         {"small": 1, "medium": 10, "large": 30}),
+    Case("AutoScaling", "stacker_blueprints.dynamodb.AutoScaling",
+         dynamodb_autoscaling, {"small": 1, "medium": 10, "large": 24}),
+    Case("Cluster", "stacker_blueprints.ecs.Cluster", ecs_cluster, FIXED),
+    Case("SimpleECSApp", "stacker_blueprints.ecs.SimpleECSApp", ecs_app,
+         {"small": 5, "medium": 100, "large": 1000}),
+    Case("SimpleFargateApp", "stacker_blueprints.ecs.SimpleFargateApp",
+         fargate_app, {"small": 5, "medium": 100, "large": 1000}),
+    Case("SimpleFargateAppFleet", "stacker_blueprints.ecs.SimpleFargateApp",
+         fargate_app, {"small": 5, "medium": 20}, stacks=50),
+    Case("Function", "stacker_blueprints.aws_lambda.Function",
+         lambda_function, {"small": 1, "medium": 50, "large": 500}),
+    Case("FunctionFleet", "stacker_blueprints.aws_lambda.Function",
+         lambda_function, {"small": 1, "medium": 50}, stacks=200),
+    Case("Domain", "stacker_blueprints.elasticsearch.Domain",
+         elasticsearch_domain, {"small": 1, "medium": 50, "large": 500}),
+    Case("AuroraPGCluster",
+         "stacker_blueprints.rds.aurora.base.AuroraPGCluster", aurora_cluster,
+         {"small": 1, "medium": 50, "large": 500}),
+    Case("PostgresMasterInstance",
+         "stacker_blueprints.rds.postgres.MasterInstance", rds_postgres,
+         {"small": 1, "medium": 50, "large": 500}),
+    Case("RedisReplicationGroup",
+         "stacker_blueprints.elasticache.redis.RedisReplicationGroup",
+         redis_replication_group, {"small": 1, "medium": 50, "large": 500}),
+    Case("Queues", "stacker_blueprints.sqs.Queues", queues,
+         {"small": 1, "medium": 10, "large": 20}),
+    Case("Instances", "stacker_blueprints.ec2.Instances", instances,
+         {"small": 1, "medium": 5, "large": 10}),
+    Case("SecurityGroups", "stacker_blueprints.ec2.SecurityGroups",
+         security_groups, {"small": 1, "medium": 20, "large": 60}),
+    Case("Rules", "stacker_blueprints.security_rules.Rules", security_rules,
+         {"small": 5, "medium": 50, "large": 100}),
+    Case("AllowList", "stacker_blueprints.security_rules.Rules", allow_list,
+         {"small": 50, "medium": 500, "large": 5000}),
+    Case("CompiledAllowList", "stacker_blueprints.security_rules.Rules",
+         compiled_allow_list, {"small": 50, "medium": 500, "large": 5000}),
+    Case("Buckets", "stacker_blueprints.s3.Buckets", buckets,
+         {"small": 1, "medium": 10, "large": 20}),
+    Case("Streams", "stacker_blueprints.kinesis.Streams", streams,
+         {"small": 1, "medium": 10, "large": 30}),
+    Case("Roles", "stacker_blueprints.iam_roles.Roles", roles,
+         {"small": 1, "medium": 5, "large": 15}),
+    Case("Topics", "stacker_blueprints.sns.Topics", topics,
+         {"small": 1, "medium": 10, "large": 30}),
+    Case("Repositories", "stacker_blueprints.ecr.Repositories", repositories,
+         {"small": 1, "medium": 50, "large": 190}),
+    Case("EmpireDaemon", "stacker_blueprints.empire.daemon.EmpireDaemon",
+         empire_daemon, FIXED),
+    Case("EmpireMinion", "stacker_blueprints.empire.minion.EmpireMinion",
+         empire_minion, FIXED),
+    Case("EmpireController",
+         "stacker_blueprints.empire.controller.EmpireController",
+         empire_controller, FIXED),
+    Case("Bastion", "stacker_blueprints.bastion.Bastion", bastion, FIXED),
+    Case("FlowLogs", "stacker_blueprints.vpc_flow_logs.FlowLogs", flow_logs,
+         FIXED),
+    Case("FirehoseS3", "stacker_blueprints.firehose.s3.DeliveryStream",
+         firehose_s3, FIXED),
+]
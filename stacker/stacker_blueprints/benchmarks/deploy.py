@@ -0,0 +1,400 @@
+"""Deploys the benchmark cases to a local CloudFormation emulator.
+
+Every case is rendered like in :mod:`stacker_blueprints.benchmarks.suite`,
+created as a stack in `moto <https://github.com/getmoto/moto>`_ running in
+server mode, then updated and deleted. The time each create and update takes
+to complete, and the number of API calls it made (polling included), are
+compared against ``deploy_baseline.json``, so the suite runs fully offline::
+
+    pip install 'moto[server]'
+    python -m stacker_blueprints.benchmarks.deploy VPC Function
+
+A moto server is started in this process, unless ``--endpoint-url`` points
+at one that is already running (``moto_server -p 5000``).
+
+A stack is updated to the template of the next size of its case, or, for
+cases with a single size, to its own template with a changed ``Metadata``
+entry. Stacks split into nested stacks are skipped, as their templates would
+need to be served from S3.
+
+moto emulates resources in memory and does not implement every resource
+type or attribute, and some fixtures refer to resources (security groups,
+buckets...) that do not exist in it, so not every case deploys. Those are
+reported, and only count as a regression once they are in the baseline. The
+timings only compare blueprints with themselves over time.
+"""
+from __future__ import print_function
+
+import argparse
+import collections
+import json
+import logging
+import os
+import socket
+import sys
+import time
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from botocore.parsers import ResponseParserError
+
+from ..split import SKIP_UPLOAD_ENV
+from .cases import SIZES
+from .suite import (
+    build_blueprint,
+    compare,
+    load_results,
+    render,
+    save_results,
+    select_cases,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__),
+                                "deploy_baseline.json")
+
+REGION = "us-east-1"
+
+METRICS = ("create_seconds", "update_seconds", "create_calls",
+           "update_calls")
+
+DEFAULT_TOLERANCES = {
+    "create_seconds": 0.5,
+    "update_seconds": 0.5,
+    "create_calls": 0.0,
+    "update_calls": 0.0,
+}
+
+SLACK = {
+    "create_seconds": 0.25,
+    "update_seconds": 0.25,
+    "create_calls": 0,
+    "update_calls": 0,
+}
+
+CAPABILITIES = ["CAPABILITY_IAM", "CAPABILITY_NAMED_IAM",
+                "CAPABILITY_AUTO_EXPAND"]
+
+# What a failed call raises. moto answers the calls it cannot handle with
+# an HTML error page, which botocore fails to parse.
+API_ERRORS = (BotoCoreError, ClientError, ResponseParserError)
+
+# Seconds between two DescribeStacks calls while a stack is in progress.
+POLL_INTERVAL = 0.05
+
+# Seconds to wait for a stack to settle before giving up.
+TIMEOUT = 300
+
+
+class DeployError(Exception):
+    """Raised when a stack does not reach a complete state."""
+
+
+class CallCounter(object):
+    """Counts the API calls made by a boto3 client, by operation."""
+
+    def __init__(self, client):
+        self.calls = collections.Counter()
+        client.meta.events.register("before-parameter-build", self._count)
+
+    def _count(self, model, **kwargs):
+        self.calls[model.name] += 1
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls.clear()
+
+
+def start_server():
+    """Starts moto in server mode on a free local port.
+
+    Returns:
+        tuple: The server, to ``stop()`` once done, and its endpoint URL.
+    """
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        raise RuntimeError("The deploy benchmarks need moto, install it "
+                           "with: pip install 'moto[server]'")
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    # The server logs every request through werkzeug.
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port,
+                                verbose=False)
+    server.start()
+    return server, "http://127.0.0.1:%d" % port
+
+
+def get_client(endpoint_url):
+    return boto3.client(
+        "cloudformation",
+        endpoint_url=endpoint_url,
+        region_name=REGION,
+        aws_access_key_id="testing",
+        aws_secret_access_key="testing",
+        # A failed call is reported, never retried behind the counter.
+        config=Config(retries={"total_max_attempts": 1}),
+    )
+
+
+def stack_parameters(blueprint):
+    """The CloudFormation parameters of a rendered blueprint."""
+    parameters = []
+    for key, value in sorted(blueprint.get_parameter_values().items()):
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)
+        parameters.append({"ParameterKey": key, "ParameterValue": str(value)})
+    return parameters
+
+
+def wait_for_stack(client, stack_name, timeout=TIMEOUT):
+    """Polls a stack until it is no longer in progress.
+
+    Raises:
+        DeployError: If the stack ends in a failed or rolled back state, or
+            does not settle within ``timeout`` seconds.
+    """
+    deadline = time.time() + timeout
+    while True:
+        stack = client.describe_stacks(StackName=stack_name)["Stacks"][0]
+        status = stack["StackStatus"]
+        if not status.endswith("_IN_PROGRESS"):
+            break
+        if time.time() > deadline:
+            raise DeployError("%s is still %s after %ds." % (
+                stack_name, status, timeout))
+        time.sleep(POLL_INTERVAL)
+    if "ROLLBACK" in status or "FAILED" in status:
+        raise DeployError("%s ended in %s: %s" % (
+            stack_name, status, stack.get("StackStatusReason", "")))
+    return status
+
+
+def _timed(counter, action):
+    counter.reset()
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start, counter.total
+
+
+def update_template(case, size):
+    """The blueprint and template a stack of a case is updated to."""
+    sizes = [s for s in SIZES if s in case.sizes]
+    following = sizes[sizes.index(size) + 1:]
+    if following:
+        blueprint = build_blueprint(case, following[0])
+        return blueprint, render(blueprint)
+
+    blueprint = build_blueprint(case, size)
+    template = json.loads(render(blueprint))
+    template.setdefault("Metadata", {})["DeployBenchmark"] = "update"
+    return blueprint, json.dumps(template)
+
+
+def deploy_case(client, counter, case, size):
+    """Creates, updates and deletes the stack of a case at one size.
+
+    Returns:
+        dict: The metrics of the deploy, or a ``status`` of ``skipped`` or
+            ``failed`` and the reason why.
+    """
+    stack_name = "%s-%s" % (case.name, size)
+    blueprint = build_blueprint(case, size)
+    template = render(blueprint)
+    if blueprint.nested_templates:
+        return {"status": "skipped", "error": "split into nested stacks"}
+
+    def create():
+        client.create_stack(StackName=stack_name, TemplateBody=template,
+                            Parameters=stack_parameters(blueprint),
+                            Capabilities=CAPABILITIES)
+        wait_for_stack(client, stack_name)
+
+    updated, updated_template = update_template(case, size)
+
+    def update():
+        client.update_stack(StackName=stack_name,
+                            TemplateBody=updated_template,
+                            Parameters=stack_parameters(updated),
+                            Capabilities=CAPABILITIES)
+        wait_for_stack(client, stack_name)
+
+    result = {"status": "deployed"}
+    try:
+        result["create_seconds"], result["create_calls"] = _timed(
+            counter, create)
+        result["update_seconds"], result["update_calls"] = _timed(
+            counter, update)
+    except API_ERRORS + (DeployError,) as e:
+        logger.debug("Failed to deploy %s.", stack_name, exc_info=True)
+        message = (str(e).splitlines() or [""])[0]
+        return {"status": "failed", "error": "%s: %s" % (
+            type(e).__name__, message)}
+    finally:
+        try:
+            client.delete_stack(StackName=stack_name)
+        except API_ERRORS:
+            logger.debug("Failed to delete %s.", stack_name, exc_info=True)
+    return result
+
+
+def run(cases, endpoint_url, sizes=SIZES):
+    """Deploys every case at every size it defines.
+
+    Returns:
+        dict: Metrics keyed by case name, then by size name.
+    """
+    client = get_client(endpoint_url)
+    counter = CallCounter(client)
+    results = {}
+    for case in cases:
+        for size in sizes:
+            if size not in case.sizes:
+                continue
+            logger.info("Deploying %s (%s)", case.name, size)
+            results.setdefault(case.name, {})[size] = deploy_case(
+                client, counter, case, size)
+    return results
+
+
+def deployed(results):
+    """The results of the stacks that were deployed, without the others."""
+    found = {}
+    for name, sized in results.items():
+        for size, result in sized.items():
+            if result["status"] == "deployed":
+                found.setdefault(name, {})[size] = dict(
+                    (metric, result[metric]) for metric in METRICS)
+    return found
+
+
+def no_longer_deployed(results, baseline, cases, sizes):
+    """Reports the cases of the baseline that were run but did not deploy.
+    """
+    found = []
+    for case in cases:
+        for size in sizes:
+            if (size in baseline.get(case.name, {}) and
+                    size not in results.get(case.name, {})):
+                found.append("%s (%s): no longer deploys" % (case.name,
+                                                             size))
+    return found
+
+
+def format_results(results):
+    lines = ["%-26s %-7s %9s %8s %9s %8s" % (
+        "blueprint", "size", "create", "calls", "update", "calls")]
+    for name in sorted(results):
+        for size in SIZES:
+            result = results[name].get(size)
+            if result is None:
+                continue
+            if result["status"] != "deployed":
+                lines.append("%-26s %-7s %s: %s" % (
+                    name, size, result["status"], result["error"]))
+                continue
+            lines.append("%-26s %-7s %9.4f %8d %9.4f %8d" % (
+                name, size, result["create_seconds"],
+                result["create_calls"], result["update_seconds"],
+                result["update_calls"]))
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.benchmarks.deploy",
+        description="Benchmark deploying the stacker_blueprints blueprints "
+                    "to a local moto server.")
+    parser.add_argument(
+        "--sizes", default=",".join(SIZES),
+        help="Comma separated list of sizes to run. Default: %(default)s")
+    parser.add_argument(
+        "--endpoint-url",
+        help="Use the moto server at this URL instead of starting one.")
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE,
+        help="Baseline results to compare against. Default: %(default)s")
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Write the results to the baseline file instead of comparing "
+             "against it.")
+    parser.add_argument(
+        "--output",
+        help="Also write the results, as JSON, to this path.")
+    for metric in METRICS:
+        parser.add_argument(
+            "--%s-tolerance" % metric.replace("_", "-"), type=float,
+            default=DEFAULT_TOLERANCES[metric],
+            help="Allowed relative growth of %s. Default: %%(default)s" % (
+                metric))
+    parser.add_argument(
+        "cases", nargs="*", metavar="CASE",
+        help="Names of the cases to run. Defaults to all of them.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        server, endpoint_url = start_server()
+    cases = select_cases(args.cases)
+    sizes = [size for size in args.sizes.split(",") if size]
+    try:
+        results = run(cases, endpoint_url, sizes)
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_results(results))
+
+    if args.output:
+        save_results(results, args.output)
+
+    results = deployed(results)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            baseline = load_results(args.baseline)
+        for name, sized in results.items():
+            baseline.setdefault(name, {}).update(sized)
+        save_results(baseline, args.baseline)
+        logger.info("Saved baseline to %s", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning("No baseline found at %s, nothing to compare.",
+                       args.baseline)
+        return 0
+
+    baseline = load_results(args.baseline)
+    tolerances = dict(
+        (metric, getattr(args, "%s_tolerance" % metric))
+        for metric in METRICS
+    )
+    regressions = compare(results, baseline, tolerances, METRICS, SLACK)
+    regressions.extend(no_longer_deployed(results, baseline, cases, sizes))
+    if regressions:
+        logger.error("%d regression(s) against %s:", len(regressions),
+                     args.baseline)
+        for regression in regressions:
+            logger.error("  %s", regression)
+        return 1
+
+    logger.info("No regressions against %s.", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
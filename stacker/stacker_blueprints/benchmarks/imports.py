@@ -0,0 +1,171 @@
+"""Import-time budgets for the stacker_blueprints modules.
+
+Every module is imported in a fresh interpreter, after stacker, troposphere
+and awacs.aws have already been imported, so the measurement only covers what
+the module itself (and the service modules it uses at import time) costs.
+The run fails if a module takes longer than its budget in
+``import_budgets.json``::
+
+    python -m stacker_blueprints.benchmarks.imports
+    python -m stacker_blueprints.benchmarks.imports --save-budgets
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(__file__),
+                               "import_budgets.json")
+
+MODULES = (
+    "asg",
+    "aws_lambda",
+    "bastion",
+    "certificate_manager",
+    "cloudwatch_logs",
+    "dynamodb",
+    "ec2",
+    "ecr",
+    "ecs",
+    "efs",
+    "elasticache.redis",
+    "elasticsearch",
+    "empire.controller",
+    "empire.daemon",
+    "empire.minion",
+    "empire.policies",
+    "firehose.redshift",
+    "firehose.s3",
+    "generic",
+    "iam_roles",
+    "kinesis",
+    "kms",
+    "network",
+    "policies",
+    "postgres",
+    "rds.aurora.base",
+    "rds.postgres",
+    "route53",
+    "s3",
+    "security_rules",
+    "sns",
+    "sqs",
+    "vpc",
+    "vpc_flow_logs",
+)
+
+# Headroom added over the measured time when saving budgets, so that the
+# budgets hold on slower machines.
+HEADROOM = 2.0
+
+# Measuring in a child process keeps modules imported by earlier
+# measurements from making later ones look cheaper.
+SCRIPT = """
+import time
+import stacker.blueprints.base, troposphere, awacs.aws
+start = time.perf_counter()
+import %s
+print(time.perf_counter() - start)
+"""
+
+
+def measure_import(module, repeat=3):
+    """Returns the fastest of ``repeat`` cold imports of a module, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, "-W", "ignore", "-c", SCRIPT % module])
+        timings.append(float(output.decode("utf-8").strip()))
+    return min(timings)
+
+
+def run(modules=MODULES, repeat=3):
+    results = {}
+    for module in modules:
+        name = "stacker_blueprints.%s" % module
+        logger.debug("Importing %s.", name)
+        results[name] = measure_import(name, repeat)
+    return results
+
+
+def over_budget(results, budgets):
+    """Returns a message for every module that took longer than its budget.
+
+    Modules without a budget are not checked.
+    """
+    messages = []
+    for name in sorted(results):
+        budget = budgets.get(name)
+        if budget is not None and results[name] > budget:
+            messages.append(
+                "%s took %.4fs to import, over its %.4fs budget" % (
+                    name, results[name], budget))
+    return messages
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.benchmarks.imports",
+        description="Check the import time of the stacker_blueprints "
+                    "modules against their budgets.",
+    )
+    parser.add_argument(
+        "modules", nargs="*", metavar="MODULE",
+        help="Modules to import, relative to stacker_blueprints. Defaults "
+             "to all of them.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of imports per module; the fastest is kept. "
+             "Default: %(default)s")
+    parser.add_argument(
+        "--budgets", default=DEFAULT_BUDGETS,
+        help="Budgets to check against. Default: %(default)s")
+    parser.add_argument(
+        "--save-budgets", action="store_true",
+        help="Write the measured times, times %s, as the new budgets." % (
+            HEADROOM))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    results = run(args.modules or MODULES, args.repeat)
+    for name in sorted(results):
+        print("%-42s %10.4f" % (name, results[name]))
+
+    budgets = {}
+    if os.path.exists(args.budgets):
+        with open(args.budgets) as fd:
+            budgets = json.load(fd)
+
+    if args.save_budgets:
+        for name, seconds in results.items():
+            budgets[name] = round(seconds * HEADROOM, 4)
+        with open(args.budgets, "w") as fd:
+            json.dump(budgets, fd, indent=4, sort_keys=True)
+            fd.write("\n")
+        logger.info("Saved budgets to %s", args.budgets)
+        return 0
+
+    messages = over_budget(results, budgets)
+    if messages:
+        logger.error("%d module(s) over budget:", len(messages))
+        for message in messages:
+            logger.error("  %s", message)
+        return 1
+
+    logger.info("All imports within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Runs the blueprint render benchmarks and compares them to a baseline."""
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+from stacker.config import Config
+from stacker.context import Context
+from stacker.util import load_object_from_string
+from stacker.variables import Variable
+
+from .. import serialize
+from ..split import SKIP_UPLOAD_ENV
+from .cases import CASES, SIZES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+METRICS = ("seconds", "peak_memory", "output_bytes", "compact_bytes")
+
+# Relative growth allowed over the baseline before a metric is reported as
+# a regression. Wall time is noisy across machines so it gets the most room.
+DEFAULT_TOLERANCES = {
+    "seconds": 0.5,
+    "peak_memory": 0.25,
+    "output_bytes": 0.0,
+    "compact_bytes": 0.0,
+}
+
+# Absolute growth that is always ignored, so that sub-millisecond timings
+# and allocator noise on tiny stacks do not fail the suite.
+SLACK = {
+    "seconds": 0.002,
+    "peak_memory": 64 * 1024,
+    "output_bytes": 0,
+    "compact_bytes": 0,
+}
+
+
+def get_context():
+    return Context(
+        environment={"namespace": "bench", "environment": "bench"},
+        config=Config({"namespace": "bench"}),
+    )
+
+
+def build_blueprint(case, size, context=None):
+    """Instantiates a case's blueprint and resolves its variables.
+
+    Args:
+        case (:class:`stacker_blueprints.benchmarks.cases.Case`): The case to
+            build.
+        size (str): One of the size names in ``case.sizes``.
+        context (:class:`stacker.context.Context`, optional): The context to
+            build the blueprint in.
+
+    Returns:
+        :class:`stacker.blueprints.base.Blueprint`: A blueprint that is ready
+            to be rendered.
+    """
+    context = context or get_context()
+    blueprint_class = load_object_from_string(case.class_path)
+    blueprint = blueprint_class("%s-%s" % (case.name, size), context)
+    variables = case.variables(case.sizes[size])
+    blueprint.resolve_variables(
+        [Variable(k, v) for k, v in variables.items()]
+    )
+    return blueprint
+
+
+def build_blueprints(case, size, context=None):
+    """Builds the ``case.stacks`` blueprints rendered by one measurement."""
+    context = context or get_context()
+    return [build_blueprint(case, size, context) for _ in range(case.stacks)]
+
+
+def render(blueprint):
+    """Renders a blueprint, returning the template as a JSON string."""
+    return blueprint.render_template()[1]
+
+
+def measure(case, size, repeat=3):
+    """Measures the render of a single case at a single size.
+
+    Every measurement renders ``case.stacks`` blueprints, and the metrics
+    cover all of them. Wall time is the fastest of ``repeat`` renders. Peak
+    memory is measured in a separate render, since tracing allocations slows
+    rendering down.
+
+    Returns:
+        dict: The ``seconds``, ``peak_memory`` (bytes) and ``output_bytes``
+            of the render, and the ``compact_bytes`` the same templates take
+            once minified by :mod:`stacker_blueprints.serialize`.
+    """
+    timings = []
+    for _ in range(repeat):
+        blueprints = build_blueprints(case, size)
+        start = time.perf_counter()
+        rendered = [render(blueprint) for blueprint in blueprints]
+        timings.append(time.perf_counter() - start)
+
+    blueprints = build_blueprints(case, size)
+    tracemalloc.start()
+    try:
+        for blueprint in blueprints:
+            render(blueprint)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(timings),
+        "peak_memory": peak_memory,
+        "output_bytes": sum(len(r.encode("utf-8")) for r in rendered),
+        "compact_bytes": sum(serialize.encoded_size(json.loads(r))
+                             for r in rendered),
+    }
+
+
+def select_cases(names=None):
+    if not names:
+        return list(CASES)
+    by_name = dict((case.name, case) for case in CASES)
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError("Unknown benchmark case(s): %s" % ", ".join(unknown))
+    return [by_name[name] for name in names]
+
+
+def run(cases, sizes=SIZES, repeat=3):
+    """Runs the given cases at each of the given sizes they define.
+
+    Returns:
+        dict: Results keyed by case name, then size name.
+    """
+    results = {}
+    for case in cases:
+        for size in sizes:
+            if size not in case.sizes:
+                continue
+            logger.debug("Rendering %s (%s).", case.name, size)
+            result = measure(case, size, repeat)
+            results.setdefault(case.name, {})[size] = result
+    return results
+
+
+def compare(results, baseline, tolerances=None, metrics=METRICS,
+            slack=SLACK):
+    """Compares benchmark results against a baseline.
+
+    Args:
+        results (dict): Results, as returned by :func:`run`.
+        baseline (dict): Previously saved results.
+        tolerances (dict, optional): Relative growth allowed per metric.
+            Defaults to :data:`DEFAULT_TOLERANCES`.
+        metrics (tuple, optional): The metrics to compare.
+        slack (dict, optional): Absolute growth always ignored, per metric.
+
+    Returns:
+        list: A message for every metric that regressed. Cases or sizes that
+            are missing from the baseline are not compared.
+    """
+    limits = dict(DEFAULT_TOLERANCES)
+    limits.update(tolerances or {})
+
+    regressions = []
+    for name in sorted(results):
+        for size in sorted(results[name]):
+            expected = baseline.get(name, {}).get(size)
+            if not expected:
+                continue
+            for metric in metrics:
+                if metric not in expected:
+                    continue
+                old = expected[metric]
+                new = results[name][size][metric]
+                allowed = old * (1 + limits[metric]) + slack[metric]
+                if new > allowed:
+                    growth = (float(new) / old - 1) * 100 if old else 0
+                    regressions.append(
+                        "%s (%s): %s regressed from %s to %s (+%.1f%%)" % (
+                            name, size, metric, old, new, growth)
+                    )
+    return regressions
+
+
+def savings(result):
+    """The share of a result's output bytes that compact mode saves."""
+    if not result["output_bytes"] or "compact_bytes" not in result:
+        return 0.0
+    return 1 - float(result["compact_bytes"]) / result["output_bytes"]
+
+
+def format_results(results):
+    lines = ["%-26s %-7s %12s %14s %14s %14s %8s" % (
+        "blueprint", "size", "seconds", "peak_memory", "output_bytes",
+        "compact_bytes", "saved")]
+    for name in sorted(results):
+        for size in SIZES:
+            if size not in results[name]:
+                continue
+            result = results[name][size]
+            lines.append("%-26s %-7s %12.6f %14d %14d %14d %7.1f%%" % (
+                name, size, result["seconds"], result["peak_memory"],
+                result["output_bytes"], result["compact_bytes"],
+                savings(result) * 100))
+    return "\n".join(lines)
+
+
+def load_results(path):
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def save_results(results, path):
+    with open(path, "w") as fd:
+        json.dump(results, fd, indent=4, sort_keys=True)
+        fd.write("\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.benchmarks",
+        description="Benchmark rendering of the stacker_blueprints "
+                    "blueprints.",
+    )
+    parser.add_argument(
+        "cases", nargs="*", metavar="CASE",
+        help="Names of the cases to run. Defaults to all of them.")
+    parser.add_argument(
+        "--sizes", default=",".join(SIZES),
+        help="Comma separated list of sizes to run. Default: %(default)s")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of timed renders per case; the fastest is kept. "
+             "Default: %(default)s")
+    parser.add_argument(
+        "--baseline", default=DEFAULT_BASELINE,
+        help="Baseline results to compare against. Default: %(default)s")
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Write the results to the baseline file instead of comparing "
+             "against it.")
+    parser.add_argument(
+        "--output",
+        help="Also write the results, as JSON, to this path.")
+    for metric in METRICS:
+        parser.add_argument(
+            "--%s-tolerance" % metric.replace("_", "-"), type=float,
+            dest="%s_tolerance" % metric,
+            default=DEFAULT_TOLERANCES[metric],
+            help="Allowed relative growth of %s. Default: %%(default)s" % (
+                metric))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Cases over the template limits are split, but never uploaded.
+    os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    sizes = [size for size in args.sizes.split(",") if size]
+    results = run(select_cases(args.cases), sizes, args.repeat)
+    print(format_results(results))
+
+    if args.output:
+        save_results(results, args.output)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            baseline = load_results(args.baseline)
+        for name, sized in results.items():
+            baseline.setdefault(name, {}).update(sized)
+        save_results(baseline, args.baseline)
+        logger.info("Saved baseline to %s", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        logger.warning("No baseline found at %s, nothing to compare.",
+                       args.baseline)
+        return 0
+
+    tolerances = dict(
+        (metric, getattr(args, "%s_tolerance" % metric))
+        for metric in METRICS
+    )
+    regressions = compare(results, load_results(args.baseline), tolerances)
+    if regressions:
+        logger.error("%d regression(s) against %s:", len(regressions),
+                     args.baseline)
+        for regression in regressions:
+            logger.error("  %s", regression)
+        return 1
+
+    logger.info("No regressions against %s.", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""``stacker build``, uploading the templates of nested stacks.
+
+Blueprints over the CloudFormation limits are split into nested stacks (see
+:mod:`stacker_blueprints.split`), whose templates have to be in the
+``stacker_bucket`` before the parent stack is created or updated. stacker
+itself only pushes the parent, so build configs using such blueprints with::
+
+    python -m stacker_blueprints.builder conf/example_vpc/example.env \\
+        conf/example_vpc/stacker.yml
+
+It takes the arguments of ``stacker build``, and builds exactly like it.
+"""
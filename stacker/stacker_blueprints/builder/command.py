@@ -0,0 +1,44 @@
+"""The ``stacker build`` command and action, with nested template uploads."""
+import sys
+
+from stacker.actions import build
+from stacker.commands import Stacker as StackerCommand
+from stacker.commands.stacker import build as build_command
+from stacker.commands.stacker.base import cancel
+from stacker.logger import setup_logging
+
+
+class Action(build.Action):
+    """stacker's build action, uploading nested templates before their parent.
+    """
+
+    def _template(self, blueprint):
+        upload = getattr(blueprint, "upload_nested_templates", None)
+        if upload is not None:
+            upload(self.s3_conn)
+        return super(Action, self)._template(blueprint)
+
+
+class Build(build_command.Build):
+    def run(self, options, **kwargs):
+        action = Action(options.context,
+                        provider_builder=options.provider_builder,
+                        cancel=cancel())
+        action.execute(concurrency=options.max_parallel,
+                       outline=options.outline,
+                       tail=options.tail,
+                       dump=options.dump)
+
+
+class Stacker(StackerCommand):
+    subcommands = (Build,)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    stacker = Stacker(setup_logging=setup_logging)
+    args = stacker.parse_args(["build"] + list(argv))
+    stacker.configure(args)
+    args.run(args)
+    return 0
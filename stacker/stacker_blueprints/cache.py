@@ -0,0 +1,209 @@
+"""A content-addressed, on-disk cache of rendered templates.
+
+Templates are keyed by a hash of everything that goes into a render: the
+blueprint's class path, the source of the modules it is built from, the
+library versions, its resolved variables and the contents of the files it
+reads (see :meth:`stacker_blueprints.base.Blueprint.cache_inputs`). An
+unchanged blueprint then renders to the exact same bytes (and the same
+stacker template version) as the last build, without running
+``create_template()``.
+
+The cache is enabled by pointing ``STACKER_BLUEPRINTS_CACHE_DIR`` at a
+directory. It is bounded by ``STACKER_BLUEPRINTS_CACHE_SIZE`` bytes, evicting
+the least recently used templates first.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+
+import awacs
+import stacker
+import troposphere
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_ENV = "STACKER_BLUEPRINTS_CACHE_DIR"
+CACHE_SIZE_ENV = "STACKER_BLUEPRINTS_CACHE_SIZE"
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump to invalidate every existing cache entry.
+KEY_VERSION = 1
+
+_module_digests = {}
+_caches = {}
+
+
+class TemplateCache(object):
+    """Rendered templates stored as ``<key>.json`` files in ``path``.
+
+    Args:
+        path (str): The cache directory. Created if it does not exist.
+        max_bytes (int, optional): The total size of the templates kept.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _entry(self, key):
+        return os.path.join(self.path, "%s.json" % key)
+
+    def get(self, key):
+        """Returns the template cached under ``key``, or None."""
+        path = self._entry(key)
+        try:
+            with open(path) as fd:
+                rendered = fd.read()
+        except IOError:
+            return None
+        # The modification time doubles as the last use for LRU eviction.
+        os.utime(path, None)
+        return rendered
+
+    def set(self, key, rendered):
+        """Caches a template, then evicts old ones beyond ``max_bytes``."""
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(rendered)
+        os.replace(tmp, self._entry(key))
+        self.evict()
+
+    def entries(self):
+        """Returns ``(mtime, size, path)`` of every entry, oldest first."""
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            logger.debug("Evicting %s from the template cache.", path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
+
+
+def get_template_cache():
+    """Returns the cache configured in the environment, or None."""
+    path = os.environ.get(CACHE_DIR_ENV)
+    if not path:
+        return None
+    max_bytes = int(os.environ.get(CACHE_SIZE_ENV, DEFAULT_MAX_BYTES))
+    key = (path, max_bytes)
+    if key not in _caches:
+        _caches[key] = TemplateCache(path, max_bytes)
+    return _caches[key]
+
+
+def _module_digest(module_name):
+    if module_name not in _module_digests:
+        module = sys.modules[module_name]
+        try:
+            source = inspect.getsource(module)
+        except (IOError, OSError, TypeError):
+            source = ""
+        _module_digests[module_name] = hashlib.sha256(
+            source.encode("utf-8")).hexdigest()
+    return _module_digests[module_name]
+
+
+def _source_modules(blueprint_class):
+    """Names of the modules a blueprint class is built from.
+
+    That is the module of every class in its MRO, plus the modules of the
+    same package they import from (policies, shared helpers, etc).
+    """
+    names = []
+    for klass in blueprint_class.__mro__:
+        if klass.__module__ in ("builtins", "__builtin__"):
+            continue
+        if klass.__module__ not in names:
+            names.append(klass.__module__)
+
+    for name in list(names):
+        package = name.split(".")[0]
+        for value in vars(sys.modules[name]).values():
+            if inspect.ismodule(value):
+                imported = value.__name__
+            else:
+                imported = getattr(value, "__module__", None)
+            if not isinstance(imported, str):
+                continue
+            if imported.split(".")[0] != package:
+                continue
+            if imported in sys.modules and imported not in names:
+                names.append(imported)
+    return names
+
+
+def _encode(value):
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if hasattr(value, "JSONrepr"):
+        return value.JSONrepr()
+    if hasattr(value, "items"):
+        return dict(value.items())
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(v) for v in value)
+    if hasattr(value, "__dict__"):
+        return [type(value).__name__, vars(value)]
+    return repr(value)
+
+
+def file_digest(path):
+    """Returns the sha256 of a file's contents, e.g. for ``cache_inputs()``.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fd:
+        for chunk in iter(lambda: fd.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def template_key(blueprint):
+    """Returns the cache key of a blueprint with resolved variables."""
+    blueprint_class = type(blueprint)
+    context = blueprint.context
+    parts = {
+        "key_version": KEY_VERSION,
+        "class_path": "%s.%s" % (blueprint_class.__module__,
+                                 blueprint_class.__name__),
+        "sources": [(name, _module_digest(name))
+                    for name in _source_modules(blueprint_class)],
+        "versions": [troposphere.__version__,
+                     getattr(awacs, "__version__", None),
+                     stacker.__version__],
+        "name": blueprint.name,
+        "namespace": [context.namespace, context.namespace_delimiter],
+        "description": blueprint.description,
+        "mappings": blueprint.mappings,
+        "template_indent": blueprint.template_indent,
+        "variables": blueprint.get_variables(),
+        "inputs": blueprint.cache_inputs(),
+    }
+    serialized = json.dumps(parts, sort_keys=True, default=_encode)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
@@ -0,0 +1,342 @@
+"""Resource level diffs of rendered CloudFormation templates.
+
+Templates are compared section by section (resources, outputs, conditions,
+mappings and parameters) by logical ID, so the cost is linear in the size of
+the two templates. Modified resources list the properties that changed, and
+whether CloudFormation will have to replace the resource to apply them.
+
+Compare two templates, or two directories of templates such as the ones
+written by :mod:`stacker_blueprints.render`::
+
+    python -m stacker_blueprints.diff old/vpc.json new/vpc.json
+    python -m stacker_blueprints.diff old-templates/ new-templates/
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+from collections import namedtuple
+
+SECTIONS = ("Parameters", "Mappings", "Conditions", "Resources", "Outputs")
+
+ADDED = "added"
+REMOVED = "removed"
+MODIFIED = "modified"
+
+SYMBOLS = {ADDED: "+", REMOVED: "-", MODIFIED: "~"}
+
+# Every property change replaces these resources.
+ALL_PROPERTIES = "*"
+
+# Properties whose update requires replacing the resource, per the
+# CloudFormation resource reference. Properties that only require
+# replacement in some cases are listed too, so the report errs on the side of
+# flagging a replacement. Only the resource types the blueprints create are
+# listed; a changed resource of any other type reports ``replacement`` as
+# None (unknown).
+REPLACEMENT_PROPERTIES = {
+    "AWS::ApplicationAutoScaling::ScalableTarget": {
+        "ResourceId", "ScalableDimension", "ServiceNamespace"},
+    "AWS::ApplicationAutoScaling::ScalingPolicy": {
+        "PolicyName", "ResourceId", "ScalableDimension", "ScalingTargetId",
+        "ServiceNamespace"},
+    "AWS::AutoScaling::AutoScalingGroup": {
+        "AutoScalingGroupName", "InstanceId"},
+    "AWS::AutoScaling::LaunchConfiguration": ALL_PROPERTIES,
+    "AWS::DynamoDB::Table": {
+        "KeySchema", "LocalSecondaryIndexes", "TableName"},
+    "AWS::EC2::DHCPOptions": {
+        "DomainName", "DomainNameServers", "NetbiosNameServers",
+        "NetbiosNodeType", "NtpServers"},
+    "AWS::EC2::EIP": {"Domain"},
+    "AWS::EC2::FlowLog": {
+        "DeliverLogsPermissionArn", "LogDestination", "LogDestinationType",
+        "LogFormat", "LogGroupName", "MaxAggregationInterval", "ResourceId",
+        "ResourceType", "TrafficType"},
+    "AWS::EC2::Instance": {
+        "AvailabilityZone", "CpuOptions", "ElasticGpuSpecifications",
+        "HibernationOptions", "ImageId", "Ipv6AddressCount",
+        "Ipv6Addresses", "KeyName", "LaunchTemplate", "NetworkInterfaces",
+        "PlacementGroupName", "PrivateIpAddress", "SecurityGroups",
+        "SubnetId"},
+    "AWS::EC2::InternetGateway": set(),
+    "AWS::EC2::NatGateway": {"AllocationId", "SubnetId"},
+    "AWS::EC2::NetworkAcl": {"VpcId"},
+    "AWS::EC2::Route": {
+        "DestinationCidrBlock", "DestinationIpv6CidrBlock", "RouteTableId"},
+    "AWS::EC2::RouteTable": {"VpcId"},
+    "AWS::EC2::SecurityGroup": {"GroupDescription", "GroupName", "VpcId"},
+    "AWS::EC2::SecurityGroupEgress": {
+        "CidrIp", "CidrIpv6", "DestinationPrefixListId",
+        "DestinationSecurityGroupId", "FromPort", "GroupId", "IpProtocol",
+        "ToPort"},
+    "AWS::EC2::SecurityGroupIngress": {
+        "CidrIp", "CidrIpv6", "FromPort", "GroupId", "GroupName",
+        "IpProtocol", "SourcePrefixListId", "SourceSecurityGroupId",
+        "SourceSecurityGroupName", "SourceSecurityGroupOwnerId", "ToPort"},
+    "AWS::EC2::Subnet": {
+        "AvailabilityZone", "AvailabilityZoneId", "CidrBlock", "OutpostArn",
+        "VpcId"},
+    "AWS::EC2::SubnetRouteTableAssociation": {"SubnetId"},
+    "AWS::EC2::VPC": {"CidrBlock", "InstanceTenancy"},
+    "AWS::EC2::VPCDHCPOptionsAssociation": {"VpcId"},
+    "AWS::EC2::VPCEndpoint": {"ServiceName", "VpcEndpointType", "VpcId"},
+    "AWS::EC2::VPCGatewayAttachment": set(),
+    "AWS::ECR::Repository": {"RepositoryName"},
+    "AWS::ECS::Cluster": {"ClusterName"},
+    "AWS::ECS::Service": {
+        "Cluster", "DeploymentController", "LaunchType", "Role",
+        "SchedulingStrategy", "ServiceName", "ServiceRegistries"},
+    "AWS::ECS::TaskDefinition": ALL_PROPERTIES,
+    "AWS::ElastiCache::ParameterGroup": {"CacheParameterGroupFamily"},
+    "AWS::ElastiCache::ReplicationGroup": {
+        "AtRestEncryptionEnabled", "CacheSubnetGroupName", "Engine",
+        "KmsKeyId", "NodeGroupConfiguration", "Port",
+        "PreferredCacheClusterAZs", "ReplicationGroupId", "SnapshotArns",
+        "SnapshotName", "TransitEncryptionEnabled"},
+    "AWS::ElastiCache::SubnetGroup": {"CacheSubnetGroupName"},
+    "AWS::ElasticLoadBalancing::LoadBalancer": {
+        "LoadBalancerName", "Scheme"},
+    "AWS::Elasticsearch::Domain": {"DomainName"},
+    "AWS::IAM::InstanceProfile": {"InstanceProfileName", "Path"},
+    "AWS::IAM::Policy": set(),
+    "AWS::IAM::Role": {"Path", "RoleName"},
+    "AWS::IAM::ServiceLinkedRole": {"AWSServiceName", "CustomSuffix"},
+    "AWS::Kinesis::Stream": {"Name"},
+    "AWS::KinesisFirehose::DeliveryStream": {
+        "DeliveryStreamName", "DeliveryStreamType",
+        "KinesisStreamSourceConfiguration"},
+    "AWS::Lambda::Alias": {"FunctionName", "Name"},
+    "AWS::Lambda::EventSourceMapping": {
+        "EventSourceArn", "StartingPosition", "StartingPositionTimestamp"},
+    "AWS::Lambda::Function": {"FunctionName", "PackageType"},
+    "AWS::Lambda::Version": ALL_PROPERTIES,
+    "AWS::Logs::LogGroup": {"LogGroupName"},
+    "AWS::Logs::LogStream": {"LogGroupName", "LogStreamName"},
+    "AWS::RDS::DBCluster": {
+        "AvailabilityZones", "DatabaseName", "DBClusterIdentifier",
+        "DBSubnetGroupName", "Engine", "EngineMode", "KmsKeyId",
+        "MasterUsername", "RestoreType", "SnapshotIdentifier",
+        "SourceDBClusterIdentifier", "SourceRegion", "StorageEncrypted",
+        "UseLatestRestorableTime"},
+    "AWS::RDS::DBClusterParameterGroup": {"Description", "Family"},
+    "AWS::RDS::DBInstance": {
+        "AvailabilityZone", "CharacterSetName", "DBClusterIdentifier",
+        "DBInstanceIdentifier", "DBName", "DBSnapshotIdentifier",
+        "DBSubnetGroupName", "Engine", "KmsKeyId", "MasterUsername",
+        "SourceDBInstanceIdentifier", "SourceRegion", "StorageEncrypted",
+        "Timezone"},
+    "AWS::RDS::DBParameterGroup": {"Description", "Family"},
+    "AWS::RDS::DBSubnetGroup": {"DBSubnetGroupName"},
+    "AWS::RDS::OptionGroup": {
+        "EngineName", "MajorEngineVersion", "OptionGroupDescription"},
+    "AWS::Route53::HostedZone": {"Name"},
+    "AWS::Route53::RecordSet": {"HostedZoneId", "HostedZoneName", "Name"},
+    "AWS::Route53::RecordSetGroup": set(),
+    "AWS::S3::Bucket": {"BucketName", "ObjectLockEnabled"},
+    "AWS::SNS::Topic": {"FifoTopic", "TopicName"},
+    "AWS::SQS::Queue": {"FifoQueue", "QueueName"},
+    "AWS::SQS::QueuePolicy": set(),
+    "AWS::ServiceDiscovery::PrivateDnsNamespace": {"Name", "Vpc"},
+    "AWS::ServiceDiscovery::Service": {
+        "HealthCheckCustomConfig", "Name", "NamespaceId"},
+}
+
+Change = namedtuple("Change", [
+    "section", "logical_id", "action", "resource_type", "attributes",
+    "properties", "replacement"])
+Change.__doc__ = """A single added, removed or modified template entry.
+
+``attributes`` and ``properties`` name the top level keys (``DependsOn``,
+``Properties``, ...) and resource properties that changed. ``replacement``
+is True or False for modified resources of a known type, None otherwise.
+"""
+
+
+def _changed_keys(old, new):
+    """Returns the keys of two dicts whose values differ, sorted."""
+    return sorted(key for key in set(old) | set(new)
+                  if old.get(key) != new.get(key))
+
+
+def requires_replacement(resource_type, properties):
+    """Whether changing ``properties`` replaces a resource of that type.
+
+    Returns:
+        bool: True or False, or None if the resource type is unknown.
+    """
+    replacing = REPLACEMENT_PROPERTIES.get(resource_type)
+    if replacing is None:
+        return None
+    if replacing == ALL_PROPERTIES:
+        return bool(properties)
+    return any(name in replacing for name in properties)
+
+
+def _resource_change(logical_id, old, new):
+    old_type, new_type = old.get("Type"), new.get("Type")
+    attributes = _changed_keys(old, new)
+    properties = _changed_keys(old.get("Properties") or {},
+                               new.get("Properties") or {})
+    if old_type != new_type:
+        replacement = True
+    else:
+        replacement = requires_replacement(new_type, properties)
+    return Change("Resources", logical_id, MODIFIED, new_type, attributes,
+                  properties, replacement)
+
+
+def diff_templates(old, new):
+    """Compares two templates by logical ID.
+
+    Args:
+        old (dict): The currently deployed (or previous) template.
+        new (dict): The new template.
+
+    Returns:
+        list: A :class:`Change` for every entry that was added, removed or
+            modified, by section, in the order of the old template followed
+            by the entries only the new template has.
+    """
+    changes = []
+    for section in SECTIONS:
+        old_entries = old.get(section) or {}
+        new_entries = new.get(section) or {}
+        logical_ids = list(old_entries)
+        logical_ids.extend(k for k in new_entries if k not in old_entries)
+        for logical_id in logical_ids:
+            resource_type = None
+            if logical_id not in old_entries:
+                if section == "Resources":
+                    resource_type = new_entries[logical_id].get("Type")
+                changes.append(Change(section, logical_id, ADDED,
+                                      resource_type, [], [], None))
+            elif logical_id not in new_entries:
+                if section == "Resources":
+                    resource_type = old_entries[logical_id].get("Type")
+                changes.append(Change(section, logical_id, REMOVED,
+                                      resource_type, [], [], None))
+            elif old_entries[logical_id] != new_entries[logical_id]:
+                if section == "Resources":
+                    changes.append(_resource_change(
+                        logical_id, old_entries[logical_id],
+                        new_entries[logical_id]))
+                else:
+                    changes.append(Change(section, logical_id, MODIFIED,
+                                          None, [], [], None))
+    return changes
+
+
+def summarize(changes):
+    """Counts the changes per action, and the resources to be replaced."""
+    summary = {ADDED: 0, REMOVED: 0, MODIFIED: 0, "replacements": 0}
+    for change in changes:
+        summary[change.action] += 1
+        if change.replacement:
+            summary["replacements"] += 1
+    return summary
+
+
+def format_changes(changes):
+    lines = []
+    section = None
+    for change in changes:
+        if change.section != section:
+            section = change.section
+            lines.append("%s:" % section)
+        line = "  %s %s" % (SYMBOLS[change.action], change.logical_id)
+        if change.resource_type:
+            line += " (%s)" % change.resource_type
+        if change.replacement:
+            line += " [replacement]"
+        elif change.action == MODIFIED and change.replacement is None and \
+                change.section == "Resources":
+            line += " [replacement unknown]"
+        lines.append(line)
+        if change.properties:
+            lines.append("      properties: %s" % ", ".join(
+                change.properties))
+        other = [a for a in change.attributes if a != "Properties"]
+        if other:
+            lines.append("      attributes: %s" % ", ".join(other))
+    return "\n".join(lines)
+
+
+def load_template(path):
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def diff_paths(old_path, new_path):
+    """Diffs two template files, or every template in two directories.
+
+    Templates are matched across directories by file name; one that only
+    exists on one side is diffed against an empty template.
+
+    Returns:
+        dict: Lists of :class:`Change` keyed by template file name.
+    """
+    if not os.path.isdir(old_path) and not os.path.isdir(new_path):
+        name = os.path.basename(new_path)
+        return {name: diff_templates(load_template(old_path),
+                                     load_template(new_path))}
+
+    def templates(path):
+        if not os.path.isdir(path):
+            return set()
+        return set(name for name in os.listdir(path)
+                   if name.endswith(".json"))
+
+    results = {}
+    for name in sorted(templates(old_path) | templates(new_path)):
+        old_file = os.path.join(old_path, name)
+        new_file = os.path.join(new_path, name)
+        old = load_template(old_file) if os.path.exists(old_file) else {}
+        new = load_template(new_file) if os.path.exists(new_file) else {}
+        results[name] = diff_templates(old, new)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.diff",
+        description="Compare rendered CloudFormation templates resource by "
+                    "resource.",
+    )
+    parser.add_argument(
+        "old", help="The previous template, or directory of templates.")
+    parser.add_argument(
+        "new", help="The new template, or directory of templates.")
+    parser.add_argument(
+        "--json", action="store_true",
+        help="Print the changes as JSON instead of text.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Prints the differences; returns 1 if there were any, like diff(1)."""
+    args = parse_args(argv)
+    results = diff_paths(args.old, args.new)
+
+    if args.json:
+        print(json.dumps(
+            dict((name, [c._asdict() for c in changes])
+                 for name, changes in results.items()),
+            indent=4, sort_keys=True))
+    else:
+        for name in sorted(results):
+            if not results[name]:
+                continue
+            summary = summarize(results[name])
+            print("%s: %d added, %d removed, %d modified, %d replaced" % (
+                name, summary[ADDED], summary[REMOVED], summary[MODIFIED],
+                summary["replacements"]))
+            print(format_changes(results[name]))
+
+    return 1 if any(results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,267 @@
 from awacs.helpers.trust import get_ecs_task_assumerole_policy
 
 from troposphere import (
+    applicationautoscaling as aas,
     ecs,
     iam,
+    servicediscovery,
 )
 
 from troposphere import (
+    AWSProperty,
     NoValue,
     Output,
     Region,
     Sub,
 )
+from troposphere.validators import integer
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint, variable_property
 from stacker.blueprints.variables.types import TroposphereType
 
 from .policies import ecs_task_execution_policy
 
+# Used as the RoleARN of scalable targets when AutoScaling sets no RoleArn.
+ECS_AUTOSCALING_ROLE = Sub(
+    "arn:aws:iam::${AWS::AccountId}:role/aws-service-role/"
+    "ecs.application-autoscaling.amazonaws.com/"
+    "AWSServiceRoleForApplicationAutoScaling_ECSService"
+)
+
+# The target tracking policies AutoScaling can create: the key of their
+# target value, the title of the policy and the predefined metric tracked.
+TARGET_TRACKING_POLICIES = (
+    ("CPUTarget", "CPUScalingPolicy", "ECSServiceAverageCPUUtilization"),
+    ("MemoryTarget", "MemoryScalingPolicy",
+     "ECSServiceAverageMemoryUtilization"),
+    ("RequestCountTarget", "RequestCountScalingPolicy",
+     "ALBRequestCountPerTarget"),
+)
+
+AUTOSCALING_KEYS = set([
+    "MinCapacity", "MaxCapacity", "ScaleInCooldown", "ScaleOutCooldown",
+    "DisableScaleIn", "RequestCountResourceLabel", "RoleArn",
+    "ScheduledActions",
+] + [key for key, _, _ in TARGET_TRACKING_POLICIES])
+
+
+SERVICE_DISCOVERY_KEYS = set([
+    "NamespaceId", "NamespaceName", "VpcId", "Name", "RecordTypes", "TTL",
+    "FailureThreshold",
+])
+
+# The ephemeral storage, in GiB, Fargate tasks can be given.
+MIN_EPHEMERAL_STORAGE = 21
+MAX_EPHEMERAL_STORAGE = 200
+
+# The highest nofile limit Fargate tasks can set.
+MAX_FARGATE_NOFILE = 1048576
+
+if hasattr(ecs, "EphemeralStorage"):
+    EphemeralStorage = ecs.EphemeralStorage
+    TaskDefinition = ecs.TaskDefinition
+else:
+    # Older troposphere releases predate the task EphemeralStorage property.
+    class EphemeralStorage(AWSProperty):
+        props = {
+            "SizeInGiB": (integer, False),
+        }
+
+    class TaskDefinition(ecs.TaskDefinition):
+        props = dict(ecs.TaskDefinition.props,
+                     EphemeralStorage=(EphemeralStorage, False))
+
+# The capacity providers every cluster can use for Fargate tasks.
+FARGATE_CAPACITY_PROVIDERS = ("FARGATE", "FARGATE_SPOT")
+
+if hasattr(ecs, "CapacityProviderStrategyItem"):
+    CapacityProviderStrategyItem = ecs.CapacityProviderStrategyItem
+    ECSCluster = ecs.Cluster
+    ECSService = ecs.Service
+else:
+    # Older troposphere releases predate capacity providers.
+    class CapacityProviderStrategyItem(AWSProperty):
+        props = {
+            "Base": (integer, False),
+            "CapacityProvider": (str, False),
+            "Weight": (integer, False),
+        }
+
+    class ECSCluster(ecs.Cluster):
+        props = dict(ecs.Cluster.props,
+                     CapacityProviders=([str], False),
+                     DefaultCapacityProviderStrategy=(
+                         [CapacityProviderStrategyItem], False))
+
+    class ECSService(ecs.Service):
+        props = dict(ecs.Service.props,
+                     CapacityProviderStrategy=(
+                         [CapacityProviderStrategyItem], False))
+
+
+def check_capacity_provider_strategy(strategy, providers=None):
+    """Checks a list of :class:`CapacityProviderStrategyItem`.
+
+    Args:
+        strategy (list): The strategy items.
+        providers (list, optional): The capacity providers the items may
+            use. Any provider if not given.
+
+    Raises:
+        ValueError: If the strategy is not valid.
+    """
+    names = [item.CapacityProvider for item in strategy]
+    if len(set(names)) != len(names):
+        raise ValueError("A capacity provider strategy can only use each "
+                         "capacity provider once: %s" % ", ".join(names))
+    if providers is not None:
+        unknown = [name for name in names if name not in providers]
+        if unknown:
+            raise ValueError("Unknown capacity provider(s) %s, expected "
+                             "%s." % (", ".join(unknown),
+                                      " or ".join(providers)))
+    if len([item for item in strategy if item.properties.get("Base")]) > 1:
+        raise ValueError("Only one capacity provider of a strategy can set "
+                         "a Base.")
+    if not any(item.properties.get("Weight") for item in strategy):
+        raise ValueError("At least one capacity provider of a strategy "
+                         "needs a Weight greater than 0.")
+
+
+def _container_value(container, *keys):
+    """The first of ``keys`` a container sets to an integer, or 0."""
+    for key in keys:
+        value = container.properties.get(key)
+        if isinstance(value, int):
+            return value
+    return 0
+
+
+def _container_list(container, key):
+    """A list property of a container, or an empty list if unset."""
+    value = container.properties.get(key)
+    return value if isinstance(value, list) else []
+
+
+def check_containers(containers, volumes=(), cpu=NoValue, memory=NoValue):
+    """Checks the container definitions of a task.
+
+    Args:
+        containers (list): :class:`troposphere.ecs.ContainerDefinition`
+            objects.
+        volumes (list, optional): The names of the task's volumes.
+        cpu (str, optional): The task's CPU units, if set at the task level.
+        memory (str, optional): The task's memory in MiB, if set at the task
+            level.
+
+    Raises:
+        ValueError: If container names are not unique, containers depend on
+            or mount unknown containers or volumes, depend on each other in
+            a loop, or use more CPU or memory than the task has.
+    """
+    names = [container.Name for container in containers]
+    duplicates = sorted(set(n for n in names if names.count(n) > 1))
+    if duplicates:
+        raise ValueError("Duplicate container name(s): %s" % ", ".join(
+            duplicates))
+
+    depends_on = {}
+    for container in containers:
+        depends_on[container.Name] = [
+            d.ContainerName for d in _container_list(container, "DependsOn")]
+        for name in depends_on[container.Name]:
+            if name not in names:
+                raise ValueError("Container %s depends on unknown container "
+                                 "%s." % (container.Name, name))
+        for mount in _container_list(container, "MountPoints"):
+            if mount.SourceVolume not in volumes:
+                raise ValueError("Container %s mounts unknown volume %s." % (
+                    container.Name, mount.SourceVolume))
+        for source in _container_list(container, "VolumesFrom"):
+            if source.SourceContainer not in names:
+                raise ValueError("Container %s mounts the volumes of unknown "
+                                 "container %s." % (container.Name,
+                                                    source.SourceContainer))
+        if memory is NoValue and not _container_value(
+                container, "Memory", "MemoryReservation"):
+            raise ValueError("Container %s needs Memory or MemoryReservation "
+                             "when the task sets no memory." % container.Name)
+
+    visiting, done = set(), set()
+
+    def visit(name, path):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError("Containers depend on each other in a loop: "
+                             "%s" % " -> ".join(path + [name]))
+        visiting.add(name)
+        for dependency in depends_on[name]:
+            visit(dependency, path + [name])
+        visiting.discard(name)
+        done.add(name)
+
+    for name in names:
+        visit(name, [])
+
+    for total, keys, unit in ((cpu, ("Cpu",), "CPU units"),
+                              (memory, ("Memory", "MemoryReservation"),
+                               "MiB of memory")):
+        if total is NoValue:
+            continue
+        used = sum(_container_value(c, *keys) for c in containers)
+        if used > int(total):
+            raise ValueError("The task's containers use %d %s, more than "
+                             "the task's %s." % (used, unit, total))
+
 
 class Cluster(Blueprint):
+    VARIABLES = {
+        "CapacityProviders": {
+            "type": list,
+            "description": "The capacity providers to associate with the "
+                           "cluster. Defaults to those used in "
+                           "DefaultCapacityProviderStrategy.",
+            "default": [],
+        },
+        "DefaultCapacityProviderStrategy": {
+            "type": TroposphereType(
+                CapacityProviderStrategyItem,
+                optional=True,
+                many=True,
+            ),
+            "description": "The capacity provider strategy of the services "
+                           "and tasks of the cluster that set no launch "
+                           "type, such as a FARGATE base with FARGATE_SPOT "
+                           "for the rest.",
+            "default": None,
+        },
+    }
+
     def create_template(self):
         t = self.template
-
-        cluster = t.add_resource(ecs.Cluster("Cluster"))
+        variables = self.get_variables()
+
+        strategy = variables["DefaultCapacityProviderStrategy"]
+        providers = variables["CapacityProviders"]
+        if strategy:
+            check_capacity_provider_strategy(strategy)
+            providers = providers or [item.CapacityProvider
+                                      for item in strategy]
+            missing = [item.CapacityProvider for item in strategy
+                       if item.CapacityProvider not in providers]
+            if missing:
+                raise ValueError("DefaultCapacityProviderStrategy uses "
+                                 "capacity provider(s) missing from "
+                                 "CapacityProviders: %s" % ", ".join(missing))
+
+        cluster = t.add_resource(
+            ECSCluster(
+                "Cluster",
+                CapacityProviders=providers or NoValue,
+                DefaultCapacityProviderStrategy=strategy or NoValue,
+            )
+        )
 
         t.add_output(Output("ClusterId", Value=cluster.Ref()))
         t.add_output(Output("ClusterArn", Value=cluster.GetAtt("Arn")))
@@ -100,37 +339,107 @@ class BaseECSTask(Blueprint):
                            "ContainerPort is set as well. Default: tcp",
             "default": "",
         },
+        "Sidecars": {
+            "type": TroposphereType(
+                ecs.ContainerDefinition,
+                optional=True,
+                many=True,
+            ),
+            "description": "An optional list of ContainerDefinition objects "
+                           "to run alongside the task's container, such as "
+                           "a cache, a proxy or a log router. Sidecars "
+                           "without a LogConfiguration log like the task's "
+                           "container, under their own stream prefix. "
+                           "Their Cpu and Memory (or MemoryReservation) "
+                           "count against the task's CPU and Memory.",
+            "default": None,
+        },
+        "DependsOn": {
+            "type": TroposphereType(
+                ecs.ContainerDependency,
+                optional=True,
+                many=True,
+            ),
+            "description": "An optional list of ContainerDependency objects: "
+                           "the sidecars to start (and the Condition they "
+                           "must reach) before the task's container.",
+            "default": None,
+        },
+        "Volumes": {
+            "type": TroposphereType(ecs.Volume, optional=True, many=True),
+            "description": "An optional list of Volume objects, that the "
+                           "task's containers can share.",
+            "default": None,
+        },
+        "MountPoints": {
+            "type": TroposphereType(ecs.MountPoint, optional=True, many=True),
+            "description": "An optional list of MountPoint objects, mounting "
+                           "Volumes into the task's container.",
+            "default": None,
+        },
+        "MemoryReservation": {
+            "type": int,
+            "description": "An optional soft limit (in megabytes) of the "
+                           "task's container memory, at most its Memory.",
+            "default": 0,
+        },
+        "Ulimits": {
+            "type": TroposphereType(ecs.Ulimit, optional=True, many=True),
+            "description": "An optional list of Ulimit objects for the "
+                           "task's container, such as a higher nofile.",
+            "default": None,
+        },
+        "SharedMemorySize": {
+            "type": int,
+            "description": "The size (in megabytes) of the task's "
+                           "container /dev/shm. Not supported on Fargate.",
+            "default": 0,
+        },
+        "InitProcessEnabled": {
+            "type": bool,
+            "description": "Runs an init process in the task's container, "
+                           "that forwards signals and reaps processes.",
+            "default": False,
+        },
+        "EphemeralStorage": {
+            "type": int,
+            "description": "The ephemeral storage (in GiB) of Fargate "
+                           "tasks, from %d to %d. Defaults to Fargate's "
+                           "20." % (MIN_EPHEMERAL_STORAGE,
+                                    MAX_EPHEMERAL_STORAGE),
+            "default": 0,
+        },
     }
 
-    @property
+    @variable_property
     def task_name(self):
         return self.get_variables()["TaskName"]
 
-    @property
+    @variable_property
     def image(self):
         return self.get_variables()["Image"]
 
-    @property
+    @variable_property
     def command(self):
         return self.get_variables()["Command"] or NoValue
 
-    @property
+    @variable_property
     def cpu(self):
         return self.get_variables()["CPU"]
 
-    @property
+    @variable_property
     def task_definition_cpu(self):
         return NoValue
 
-    @property
+    @variable_property
     def memory(self):
         return self.get_variables()["Memory"]
 
-    @property
+    @variable_property
     def task_definition_memory(self):
         return NoValue
 
-    @property
+    @variable_property
     def environment(self):
         env_dict = self.get_variables()["Environment"]
         if not env_dict:
@@ -144,11 +453,11 @@ class BaseECSTask(Blueprint):
 
         return env_list
 
-    @property
+    @variable_property
     def log_group_name(self):
         return self.task_name
 
-    @property
+    @variable_property
     def log_configuration(self):
         log_config = self.get_variables()["LogConfiguration"]
         if not log_config:
@@ -162,19 +471,108 @@ class BaseECSTask(Blueprint):
             )
         return log_config
 
-    @property
+    def generate_sidecar_log_configuration(self, name):
+        if self.get_variables()["LogConfiguration"]:
+            return self.log_configuration
+        return ecs.LogConfiguration(
+            LogDriver="awslogs",
+            Options={
+                "awslogs-group": self.log_group_name,
+                "awslogs-region": Region,
+                "awslogs-stream-prefix": name,
+            }
+        )
+
+    @variable_property
+    def sidecars(self):
+        sidecars = []
+        # Copies, so that rendering leaves the variables as they were given.
+        for sidecar in self.get_variables()["Sidecars"] or []:
+            sidecar = ecs.ContainerDefinition(**sidecar.properties)
+            if "LogConfiguration" not in sidecar.properties:
+                sidecar.LogConfiguration = \
+                    self.generate_sidecar_log_configuration(sidecar.Name)
+            sidecars.append(sidecar)
+        return sidecars
+
+    @variable_property
+    def container_depends_on(self):
+        return self.get_variables()["DependsOn"] or NoValue
+
+    @variable_property
+    def volumes(self):
+        return self.get_variables()["Volumes"] or NoValue
+
+    @variable_property
+    def mount_points(self):
+        return self.get_variables()["MountPoints"] or NoValue
+
+    @variable_property
+    def container_cpu(self):
+        return self.cpu
+
+    @variable_property
+    def container_memory(self):
+        return self.memory
+
+    @variable_property
+    def memory_reservation(self):
+        reservation = self.get_variables()["MemoryReservation"]
+        if reservation and reservation > self.container_memory:
+            raise ValueError("MemoryReservation (%d) must be at most the "
+                             "container's memory (%d)." % (
+                                 reservation, self.container_memory))
+        return reservation or NoValue
+
+    @variable_property
+    def ulimits(self):
+        ulimits = self.get_variables()["Ulimits"]
+        if not ulimits:
+            return NoValue
+        names = [ulimit.Name for ulimit in ulimits]
+        if len(set(names)) != len(names):
+            raise ValueError("Ulimits can only set each limit once: %s" %
+                             ", ".join(names))
+        for ulimit in ulimits:
+            if ulimit.SoftLimit > ulimit.HardLimit:
+                raise ValueError("The %s SoftLimit (%d) is more than its "
+                                 "HardLimit (%d)." % (ulimit.Name,
+                                                      ulimit.SoftLimit,
+                                                      ulimit.HardLimit))
+        return ulimits
+
+    @variable_property
+    def linux_parameters(self):
+        variables = self.get_variables()
+        kwargs = {}
+        if variables["SharedMemorySize"]:
+            kwargs["SharedMemorySize"] = variables["SharedMemorySize"]
+        if variables["InitProcessEnabled"]:
+            kwargs["InitProcessEnabled"] = True
+        if not kwargs:
+            return NoValue
+        return ecs.LinuxParameters(**kwargs)
+
+    @variable_property
+    def ephemeral_storage(self):
+        if self.get_variables()["EphemeralStorage"]:
+            raise ValueError("EphemeralStorage can only be set on Fargate "
+                             "tasks.")
+        return NoValue
+
+    @variable_property
     def task_role_arn(self):
         return self.get_variables()["TaskRoleArn"]
 
-    @property
+    @variable_property
     def network_mode(self):
         return self.get_variables()["NetworkMode"] or NoValue
 
-    @property
+    @variable_property
     def container_port(self):
         return self.get_variables()["ContainerPort"]
 
-    @property
+    @variable_property
     def host_port(self):
         host_port = self.get_variables()["HostPort"]
         if host_port and not self.container_port:
@@ -182,7 +580,7 @@ class BaseECSTask(Blueprint):
                              "HostPort")
         return host_port
 
-    @property
+    @variable_property
     def container_protocol(self):
         container_protocol = self.get_variables()["ContainerProtocol"]
         if container_protocol and not self.container_port:
@@ -190,7 +588,7 @@ class BaseECSTask(Blueprint):
                              "ContainerProtocol")
         return container_protocol
 
-    @property
+    @variable_property
     def container_port_mappings(self):
         mappings = NoValue
         if self.container_port:
@@ -202,7 +600,7 @@ class BaseECSTask(Blueprint):
             mappings = [ecs.PortMapping(**kwargs)]
         return mappings
 
-    @property
+    @variable_property
     def container_name(self):
         return self.task_name
 
@@ -248,14 +646,19 @@ class BaseECSTask(Blueprint):
     def generate_container_definition_kwargs(self):
         kwargs = {
             "Command": self.command,
-            "Cpu": self.cpu,
+            "Cpu": self.container_cpu,
+            "DependsOn": self.container_depends_on,
             "Environment": self.environment,
             "Essential": True,
             "Image": self.image,
+            "LinuxParameters": self.linux_parameters,
             "LogConfiguration": self.log_configuration,
-            "Memory": self.memory,
+            "Memory": self.container_memory,
+            "MemoryReservation": self.memory_reservation,
+            "MountPoints": self.mount_points,
             "Name": self.container_name,
             "PortMappings": self.container_port_mappings,
+            "Ulimits": self.ulimits,
         }
 
         return kwargs
@@ -265,22 +668,37 @@ class BaseECSTask(Blueprint):
             **self.generate_container_definition_kwargs()
         )
 
+    def generate_container_definitions(self):
+        containers = [self.generate_container_definition()] + self.sidecars
+        check_containers(
+            containers,
+            volumes=[v.Name for v in self.get_variables()["Volumes"] or []],
+            cpu=self.task_definition_cpu,
+            memory=self.task_definition_memory,
+        )
+        return containers
+
     def generate_task_definition_kwargs(self):
         task_role_arn = self.task_role_arn or self.task_role.GetAtt("Arn")
 
-        return {
+        kwargs = {
             "Cpu": self.task_definition_cpu,
             "Memory": self.task_definition_memory,
             "NetworkMode": self.network_mode,
             "TaskRoleArn": task_role_arn,
-            "ContainerDefinitions": [self.generate_container_definition()],
+            "ContainerDefinitions": self.generate_container_definitions(),
+            "Volumes": self.volumes,
         }
+        # Only Fargate tasks can set it.
+        if self.ephemeral_storage is not NoValue:
+            kwargs["EphemeralStorage"] = self.ephemeral_storage
+        return kwargs
 
     def create_task_definition(self):
         t = self.template
 
         self.task_definition = t.add_resource(
-            ecs.TaskDefinition(
+            TaskDefinition(
                 "TaskDefinition",
                 **self.generate_task_definition_kwargs()
             )
@@ -299,7 +717,7 @@ class SimpleECSTask(BaseECSTask):
 
 
 class SimpleFargateTask(BaseECSTask):
-    @property
+    @variable_property
     def network_mode(self):
         network_mode = self.get_variables()["NetworkMode"]
         if network_mode and network_mode != "awsvpc":
@@ -308,14 +726,66 @@ class SimpleFargateTask(BaseECSTask):
                              "by default.)")
         return "awsvpc"
 
-    @property
+    @variable_property
     def task_definition_cpu(self):
         return str(self.cpu)
 
-    @property
+    @variable_property
     def task_definition_memory(self):
         return str(self.memory)
 
+    def sidecar_total(self, *keys):
+        return sum(_container_value(sidecar, *keys)
+                   for sidecar in self.sidecars)
+
+    @variable_property
+    def container_cpu(self):
+        # The task's container gets the CPU the sidecars leave.
+        if not self.sidecars:
+            return self.cpu
+        cpu = self.cpu - self.sidecar_total("Cpu")
+        if cpu <= 0:
+            raise ValueError("The Sidecars use all of the task's %d CPU "
+                             "units." % self.cpu)
+        return cpu
+
+    @variable_property
+    def container_memory(self):
+        if not self.sidecars:
+            return self.memory
+        memory = self.memory - self.sidecar_total("Memory",
+                                                  "MemoryReservation")
+        if memory <= 0:
+            raise ValueError("The Sidecars use all of the task's %d MiB of "
+                             "memory." % self.memory)
+        return memory
+
+    @variable_property
+    def ulimits(self):
+        for ulimit in self.get_variables()["Ulimits"] or []:
+            if (ulimit.Name == "nofile" and
+                    ulimit.HardLimit > MAX_FARGATE_NOFILE):
+                raise ValueError("Fargate tasks can raise nofile to %d at "
+                                 "most." % MAX_FARGATE_NOFILE)
+        return super(SimpleFargateTask, self).ulimits
+
+    @variable_property
+    def linux_parameters(self):
+        if self.get_variables()["SharedMemorySize"]:
+            raise ValueError("Fargate tasks do not support "
+                             "SharedMemorySize.")
+        return super(SimpleFargateTask, self).linux_parameters
+
+    @variable_property
+    def ephemeral_storage(self):
+        size = self.get_variables()["EphemeralStorage"]
+        if not size:
+            return NoValue
+        if not MIN_EPHEMERAL_STORAGE <= size <= MAX_EPHEMERAL_STORAGE:
+            raise ValueError("EphemeralStorage must be from %d to %d GiB." % (
+                MIN_EPHEMERAL_STORAGE, MAX_EPHEMERAL_STORAGE))
+        return EphemeralStorage(SizeInGiB=size)
+
     def create_task_execution_role(self):
         t = self.template
 
@@ -395,7 +865,9 @@ class BaseECSApp(BaseECSTask):
             "Count": {
                 "type": int,
                 "description": "The number of instances of the task to "
-                               "create.",
+                               "create. With AutoScaling, it must be "
+                               "between MinCapacity and MaxCapacity, and "
+                               "the scalable target sets the task count.",
                 "default": 1,
             },
             "DeploymentConfiguration": {
@@ -430,32 +902,73 @@ class BaseECSApp(BaseECSTask):
                                "starts up.",
                 "default": 0,
             },
+            "CapacityProviderStrategy": {
+                "type": TroposphereType(
+                    CapacityProviderStrategyItem,
+                    optional=True,
+                    many=True,
+                ),
+                "description": "An optional list of CapacityProviderStrategy"
+                               "Item objects to place the tasks with, "
+                               "instead of the launch type. The capacity "
+                               "providers must be associated with the "
+                               "Cluster.",
+                "default": None,
+            },
+            "ServiceDiscovery": {
+                "type": dict,
+                "description": "If set, registers the service's tasks in "
+                               "Cloud Map, so callers resolve them directly "
+                               "instead of going through a load balancer. "
+                               "Either NamespaceId, an existing private DNS "
+                               "namespace, or NamespaceName and VpcId, to "
+                               "create one. Optional keys: Name (defaults "
+                               "to AppName), RecordTypes (A for awsvpc "
+                               "tasks, SRV otherwise), TTL (default 10) and "
+                               "FailureThreshold (default 1).",
+                "default": {},
+            },
+            "AutoScaling": {
+                "type": dict,
+                "description": "If set, scales the service's task count "
+                               "between MinCapacity and MaxCapacity with "
+                               "target tracking policies on the average "
+                               "CPUTarget and MemoryTarget utilization "
+                               "(percent), and the RequestCountTarget per "
+                               "task of the target group in "
+                               "RequestCountResourceLabel. Optional keys: "
+                               "ScaleInCooldown and ScaleOutCooldown "
+                               "(seconds), DisableScaleIn, RoleArn and "
+                               "ScheduledActions, a list of Name, Schedule "
+                               "and the MinCapacity/MaxCapacity to set.",
+                "default": {},
+            },
         }
 
         variables.update(extra_vars)
         return variables
 
-    @property
+    @variable_property
     def app_name(self):
         return self.get_variables()["AppName"]
 
-    @property
+    @variable_property
     def cluster(self):
         return self.get_variables()["Cluster"]
 
-    @property
+    @variable_property
     def count(self):
         return self.get_variables()["Count"]
 
-    @property
+    @variable_property
     def deployment_configuration(self):
         return self.get_variables()["DeploymentConfiguration"] or NoValue
 
-    @property
+    @variable_property
     def placement_constraints(self):
         return self.get_variables()["PlacementConstraints"] or NoValue
 
-    @property
+    @variable_property
     def load_balancer_target_group_arns(self):
         arns = self.get_variables()["LoadBalancerTargetGroupArns"]
         if arns and not self.container_port:
@@ -475,7 +988,7 @@ class BaseECSApp(BaseECSTask):
             )
         return load_balancers or NoValue
 
-    @property
+    @variable_property
     def health_check_grace_period_seconds(self):
         grace_period = self.get_variables()["HealthCheckGracePeriodSeconds"]
         if grace_period and self.generate_load_balancers() is NoValue:
@@ -483,47 +996,289 @@ class BaseECSApp(BaseECSTask):
                              "without specifying LoadBalancers")
         return grace_period or NoValue
 
-    @property
+    @variable_property
+    def auto_scaling(self):
+        config = self.get_variables()["AutoScaling"]
+        if not config:
+            return config
+
+        unknown = set(config) - AUTOSCALING_KEYS
+        if unknown:
+            raise ValueError("Unknown AutoScaling key(s): %s" % ", ".join(
+                sorted(unknown)))
+        for key in ("MinCapacity", "MaxCapacity"):
+            if key not in config:
+                raise ValueError("AutoScaling requires %s." % key)
+        if config["MinCapacity"] > config["MaxCapacity"]:
+            raise ValueError("AutoScaling MinCapacity (%s) is more than "
+                             "MaxCapacity (%s)." % (config["MinCapacity"],
+                                                    config["MaxCapacity"]))
+        if not config["MinCapacity"] <= self.count <= config["MaxCapacity"]:
+            raise ValueError("Count (%s) is not between AutoScaling "
+                             "MinCapacity (%s) and MaxCapacity (%s)." % (
+                                 self.count, config["MinCapacity"],
+                                 config["MaxCapacity"]))
+        if not (config.get("ScheduledActions") or
+                any(key in config for key, _, _ in TARGET_TRACKING_POLICIES)):
+            raise ValueError("AutoScaling requires a target (CPUTarget, "
+                             "MemoryTarget or RequestCountTarget) or "
+                             "ScheduledActions.")
+        if "RequestCountTarget" in config:
+            if not config.get("RequestCountResourceLabel"):
+                raise ValueError("AutoScaling RequestCountTarget requires "
+                                 "RequestCountResourceLabel.")
+            if self.generate_load_balancers() is NoValue:
+                raise ValueError("AutoScaling RequestCountTarget requires "
+                                 "LoadBalancerTargetGroupArns.")
+        return config
+
+    @variable_property
+    def service_discovery(self):
+        config = self.get_variables()["ServiceDiscovery"]
+        if not config:
+            return config
+
+        unknown = set(config) - SERVICE_DISCOVERY_KEYS
+        if unknown:
+            raise ValueError("Unknown ServiceDiscovery key(s): %s" %
+                             ", ".join(sorted(unknown)))
+        if bool(config.get("NamespaceId")) == bool(
+                config.get("NamespaceName")):
+            raise ValueError("ServiceDiscovery requires either NamespaceId "
+                             "or NamespaceName.")
+        if config.get("NamespaceName") and not config.get("VpcId"):
+            raise ValueError("ServiceDiscovery NamespaceName requires "
+                             "VpcId.")
+
+        awsvpc = self.network_mode == "awsvpc"
+        record_types = config.get("RecordTypes") or (
+            ["A"] if awsvpc else ["SRV"])
+        for record_type in record_types:
+            if record_type not in ("A", "SRV"):
+                raise ValueError("ServiceDiscovery RecordTypes can only be A "
+                                 "or SRV, not %s." % record_type)
+        if "A" in record_types and not awsvpc:
+            raise ValueError("ServiceDiscovery A records require the awsvpc "
+                             "NetworkMode, use SRV records.")
+        if "SRV" in record_types and not self.container_port:
+            raise ValueError("ServiceDiscovery SRV records require "
+                             "ContainerPort.")
+        return dict(config, RecordTypes=record_types)
+
+    @variable_property
+    def cluster_name(self):
+        # Scalable targets need the cluster name, not its ARN.
+        return self.cluster.split(":cluster/")[-1]
+
+    @variable_property
+    def capacity_providers(self):
+        """The capacity providers CapacityProviderStrategy may use, or None
+        for any."""
+        return None
+
+    @variable_property
+    def capacity_provider_strategy(self):
+        strategy = self.get_variables()["CapacityProviderStrategy"]
+        if not strategy:
+            return NoValue
+        check_capacity_provider_strategy(strategy, self.capacity_providers)
+        return strategy
+
+    @variable_property
     def launch_type(self):
         return "EC2"
 
-    @property
+    @variable_property
     def network_configuration(self):
         return NoValue
 
-    @property
+    @variable_property
     def log_group_name(self):
         return self.app_name
 
     def generate_service_kwargs(self):
         grace_period = self.health_check_grace_period_seconds
+        strategy = self.capacity_provider_strategy
+        # A service sets either a capacity provider strategy or a launch type.
+        launch_type = self.launch_type if strategy is NoValue else NoValue
+        # Every deploy would reset the task count auto scaling has set.
+        count = NoValue if self.auto_scaling else self.count
 
         config = {
+            "CapacityProviderStrategy": strategy,
             "Cluster": self.cluster,
             "DeploymentConfiguration": self.deployment_configuration,
-            "DesiredCount": self.count,
+            "DesiredCount": count,
             "HealthCheckGracePeriodSeconds": grace_period,
-            "LaunchType": self.launch_type,
+            "LaunchType": launch_type,
             "LoadBalancers": self.generate_load_balancers(),
             "NetworkConfiguration": self.network_configuration,
             "PlacementConstraints": self.placement_constraints,
+            "ServiceRegistries": self.generate_service_registries(),
             "TaskDefinition": self.task_definition.Ref(),
         }
 
         return config
 
+    def create_service_discovery(self):
+        config = self.service_discovery
+        if not config:
+            return
+
+        t = self.template
+
+        namespace_id = config.get("NamespaceId")
+        if not namespace_id:
+            namespace = t.add_resource(
+                servicediscovery.PrivateDnsNamespace(
+                    "ServiceDiscoveryNamespace",
+                    Name=config["NamespaceName"],
+                    Vpc=config["VpcId"],
+                )
+            )
+            namespace_id = namespace.Ref()
+
+            self.add_output("ServiceDiscoveryNamespaceId", namespace_id)
+            self.add_output("ServiceDiscoveryNamespaceArn",
+                            namespace.GetAtt("Arn"))
+            self.add_output("ServiceDiscoveryHostedZoneId",
+                            namespace.GetAtt("HostedZoneId"))
+
+        self.discovery_service = t.add_resource(
+            servicediscovery.Service(
+                "ServiceDiscoveryService",
+                Name=config.get("Name", self.app_name),
+                DnsConfig=servicediscovery.DnsConfig(
+                    NamespaceId=namespace_id,
+                    RoutingPolicy="MULTIVALUE",
+                    DnsRecords=[
+                        servicediscovery.DnsRecord(
+                            Type=record_type,
+                            TTL=str(config.get("TTL", 10)),
+                        )
+                        for record_type in config["RecordTypes"]
+                    ],
+                ),
+                HealthCheckCustomConfig=(
+                    servicediscovery.HealthCheckCustomConfig(
+                        FailureThreshold=float(
+                            config.get("FailureThreshold", 1)),
+                    )
+                ),
+            )
+        )
+
+        self.add_output("ServiceDiscoveryServiceArn",
+                        self.discovery_service.GetAtt("Arn"))
+        self.add_output("ServiceDiscoveryServiceId",
+                        self.discovery_service.Ref())
+        if config.get("NamespaceName"):
+            self.add_output("ServiceDiscoveryName", "%s.%s" % (
+                config.get("Name", self.app_name), config["NamespaceName"]))
+
+    def generate_service_registries(self):
+        config = self.service_discovery
+        if not config:
+            return NoValue
+
+        kwargs = {"RegistryArn": self.discovery_service.GetAtt("Arn")}
+        if "SRV" in config["RecordTypes"]:
+            kwargs["ContainerName"] = self.container_name
+            kwargs["ContainerPort"] = self.container_port
+        return [ecs.ServiceRegistry(**kwargs)]
+
     def create_service(self):
         t = self.template
         self.service = t.add_resource(
-            ecs.Service("Service", **self.generate_service_kwargs())
+            ECSService("Service", **self.generate_service_kwargs())
         )
 
         self.add_output("ServiceArn", self.service.Ref())
         self.add_output("ServiceName", self.service.GetAtt("Name"))
 
+    def generate_scheduled_actions(self):
+        actions = []
+        for action in self.auto_scaling.get("ScheduledActions", []):
+            for key in ("Name", "Schedule"):
+                if key not in action:
+                    raise ValueError("AutoScaling ScheduledActions require "
+                                     "%s." % key)
+            actions.append(
+                aas.ScheduledAction(
+                    ScheduledActionName=action["Name"],
+                    Schedule=action["Schedule"],
+                    StartTime=action.get("StartTime", NoValue),
+                    EndTime=action.get("EndTime", NoValue),
+                    ScalableTargetAction=aas.ScalableTargetAction(
+                        MinCapacity=action.get("MinCapacity", NoValue),
+                        MaxCapacity=action.get("MaxCapacity", NoValue),
+                    ),
+                )
+            )
+        return actions or NoValue
+
+    def create_auto_scaling(self):
+        config = self.auto_scaling
+        if not config:
+            return
+
+        t = self.template
+
+        self.scalable_target = t.add_resource(
+            aas.ScalableTarget(
+                "ScalableTarget",
+                MinCapacity=config["MinCapacity"],
+                MaxCapacity=config["MaxCapacity"],
+                ResourceId=Sub(
+                    "service/%s/${Name}" % self.cluster_name,
+                    Name=self.service.GetAtt("Name"),
+                ),
+                RoleARN=config.get("RoleArn", ECS_AUTOSCALING_ROLE),
+                ScalableDimension="ecs:service:DesiredCount",
+                ServiceNamespace="ecs",
+                ScheduledActions=self.generate_scheduled_actions(),
+            )
+        )
+
+        self.add_output("ScalableTargetId", self.scalable_target.Ref())
+
+        for key, title, metric in TARGET_TRACKING_POLICIES:
+            if key not in config:
+                continue
+            metric_spec = aas.PredefinedMetricSpecification(
+                PredefinedMetricType=metric,
+            )
+            if metric == "ALBRequestCountPerTarget":
+                metric_spec.ResourceLabel = config["RequestCountResourceLabel"]
+
+            policy = t.add_resource(
+                aas.ScalingPolicy(
+                    title,
+                    PolicyName=Sub("${AWS::StackName}-%s" % title),
+                    PolicyType="TargetTrackingScaling",
+                    ScalingTargetId=self.scalable_target.Ref(),
+                    TargetTrackingScalingPolicyConfiguration=(
+                        aas.TargetTrackingScalingPolicyConfiguration(
+                            TargetValue=float(config[key]),
+                            ScaleInCooldown=config.get("ScaleInCooldown",
+                                                       NoValue),
+                            ScaleOutCooldown=config.get("ScaleOutCooldown",
+                                                        NoValue),
+                            DisableScaleIn=config.get("DisableScaleIn",
+                                                      NoValue),
+                            PredefinedMetricSpecification=metric_spec,
+                        )
+                    ),
+                )
+            )
+
+            self.add_output("%sArn" % title, policy.Ref())
+
     def create_template(self):
         super(BaseECSApp, self).create_template()
+        self.create_service_discovery()
         self.create_service()
+        self.create_auto_scaling()
 
 
 class SimpleFargateApp(BaseECSApp, SimpleFargateTask):
@@ -545,19 +1300,23 @@ class SimpleFargateApp(BaseECSApp, SimpleFargateTask):
         variables.update(additional_variables)
         return variables
 
-    @property
+    @variable_property
     def subnets(self):
         return self.get_variables()["Subnets"]
 
-    @property
+    @variable_property
     def security_group(self):
         return self.get_variables()["SecurityGroup"]
 
-    @property
+    @variable_property
+    def capacity_providers(self):
+        return FARGATE_CAPACITY_PROVIDERS
+
+    @variable_property
     def launch_type(self):
         return "FARGATE"
 
-    @property
+    @variable_property
     def network_configuration(self):
         return ecs.NetworkConfiguration(
             AwsvpcConfiguration=ecs.AwsvpcConfiguration(
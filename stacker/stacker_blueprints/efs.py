@@ -1,7 +1,7 @@
 from troposphere import ec2, efs
 from troposphere import Join, Output, Ref, Tags
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import TroposphereType
 from stacker.exceptions import ValidatorError
 
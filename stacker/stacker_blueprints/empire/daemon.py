@@ -30,7 +30,7 @@ from awacs.helpers.trust import (
     get_ecs_assumerole_policy,
 )
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import (
     CFNCommaDelimitedList,
     CFNNumber,
@@ -48,6 +48,7 @@ from .policies import (
     runlogs_policy,
     logstream_policy,
 )
+from ..policy_optimizer import optimize_policy
 
 ELB_SG_NAME = "ELBSecurityGroup"
 EVENTS_TOPIC = "EventsTopic"
@@ -268,6 +269,9 @@ class EmpireDaemon(Blueprint):
         }
     }
 
+    # Opt-in: collapse complete action lists of AccessPolicy to wildcards.
+    POLICY_WILDCARDS = False
+
     def create_template(self):
         self.create_conditions()
         self.create_security_groups()
@@ -544,7 +548,7 @@ class EmpireDaemon(Blueprint):
             PolicyType(
                 "AccessPolicy",
                 PolicyName="empire",
-                PolicyDocument=empire_policy({
+                PolicyDocument=optimize_policy(empire_policy({
                     "Environment": Ref("Environment"),
                     "CustomResourcesTopic": Ref("CustomResourcesTopic"),
                     "CustomResourcesQueue": (
@@ -555,7 +559,8 @@ class EmpireDaemon(Blueprint):
                             "",
                             ["arn:aws:s3:::", Ref("TemplateBucket"), "/*"]
                         )
-                    )}),
+                    )}), "%s AccessPolicy" % self.name,
+                    self.POLICY_WILDCARDS),
                 Roles=[Ref("InstanceRole")]))
 
         t.add_resource(sns.Topic(
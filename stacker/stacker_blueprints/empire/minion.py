@@ -1,5 +1,4 @@
 import logging
-import copy
 
 from troposphere import Ref, Output, GetAtt, Tags, FindInMap, If, Equals
 from troposphere import ec2, autoscaling, ecs
@@ -193,12 +192,17 @@ class EmpireMinion(EmpireBase):
         # only done here to maintain backwards compatability for minion
         # clusters.
         ns = self.context.namespace
-        base_policies = [
-            Policy(
-                PolicyName="%s-ecs-agent" % ns,
-                PolicyDocument=ecs_agent_policy()),
-        ]
-        with_logging = copy.deepcopy(base_policies)
+
+        def ecs_agent_policies():
+            # awacs objects cannot be deep copied, so build the list twice.
+            return [
+                Policy(
+                    PolicyName="%s-ecs-agent" % ns,
+                    PolicyDocument=ecs_agent_policy()),
+            ]
+
+        base_policies = ecs_agent_policies()
+        with_logging = ecs_agent_policies()
         with_logging.append(
             Policy(
                 PolicyName="%s-kinesis-logging" % ns,
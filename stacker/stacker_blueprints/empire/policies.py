@@ -1,21 +1,5 @@
 import logging
 
-from awacs import (
-    awslambda,
-    ecs,
-    ec2,
-    events,
-    iam,
-    route53,
-    kinesis,
-    sns,
-    logs,
-    sqs,
-    s3,
-    cloudformation,
-    elasticloadbalancing as elb,
-    ecr,
-)
 from awacs.aws import (
     Statement,
     Allow,
@@ -31,10 +15,14 @@ from troposphere import (
     Join,
 )
 
+from ..policies import memoized_policy
+
 logger = logging.getLogger(__name__)
 
 
+@memoized_policy
 def ecs_agent_policy():
+    from awacs import ecs, ecr
     p = Policy(
         Statement=[
             Statement(
@@ -64,7 +52,9 @@ def ecs_agent_policy():
     return p
 
 
+@memoized_policy
 def service_role_policy():
+    from awacs import ec2, elasticloadbalancing as elb
     p = Policy(
         Statement=[
             Statement(
@@ -85,7 +75,23 @@ def service_role_policy():
     return p
 
 
+@memoized_policy
 def empire_policy(resources):
+    from awacs import (
+        awslambda,
+        ecs,
+        ec2,
+        events,
+        iam,
+        route53,
+        kinesis,
+        sns,
+        sqs,
+        s3,
+        cloudformation,
+        elasticloadbalancing as elb,
+        ecr,
+    )
     p = Policy(
         Statement=[
             Statement(
@@ -230,7 +236,9 @@ def empire_policy(resources):
     return p
 
 
+@memoized_policy
 def sns_events_policy(topic_arn):
+    from awacs import sns
     p = Policy(
         Statement=[
             Statement(
@@ -242,8 +250,10 @@ def sns_events_policy(topic_arn):
     return p
 
 
+@memoized_policy
 def logstream_policy():
     """Policy needed for logspout -> kinesis log streaming."""
+    from awacs import kinesis
     p = Policy(
         Statement=[
             Statement(
@@ -257,8 +267,10 @@ def logstream_policy():
     return p
 
 
+@memoized_policy
 def runlogs_policy(log_group_ref):
     """Policy needed for Empire -> Cloudwatch logs to record run output."""
+    from awacs import logs
     p = Policy(
         Statement=[
             Statement(
@@ -275,7 +287,9 @@ def runlogs_policy(log_group_ref):
     return p
 
 
+@memoized_policy
 def sns_to_sqs_policy(topic):
+    from awacs import sqs
     p = Policy(
         Statement=[
             Statement(
@@ -0,0 +1,84 @@
+"""Interface VPC endpoints, shared by the VPC and Network blueprints."""
+import re
+
+from troposphere import Output, Sub
+from troposphere import ec2
+
+INTERFACE_ENDPOINT_SG = "InterfaceEndpointSecurityGroup"
+
+
+def interface_endpoint_title(service):
+    """The logical id of the interface endpoint of a service, e.g.
+    ``EcrApiInterfaceEndpoint`` for ``ecr.api`` or
+    ``com.amazonaws.us-east-1.ecr.api``.
+    """
+    service = re.sub(r"^com\.amazonaws\.[a-z0-9-]+\.", "", service)
+    words = re.split(r"[^a-zA-Z0-9]+", service)
+    return "%sInterfaceEndpoint" % "".join(
+        word[:1].upper() + word[1:] for word in words)
+
+
+def interface_endpoint_service_name(service):
+    """The full service name of an endpoint service: ``logs`` becomes
+    ``com.amazonaws.<region>.logs``, full names are kept.
+    """
+    if service.startswith("com.") or service.startswith("aws."):
+        return service
+    return Sub("com.amazonaws.${AWS::Region}.%s" % service)
+
+
+def add_interface_endpoint_security_group(template, vpc_id, cidr_block):
+    """Adds the security group of interface endpoints, allowing HTTPS from
+    ``cidr_block``.
+    """
+    group = template.add_resource(
+        ec2.SecurityGroup(
+            INTERFACE_ENDPOINT_SG,
+            VpcId=vpc_id,
+            GroupDescription="Interface VPC Endpoints",
+            SecurityGroupIngress=[
+                ec2.SecurityGroupRule(
+                    IpProtocol="tcp", FromPort=443, ToPort=443,
+                    CidrIp=cidr_block,
+                ),
+            ],
+        )
+    )
+    template.add_output(
+        Output("InterfaceEndpointSecurityGroupId", Value=group.Ref()))
+    return group
+
+
+def add_interface_endpoints(template, services, vpc_id, subnet_ids,
+                            security_group_ids):
+    """Adds an interface endpoint, with private DNS, for each service.
+
+    Args:
+        template (:class:`troposphere.Template`): The template to add to.
+        services (list): Service names, either short (``ecr.api``) or full
+            (``com.amazonaws.us-east-1.ecr.api``).
+        vpc_id: The VPC of the endpoints.
+        subnet_ids (list): The subnets the endpoints are placed in.
+        security_group_ids (list): The security groups of the endpoints.
+
+    Raises:
+        ValueError: If two services have the same logical id.
+    """
+    titles = {}
+    for service in services:
+        title = interface_endpoint_title(service)
+        if titles.setdefault(title, service) != service:
+            raise ValueError("Interface endpoints %s and %s would both be "
+                             "named %s." % (titles[title], service, title))
+        endpoint = template.add_resource(
+            ec2.VPCEndpoint(
+                title,
+                VpcEndpointType="Interface",
+                PrivateDnsEnabled=True,
+                ServiceName=interface_endpoint_service_name(service),
+                SubnetIds=subnet_ids,
+                SecurityGroupIds=security_group_ids,
+                VpcId=vpc_id,
+            )
+        )
+        template.add_output(Output("%sId" % title, Value=endpoint.Ref()))
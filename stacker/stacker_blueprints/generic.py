@@ -2,7 +2,7 @@ from troposphere import (
     Ref, Output
 )
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.util import load_object_from_string
 
 
@@ -1,4 +1,5 @@
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
+from stacker_blueprints.policy_optimizer import optimize_policy
 
 from troposphere import (
     GetAtt,
@@ -17,6 +18,10 @@ from awacs.helpers.trust import (
 
 class RoleBaseBlueprint(Blueprint):
 
+    # Set on a subclass to let policy_optimizer collapse complete action
+    # lists to wildcards, which also grant actions AWS adds later.
+    POLICY_WILDCARDS = False
+
     def __init__(self, *args, **kwargs):
         super(RoleBaseBlueprint, self).__init__(*args, **kwargs)
         self.roles = []
@@ -62,8 +67,10 @@ class RoleBaseBlueprint(Blueprint):
             iam.PolicyType(
                 logical_name,
                 PolicyName=policy_name,
-                PolicyDocument=Policy(
-                    Statement=statements,
+                PolicyDocument=optimize_policy(
+                    Policy(Statement=statements),
+                    "%s %s" % (self.name, logical_name),
+                    self.POLICY_WILDCARDS,
                 ),
                 Roles=[Ref(role) for role in self.roles],
             )
@@ -1,4 +1,4 @@
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import TroposphereType
 
 from troposphere import (
@@ -8,7 +8,7 @@ from troposphere import (
     kinesis,
 )
 
-from policies import (
+from .policies import (
     kinesis_stream_arn,
     read_only_kinesis_stream_policy,
     read_write_kinesis_stream_policy,
@@ -16,7 +16,7 @@ from troposphere import (
     kms,
 )
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 
 logger = logging.getLogger(__name__)
 
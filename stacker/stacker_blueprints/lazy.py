@@ -0,0 +1,65 @@
+"""Lazy loading of the troposphere and awacs service modules.
+
+Blueprints import a lot of service modules (``from troposphere import ec2``,
+``import awacs.logs``), and building the hundreds of awacs actions and
+troposphere classes in each of them is a noticeable part of importing a
+blueprint. :func:`install` adds an import hook that still creates those
+modules on import, but only executes them on first attribute access, so a
+module that is imported but never used costs next to nothing.
+
+The hook is opt-in: it is installed when :mod:`stacker_blueprints` is
+imported with ``STACKER_BLUEPRINTS_LAZY_IMPORTS`` set. ``LazyLoader`` is not
+thread-safe on the Pythons this package supports. Two threads touching the
+same half-loaded module can see it without its attributes, so never enable it
+for ``stacker build``, which renders stacks on threads. The render command is
+safe with it, because it renders on processes.
+"""
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+LAZY_IMPORTS_ENV = "STACKER_BLUEPRINTS_LAZY_IMPORTS"
+
+LAZY_PACKAGES = ("awacs", "troposphere")
+
+
+class LazyServiceFinder(importlib.abc.MetaPathFinder):
+    """Wraps the loader of submodules of ``packages`` in a LazyLoader.
+
+    Packages themselves (such as ``awacs.helpers``) are still loaded eagerly,
+    only plain modules are deferred.
+    """
+
+    def __init__(self, packages=LAZY_PACKAGES):
+        self.packages = packages
+
+    def find_spec(self, fullname, path, target=None):
+        package, _, submodule = fullname.partition(".")
+        if not submodule or package not in self.packages:
+            return None
+
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if (spec.submodule_search_locations is not None or
+                not hasattr(spec.loader, "exec_module")):
+            return spec
+        spec.loader = importlib.util.LazyLoader(spec.loader)
+        return spec
+
+
+def install(packages=LAZY_PACKAGES):
+    """Installs the lazy import hook, if it is enabled and not installed."""
+    if not os.environ.get(LAZY_IMPORTS_ENV):
+        return
+    for finder in sys.meta_path:
+        if isinstance(finder, LazyServiceFinder):
+            return
+    sys.meta_path.insert(0, LazyServiceFinder(packages))
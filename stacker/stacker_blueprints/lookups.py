@@ -0,0 +1,249 @@
+"""A batched, cached replacement for stacker's ``output`` lookup.
+
+Register it in a stacker config, under its own name or in place of
+``output``::
+
+    lookups:
+      output: stacker_blueprints.lookups.BatchedOutputLookup
+
+Lookups of stacks built in this run are served from the outputs stacker
+already holds, like ``output`` does. The first lookup of any other stack, as
+in ``stacker diff`` or a build of a subset of stacks, prefetches the outputs
+of every stack the config references in one paginated DescribeStacks pass,
+instead of one DescribeStacks call per stack. The outputs are kept for the
+rest of the run.
+
+Pointing ``STACKER_BLUEPRINTS_OUTPUT_CACHE_DIR`` at a directory also keeps
+the fetched outputs on disk for ``STACKER_BLUEPRINTS_OUTPUT_CACHE_TTL``
+seconds (300 by default), so repeated dry runs make no call at all. The
+number of lookups served this way, and of the DescribeStacks calls they
+took, is logged at exit.
+"""
+import atexit
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+from stacker.exceptions import StackDoesNotExist
+from stacker.lookups.handlers.output import OutputLookup, deconstruct
+from stacker.lookups.registry import LOOKUP_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_CACHE_DIR_ENV = "STACKER_BLUEPRINTS_OUTPUT_CACHE_DIR"
+OUTPUT_CACHE_TTL_ENV = "STACKER_BLUEPRINTS_OUTPUT_CACHE_TTL"
+
+DEFAULT_TTL = 300
+
+_lock = threading.RLock()
+
+# The outputs fetched in this run, by region, then by stack fqn.
+_outputs = {}
+
+# The regions the referenced stacks were already prefetched in.
+_prefetched = set()
+
+# The lookups served by the cache, the stacks they read, the stacks read
+# from the on-disk cache and the DescribeStacks calls made.
+_stats = {"lookups": 0, "stacks": set(), "disk": set(), "calls": 0}
+
+
+class OutputCache(object):
+    """Stack outputs stored as ``outputs-<region>.json`` files in ``path``.
+
+    Args:
+        path (str): The cache directory. Created if it does not exist.
+        ttl (int, optional): The seconds outputs are served for.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _entry(self, region):
+        return os.path.join(self.path, "outputs-%s.json" % (
+            region or "default"))
+
+    def _read(self, region):
+        try:
+            with open(self._entry(region)) as fd:
+                return json.load(fd)
+        except (IOError, ValueError):
+            return {}
+
+    def get(self, region):
+        """Returns the outputs, by stack fqn, fetched less than ``ttl``
+        seconds ago.
+        """
+        oldest = time.time() - self.ttl
+        return dict((fqn, entry["outputs"])
+                    for fqn, entry in self._read(region).items()
+                    if entry["fetched"] >= oldest)
+
+    def set(self, region, outputs):
+        """Caches the outputs of stacks, keyed by stack fqn."""
+        entries = self._read(region)
+        now = time.time()
+        for fqn, stack_outputs in outputs.items():
+            entries[fqn] = {"fetched": now, "outputs": stack_outputs}
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, sort_keys=True)
+        os.replace(tmp, self._entry(region))
+
+
+def get_output_cache():
+    """Returns the cache configured in the environment, or None."""
+    path = os.environ.get(OUTPUT_CACHE_DIR_ENV)
+    if not path:
+        return None
+    return OutputCache(path, int(os.environ.get(OUTPUT_CACHE_TTL_ENV,
+                                                DEFAULT_TTL)))
+
+
+def output_dict(stack):
+    """The outputs of a DescribeStacks stack, keyed by output name."""
+    return dict((output["OutputKey"], output["OutputValue"])
+                for output in stack.get("Outputs", []))
+
+
+def referenced_stacks(context, handler):
+    """The fqns of the stacks read by the lookups of the stacks of a config
+    that are handled by ``handler``.
+    """
+    types = [name for name, registered in LOOKUP_HANDLERS.items()
+             if registered is handler]
+    if not types:
+        return set()
+    pattern = re.compile(r"\$\{(?:%s)\s+([^:}\s]+)::" % "|".join(
+        re.escape(name) for name in types))
+    found = set()
+    for stack in context.get_stacks():
+        for variable in stack.variables:
+            found.update(pattern.findall(
+                json.dumps(variable._raw_value, default=str)))
+    return set(context.get_fqn(name) for name in found)
+
+
+def fetch_outputs(client, fqns):
+    """Fetches the outputs of stacks in as few DescribeStacks calls as
+    possible.
+
+    Every stack of the region is listed, 100 per call, until all of
+    ``fqns`` were seen.
+
+    Returns:
+        dict: The outputs of the stacks found, keyed by fqn.
+    """
+    found = {}
+    wanted = set(fqns)
+    paginator = client.get_paginator("describe_stacks")
+    for page in paginator.paginate():
+        _stats["calls"] += 1
+        for stack in page["Stacks"]:
+            if stack["StackName"] in wanted:
+                found[stack["StackName"]] = output_dict(stack)
+        if wanted <= set(found):
+            break
+    return found
+
+
+def _load(provider, fqn, referenced):
+    region = provider.region
+    outputs = _outputs.setdefault(region, {})
+    cache = get_output_cache()
+    if fqn not in outputs and cache is not None:
+        for cached_fqn, cached in cache.get(region).items():
+            if cached_fqn not in outputs:
+                outputs[cached_fqn] = cached
+                _stats["disk"].add((region, cached_fqn))
+    if fqn in outputs:
+        return outputs[fqn]
+
+    if region in _prefetched:
+        _stats["calls"] += 1
+        fetched = {fqn: output_dict(provider.get_stack(fqn))}
+    else:
+        _prefetched.add(region)
+        wanted = (referenced() | set([fqn])) - set(outputs)
+        fetched = fetch_outputs(provider.cloudformation, wanted)
+    outputs.update(fetched)
+    if cache is not None and fetched:
+        cache.set(region, fetched)
+    if fqn not in outputs:
+        raise StackDoesNotExist(fqn)
+    return outputs[fqn]
+
+
+def saved_calls():
+    """The DescribeStacks calls saved, compared to one call per lookup."""
+    return max(_stats["lookups"] - _stats["calls"], 0)
+
+
+def report():
+    """Logs how many DescribeStacks calls the lookups took."""
+    if not _stats["lookups"]:
+        return
+    disk = len(_stats["disk"] & _stats["stacks"])
+    logger.info(
+        "Resolved %d output lookup(s) of %d stack(s) with %d DescribeStacks "
+        "call(s), %d stack(s) read from the output cache: %d call(s) "
+        "saved.", _stats["lookups"], len(_stats["stacks"]), _stats["calls"],
+        disk, saved_calls())
+
+
+def reset():
+    """Forgets the outputs fetched so far, and the counts."""
+    with _lock:
+        _outputs.clear()
+        _prefetched.clear()
+        _stats["lookups"] = _stats["calls"] = 0
+        _stats["stacks"].clear()
+        _stats["disk"].clear()
+
+
+atexit.register(report)
+
+
+class BatchedOutputLookup(OutputLookup):
+    """``output``, with the outputs of stacks outside of this run fetched
+    in batch and cached.
+    """
+
+    @classmethod
+    def handle(cls, value, context=None, provider=None, **kwargs):
+        """Fetch an output from the designated stack.
+
+        Args:
+            value (str): string with the following format:
+                <stack_name>::<output_name>, ie. some-stack::SomeOutput
+            context (:class:`stacker.context.Context`): stacker context
+            provider (:class:`stacker.provider.base.BaseProvider`): subclass
+                of the base provider
+
+        Returns:
+            str: output from the specified stack
+        """
+        if context is None:
+            raise ValueError("Context is required")
+        if provider is None:
+            raise ValueError("Provider is required")
+
+        d = deconstruct(value)
+        stack = context.get_stack(d.stack_name)
+        if stack is not None and stack.outputs is not None:
+            return stack.outputs[d.output_name]
+
+        fqn = context.get_fqn(d.stack_name)
+        with _lock:
+            _stats["lookups"] += 1
+            _stats["stacks"].add((provider.region, fqn))
+            outputs = _load(provider, fqn,
+                            lambda: referenced_stacks(context, cls))
+        return outputs[d.output_name]
@@ -6,7 +6,18 @@ from troposphere import (
 )
 from troposphere import ec2
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint, variable_property
+from stacker_blueprints.endpoints import (
+    add_interface_endpoint_security_group,
+    add_interface_endpoints,
+)
+from stacker_blueprints.subnets import (
+    DEFAULT_PRIVATE_PREFIX,
+    DEFAULT_PUBLIC_PREFIX,
+    ipv6_cidr_block,
+    ipv6_subnet_index,
+    network_cidr_block,
+)
 
 
 class Network(Blueprint):
@@ -45,7 +56,51 @@ class Network(Blueprint):
         },
         "CidrBlock": {
             "type": str,
-            "description": "The cidr network range to assign the subnet.",
+            "description": "The cidr network range to assign the subnet. "
+                           "If empty, the subnet of AZIndex is allocated "
+                           "from VpcCidrBlock.",
+            "default": "",
+        },
+        "AZIndex": {
+            "type": int,
+            "description": "The index of the Availability Zone of this "
+                           "network, from 0, used to allocate its subnet "
+                           "from VpcCidrBlock when CidrBlock is empty. See "
+                           "stacker_blueprints.subnets.",
+            "default": -1,
+        },
+        "Ipv6CidrBlock": {
+            "type": str,
+            "description": "The IPv6 /64 to assign the subnet. If empty, "
+                           "and VpcIpv6CidrBlock is set, the /64 of AZIndex "
+                           "is used.",
+            "default": "",
+        },
+        "VpcIpv6CidrBlock": {
+            "type": str,
+            "description": "The IPv6 block of the VPC, to give the subnet "
+                           "the /64 of AZIndex from. See "
+                           "stacker_blueprints.subnets.",
+            "default": "",
+        },
+        "EgressOnlyInternetGatewayId": {
+            "type": str,
+            "description": "If defined on a private network with an IPv6 "
+                           "block, its IPv6 default route goes through this "
+                           "egress only internet gateway instead of the nat "
+                           "gateway. Public networks route IPv6 through the "
+                           "internet gateway.",
+            "default": "",
+        },
+        "PrivateSubnetPrefix": {
+            "type": int,
+            "description": "The prefix length of allocated private subnets.",
+            "default": DEFAULT_PRIVATE_PREFIX,
+        },
+        "PublicSubnetPrefix": {
+            "type": int,
+            "description": "The prefix length of allocated public subnets.",
+            "default": DEFAULT_PUBLIC_PREFIX,
         },
         "Tags": {
             "type": dict,
@@ -53,35 +108,87 @@ class Network(Blueprint):
                            "resources that accept tags.",
             "default": {},
         },
+        "InterfaceEndpoints": {
+            "type": list,
+            "description": "Services to create interface endpoints for, "
+                           "with private DNS, e.g. ecr.api, logs or sqs. "
+                           "Only one endpoint per service can have private "
+                           "DNS in a VPC, so set this on a single private "
+                           "network, and pass the other private subnets in "
+                           "InterfaceEndpointSubnetIds.",
+            "default": [],
+        },
+        "InterfaceEndpointSubnetIds": {
+            "type": list,
+            "description": "Other subnets to place the interface endpoints "
+                           "in, besides this network's subnet.",
+            "default": [],
+        },
+        "InterfaceEndpointSecurityGroupId": {
+            "type": str,
+            "description": "The security group of the interface endpoints, "
+                           "e.g. the one of VPC2. If not set, one allowing "
+                           "HTTPS from VpcCidrBlock is created.",
+            "default": "",
+        },
+        "VpcCidrBlock": {
+            "type": str,
+            "description": "The CidrBlock of the VPC, to allocate the subnet "
+                           "from, and allowed to reach the interface "
+                           "endpoints when their security group is created "
+                           "here.",
+            "default": "",
+        },
     }
 
-    @property
+    @variable_property
     def vpc_id(self):
         return self.get_variables()["VpcId"]
 
-    @property
+    @variable_property
     def network_type(self):
         if self.internet_gateway_id is not NoValue:
             return "public"
         return "private"
 
-    @property
+    @variable_property
     def internet_gateway_id(self):
         return self.get_variables()["InternetGatewayId"] or NoValue
 
-    @property
+    @variable_property
     def nat_gateway_id(self):
         return self.get_variables()["NatGatewayId"] or NoValue
 
-    @property
+    @variable_property
     def availability_zone(self):
         return self.get_variables()["AvailabilityZone"]
 
-    @property
+    @variable_property
     def cidr_block(self):
-        return self.get_variables()["CidrBlock"]
-
-    @property
+        variables = self.get_variables()
+        if variables["CidrBlock"]:
+            return variables["CidrBlock"]
+        return network_cidr_block(
+            variables["VpcCidrBlock"], variables["AZIndex"],
+            self.network_type, variables["PrivateSubnetPrefix"],
+            variables["PublicSubnetPrefix"])
+
+    @variable_property
+    def ipv6_cidr_block(self):
+        variables = self.get_variables()
+        if variables["Ipv6CidrBlock"]:
+            return variables["Ipv6CidrBlock"]
+        if variables["VpcIpv6CidrBlock"]:
+            return ipv6_cidr_block(
+                variables["VpcIpv6CidrBlock"],
+                ipv6_subnet_index(variables["AZIndex"], self.network_type))
+        return NoValue
+
+    @variable_property
+    def egress_only_internet_gateway_id(self):
+        return self.get_variables()["EgressOnlyInternetGatewayId"] or NoValue
+
+    @variable_property
     def tags(self):
         variables = self.get_variables()
         tag_dict = {"NetworkType": self.network_type}
@@ -102,6 +209,12 @@ class Network(Blueprint):
             )
         )
 
+        if self.ipv6_cidr_block is not NoValue:
+            self.subnet.Ipv6CidrBlock = self.ipv6_cidr_block
+            self.subnet.AssignIpv6AddressOnCreation = True
+            t.add_output(
+                Output("Ipv6CidrBlock", Value=self.ipv6_cidr_block))
+
         t.add_output(Output("SubnetId", Value=self.subnet.Ref()))
         t.add_output(Output("NetworkType", Value=self.network_type))
         t.add_output(Output("CidrBlock", Value=self.cidr_block))
@@ -207,6 +320,50 @@ class Network(Blueprint):
 
         t.add_output(Output("DefaultRouteId", Value=self.default_route.Ref()))
 
+    def create_ipv6_default_route(self):
+        t = self.template
+
+        if self.ipv6_cidr_block is NoValue:
+            return
+
+        if self.network_type == "public":
+            gateway = {"GatewayId": self.internet_gateway_id}
+        elif self.egress_only_internet_gateway_id is not NoValue:
+            gateway = {"EgressOnlyInternetGatewayId":
+                       self.egress_only_internet_gateway_id}
+        else:
+            return
+
+        self.ipv6_default_route = t.add_resource(
+            ec2.Route(
+                "Ipv6DefaultRoute",
+                RouteTableId=self.route_table.Ref(),
+                DestinationIpv6CidrBlock="::/0",
+                **gateway
+            )
+        )
+
+        t.add_output(
+            Output("Ipv6DefaultRouteId", Value=self.ipv6_default_route.Ref()))
+
+    def create_interface_endpoints(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if not variables["InterfaceEndpoints"]:
+            return
+
+        group_id = variables["InterfaceEndpointSecurityGroupId"]
+        if not group_id:
+            group_id = add_interface_endpoint_security_group(
+                t, self.vpc_id, variables["VpcCidrBlock"]).Ref()
+
+        subnet_ids = [self.subnet.Ref()]
+        subnet_ids.extend(variables["InterfaceEndpointSubnetIds"])
+        add_interface_endpoints(
+            t, variables["InterfaceEndpoints"], self.vpc_id, subnet_ids,
+            [group_id])
+
     def validate_variables(self):
         variables = self.get_variables()
         if (self.internet_gateway_id is not NoValue and
@@ -219,9 +376,36 @@ class Network(Blueprint):
             raise ValueError("Cannot specify both CreateNatGateway as True "
                              "and NatGatewayId in the same Network stack.")
 
+        if not variables["CidrBlock"] and (
+                variables["AZIndex"] < 0 or not variables["VpcCidrBlock"]):
+            raise ValueError("Either CidrBlock, or AZIndex and VpcCidrBlock "
+                             "are required.")
+
+        if (variables["VpcIpv6CidrBlock"] and
+                not variables["Ipv6CidrBlock"] and variables["AZIndex"] < 0):
+            raise ValueError("VpcIpv6CidrBlock needs AZIndex to pick the "
+                             "subnet's IPv6 block.")
+
+        if (self.egress_only_internet_gateway_id is not NoValue and
+                self.network_type == "public"):
+            raise ValueError("EgressOnlyInternetGatewayId can only be used "
+                             "in a private Network stack.")
+
+        if variables["InterfaceEndpoints"]:
+            if self.network_type != "private":
+                raise ValueError("InterfaceEndpoints can only be created in "
+                                 "a private Network stack.")
+            if not (variables["InterfaceEndpointSecurityGroupId"] or
+                    variables["VpcCidrBlock"]):
+                raise ValueError("InterfaceEndpoints need either "
+                                 "InterfaceEndpointSecurityGroupId or "
+                                 "VpcCidrBlock.")
+
     def create_template(self):
         self.validate_variables()
         self.create_subnet()
         self.create_route_table()
         self.create_nat_gateway()
         self.create_default_route()
+        self.create_ipv6_default_route()
+        self.create_interface_endpoints()
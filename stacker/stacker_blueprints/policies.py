@@ -1,3 +1,8 @@
+import collections
+import functools
+import os
+
+import awacs
 from awacs.aws import (
     Action,
     Allow,
@@ -11,28 +16,138 @@ from troposphere import (
     Join,
     Region,
     AccountId,
-    AWSHelperFn
+    AWSHelperFn,
 )
 
-from awacs import (
-    cloudwatch,
-    dynamodb,
-    ecr,
-    kinesis,
-    ec2,
-    logs,
-    s3,
-    sts,
-)
+
+# Set to build every policy from scratch, e.g. to compare render times.
+NO_POLICY_CACHE_ENV = "STACKER_BLUEPRINTS_NO_POLICY_CACHE"
+
+# Most results kept per memoized builder.
+POLICY_CACHE_SIZE = 256
+
+_HELPERS = (AWSHelperFn, awacs.AWSHelperFn)
 
 
+def _cache_key(value):
+    """Returns a hashable key for a builder argument.
+
+    troposphere helpers such as ``Ref`` are keyed by their data, so that the
+    ``Ref`` of a function hits the same entry in every stack.
+
+    Raises:
+        TypeError: If the argument cannot be keyed.
+    """
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return (type(value),) + tuple(_cache_key(v) for v in value)
+    if isinstance(value, dict):
+        return (dict,) + tuple(sorted(
+            (k, _cache_key(v)) for k, v in value.items()))
+    if isinstance(value, _HELPERS) and hasattr(value, "data"):
+        return (type(value), _cache_key(value.data))
+    raise TypeError("Cannot memoize on a %s" % type(value).__name__)
+
+
+class FrozenPolicyError(TypeError):
+    """Raised when changing a policy object shared by memoized builders."""
+
+
+_frozen_classes = {}
+_frozen_types = set()
+
+
+def _frozen_class(cls):
+    try:
+        return _frozen_classes[cls]
+    except KeyError:
+        pass
+
+    def __setattr__(self, name, value):
+        raise FrozenPolicyError(
+            "%s objects returned by memoized policy builders are shared "
+            "between calls and cannot be changed, build a new one instead."
+            % cls.__name__)
+
+    frozen = _frozen_classes[cls] = type(cls.__name__, (cls,), {
+        "__setattr__": __setattr__,
+        "__module__": cls.__module__,
+    })
+    _frozen_types.add(frozen)
+    return frozen
+
+
+def freeze_policy(value):
+    """Makes the awacs objects of a policy read-only, in place.
+
+    Setting a property of a frozen object raises
+    :class:`FrozenPolicyError`, and its list properties become tuples, so a
+    policy can be shared between callers without one of them changing it
+    for the others. Frozen objects still are instances of their awacs class
+    and render the same.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_policy(v) for v in value)
+    if isinstance(value, awacs.AWSObject):
+        if type(value) in _frozen_types:
+            return value
+        properties = value.properties
+        for k, v in properties.items():
+            properties[k] = freeze_policy(v)
+        # Bypasses the validating __setattr__ of awacs.
+        object.__setattr__(value, "__class__", _frozen_class(type(value)))
+    return value
+
+
+def memoized_policy(builder):
+    """Caches what a pure policy builder returns for the same arguments.
+
+    The cached policy is frozen (see :func:`freeze_policy`) and shared
+    between callers. Builders that return a list of statements return a new
+    list every time, which callers can extend. Calls with arguments that
+    cannot be keyed (see :func:`_cache_key`) are passed straight through to
+    the builder, as are all calls when ``STACKER_BLUEPRINTS_NO_POLICY_CACHE``
+    is set at import time.
+    """
+    if os.environ.get(NO_POLICY_CACHE_ENV):
+        return builder
+
+    cache = collections.OrderedDict()
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (_cache_key(args) if args else None,
+                   _cache_key(kwargs) if kwargs else None)
+        except TypeError:
+            return builder(*args, **kwargs)
+
+        try:
+            value = cache[key]
+            cache.move_to_end(key)
+        except KeyError:
+            value = cache[key] = freeze_policy(builder(*args, **kwargs))
+            if len(cache) > POLICY_CACHE_SIZE:
+                cache.popitem(last=False)
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+
+@memoized_policy
 def make_simple_assume_statement(*principals):
+    from awacs import sts
     return Statement(
         Principal=Principal('Service', principals),
         Effect=Allow,
         Action=[sts.AssumeRole])
 
 
+@memoized_policy
 def make_simple_assume_policy(*principals):
     return Policy(
         Statement=[
@@ -61,8 +176,10 @@ def s3_objects_arn(bucket, folder="*"):
         return 'arn:aws:s3:::%s/%s' % (bucket, folder)
 
 
+@memoized_policy
 def read_only_s3_bucket_policy_statements(buckets, folder="*"):
     """ Read only policy an s3 bucket. """
+    from awacs import s3
     list_buckets = [s3_arn(b) for b in buckets]
     object_buckets = [s3_objects_arn(b, folder) for b in buckets]
 
@@ -86,7 +203,9 @@ def read_only_s3_bucket_policy(buckets):
     return Policy(Statement=read_only_s3_bucket_policy_statements(buckets))
 
 
+@memoized_policy
 def read_write_s3_bucket_policy_statements(buckets, folder="*"):
+    from awacs import s3
     list_buckets = [s3_arn(b) for b in buckets]
     object_buckets = [s3_objects_arn(b, folder) for b in buckets]
     return [
@@ -130,6 +249,7 @@ def static_website_bucket_policy(bucket):
     Attach this policy directly to an S3 bucket to make it a static website.
     This policy grants read access to **all unauthenticated** users.
     """
+    from awacs import s3
     return Policy(
         Statement=[
             Statement(
@@ -142,7 +262,9 @@ def static_website_bucket_policy(bucket):
     )
 
 
+@memoized_policy
 def read_only_kinesis_stream_policy_statements(stream_arns):
+    from awacs import kinesis
     return [
         Statement(
             Effect=Allow,
@@ -160,7 +282,9 @@ def read_only_kinesis_stream_policy_statements(stream_arns):
     ]
 
 
+@memoized_policy
 def read_write_kinesis_stream_policy_statements(stream_arns):
+    from awacs import kinesis
     statements = [
         Statement(
             Effect=Allow,
@@ -199,8 +323,10 @@ def log_stream_arn(log_group_name, log_stream_name):
     )
 
 
+@memoized_policy
 def write_to_cloudwatch_logs_stream_statements(log_group_name,
                                                log_stream_name):
+    from awacs import logs
     return [
         Statement(
             Effect=Allow,
@@ -217,7 +343,9 @@ def write_to_cloudwatch_logs_stream_policy(log_group_name, log_stream_name):
     )
 
 
+@memoized_policy
 def cloudwatch_logs_write_statements(log_group=None, log_stream=None):
+    from awacs import logs
     if log_stream:
         log_stream = "log_stream:%s" % log_stream
     else:
@@ -247,6 +375,7 @@ def cloudwatch_logs_write_statements(log_group=None, log_stream=None):
     ]
 
 
+@memoized_policy
 def lambda_basic_execution_statements(function_name):
     log_group = Join("/", ["/aws/lambda", function_name])
     return cloudwatch_logs_write_statements(log_group)
@@ -256,8 +385,10 @@ def lambda_basic_execution_policy(function_name):
     return Policy(Statement=lambda_basic_execution_statements(function_name))
 
 
+@memoized_policy
 def lambda_vpc_execution_statements():
     """Allow Lambda to manipuate EC2 ENIs for VPC support."""
+    from awacs import ec2
     return [
         Statement(
             Effect=Allow,
@@ -271,13 +402,16 @@ def lambda_vpc_execution_statements():
     ]
 
 
+@memoized_policy
 def flowlogs_assumerole_policy():
     return make_simple_assume_policy("vpc-flow-logs.amazonaws.com")
 
 
 # reference: https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/aws-resource-dynamodb-table.html#cfn-dynamodb-table-examples-application-autoscaling # noqa
+@memoized_policy
 def dynamodb_autoscaling_policy(tables):
     """Policy to allow AutoScaling a list of DynamoDB tables."""
+    from awacs import cloudwatch, dynamodb
     return Policy(
         Statement=[
             Statement(
@@ -303,7 +437,9 @@ def dynamodb_autoscaling_policy(tables):
     )
 
 
+@memoized_policy
 def ecr_repo_client_statements(ecr_repo="*"):
+    from awacs import ecr
     statements = []
     statements.append(
         Statement(
@@ -328,6 +464,7 @@ def ecr_repo_client_statements(ecr_repo="*"):
     return statements
 
 
+@memoized_policy
 def ecs_task_execution_statements(ecr_repo="*", log_group=None,
                                   log_stream=None):
     statements = ecr_repo_client_statements(ecr_repo)
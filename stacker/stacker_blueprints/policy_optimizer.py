@@ -0,0 +1,266 @@
+"""Compaction of IAM policy documents.
+
+Blueprints build their policies by appending statements, which leaves
+duplicate actions and resources, and many statements that only differ in
+their actions or in their resources. :func:`optimize_policy` rewrites a
+policy document into an equivalent, smaller one:
+
+* actions and resources are deduplicated, and the ones already matched by a
+  wildcard of the same statement (``s3:Get*``, ``*``) are dropped;
+* statements with the same Effect, Principal and Condition are merged when
+  they have the same resources (their actions are combined) or the same
+  actions (their resources are combined), which never grants more than the
+  original statements did;
+* lists of a single action or resource become plain values.
+
+With ``wildcards=True``, the actions of a statement that include every action
+awacs knows for a service, or for one verb of a service (``Describe``,
+``List``...), also become ``service:*`` or ``service:Verb*``. That is not
+equivalent: the wildcard also grants the actions AWS adds later, and the ones
+awacs does not know about yet, so it is only done when a blueprint asks for
+it.
+
+Statements with a Sid, or with NotAction, NotResource or NotPrincipal, are
+only deduplicated, never merged.
+
+Inline policies count against the 10,240 bytes IAM allows for the inline
+policies of a role, measured without whitespace. :func:`optimize_policy` logs
+the size of a policy before and after, and warns when it is still over.
+"""
+import importlib
+import json
+import logging
+import pkgutil
+import re
+
+import awacs
+from awacs.aws import Action
+from troposphere import encode_to_dict
+
+logger = logging.getLogger(__name__)
+
+# The most bytes IAM allows for the inline policies of a role.
+IAM_POLICY_LIMIT = 10240
+
+# Statements are only merged when these are the same.
+MERGE_KEYS = ("Effect", "Principal", "Condition")
+
+# The keys of statements that can be merged.
+MERGEABLE_KEYS = frozenset(MERGE_KEYS + ("Action", "Resource"))
+
+LIST_KEYS = ("Action", "NotAction", "Resource", "NotResource")
+
+VERB = re.compile(r"[A-Z][a-z]+")
+
+# The lowercased action names awacs knows, by lowercased service prefix.
+_known_actions = None
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _unique(values):
+    seen = set()
+    result = []
+    for value in values:
+        key = _canonical(value)
+        if key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+
+def _set_key(values):
+    return _canonical(sorted(_canonical(value) for value in values))
+
+
+def _matcher(pattern, ignore_case):
+    regex = re.escape(pattern).replace(r"\*", ".*").replace(r"\?", ".")
+    return re.compile(regex + "$", re.IGNORECASE if ignore_case else 0)
+
+
+def _is_wildcard(value):
+    return isinstance(value, str) and ("*" in value or "?" in value)
+
+
+def prune(values, ignore_case=False):
+    """Drops the values matched by another (wildcard) value of the list.
+
+    Only strings are ever matched, except by a lone ``*``, which matches
+    everything, intrinsic functions included.
+    """
+    values = _unique(values)
+    patterns = [(p, _matcher(p, ignore_case))
+                for p in values if _is_wildcard(p)]
+    if not patterns:
+        return values
+
+    result = []
+    for value in values:
+        for pattern, matcher in patterns:
+            if pattern == value:
+                continue
+            if pattern == "*" or (isinstance(value, str) and
+                                  matcher.match(value)):
+                # Of two patterns matching each other, keep the first one.
+                if (_is_wildcard(value) and
+                        _matcher(value, ignore_case).match(pattern) and
+                        values.index(value) < values.index(pattern)):
+                    continue
+                break
+        else:
+            result.append(value)
+    return result
+
+
+def known_actions(prefix):
+    """The lowercased names of the actions awacs knows for a service."""
+    global _known_actions
+    if _known_actions is None:
+        found = {}
+        for module in pkgutil.iter_modules(awacs.__path__):
+            try:
+                module = importlib.import_module("awacs." + module.name)
+            except ImportError:
+                continue
+            for value in vars(module).values():
+                if isinstance(value, Action) and value.action:
+                    found.setdefault(value.prefix.lower(), set()).add(
+                        value.action.lower())
+        _known_actions = found
+    return _known_actions.get(prefix.lower(), set())
+
+
+def collapse_actions(actions):
+    """Replaces the actions that cover every known action of a service, or
+    of a verb of a service, by a wildcard.
+    """
+    by_service = {}
+    for action in actions:
+        if isinstance(action, str) and ":" in action:
+            prefix, name = action.split(":", 1)
+            if not _is_wildcard(name):
+                by_service.setdefault(prefix, []).append(name)
+
+    replaced = {}
+    for prefix, names in by_service.items():
+        known = known_actions(prefix)
+        present = set(name.lower() for name in names)
+        if not known or len(names) < 2:
+            continue
+        if known <= present:
+            wildcard = "%s:*" % prefix
+            replaced.update(("%s:%s" % (prefix, n), wildcard) for n in names)
+            continue
+        for verb in set(m.group() for m in map(VERB.match, names) if m):
+            matcher = _matcher(verb + "*", True)
+            covered = [n for n in names if matcher.match(n)]
+            if len(covered) < 2 or not all(
+                    a in present for a in known if matcher.match(a)):
+                continue
+            wildcard = "%s:%s*" % (prefix, verb)
+            replaced.update(("%s:%s" % (prefix, n), wildcard)
+                            for n in covered)
+
+    if not replaced:
+        return actions
+    return _unique(replaced.get(a, a) if isinstance(a, str) else a
+                   for a in actions)
+
+
+def _mergeable(statement):
+    return set(statement) <= MERGEABLE_KEYS and (
+        "Action" in statement and "Resource" in statement)
+
+
+def _merge(statements, same, combine, ignore_case):
+    """Merges the mergeable statements that only differ in ``combine``."""
+    result = []
+    merged = {}
+    for statement in statements:
+        if not _mergeable(statement):
+            result.append(statement)
+            continue
+        key = (_canonical([statement.get(k) for k in MERGE_KEYS]),
+               _set_key(statement[same]))
+        target = merged.get(key)
+        if target is None:
+            merged[key] = statement
+            result.append(statement)
+        else:
+            target[combine] = prune(target[combine] + statement[combine],
+                                    ignore_case)
+    return result
+
+
+def _normalize(statement, wildcards):
+    statement = dict(statement)
+    for key in LIST_KEYS:
+        if key in statement:
+            values = _as_list(statement[key])
+            ignore_case = key.endswith("Action")
+            # Collapsing NotAction would exclude actions AWS adds later.
+            if key == "Action" and wildcards:
+                values = collapse_actions(values)
+            statement[key] = prune(values, ignore_case)
+    return statement
+
+
+def compact_statements(statements, wildcards=False):
+    """Returns the merged and deduplicated form of a list of statements.
+
+    Args:
+        statements (list): Statements, as dicts.
+        wildcards (bool): Collapse complete action lists to wildcards.
+    """
+    statements = [_normalize(s, wildcards) for s in _as_list(statements)]
+    while True:
+        count = len(statements)
+        statements = _merge(statements, "Resource", "Action", True)
+        statements = _merge(statements, "Action", "Resource", False)
+        if len(statements) == count:
+            break
+
+    result = []
+    for statement in _unique(statements):
+        statement = _normalize(statement, wildcards)
+        for key in LIST_KEYS:
+            if len(statement.get(key, ())) == 1:
+                statement[key] = statement[key][0]
+        result.append(statement)
+    return result
+
+
+def policy_size(document):
+    """The size of a policy document in bytes, as IAM measures it."""
+    return len(_canonical(encode_to_dict(document)).encode("utf-8"))
+
+
+def optimize_policy(policy, name="policy", wildcards=False):
+    """Compacts a policy document, logging its size before and after.
+
+    Args:
+        policy (:class:`awacs.aws.Policy` or dict): The policy document.
+        name (str): The name to log the sizes under.
+        wildcards (bool): Collapse complete action lists to wildcards. A
+            wildcard also matches the actions AWS adds to a service later.
+
+    Returns:
+        dict: The compacted policy document.
+    """
+    document = dict(encode_to_dict(policy))
+    before = policy_size(document)
+    document["Statement"] = compact_statements(document["Statement"],
+                                               wildcards)
+    after = policy_size(document)
+    logger.debug("Compacted %s from %d to %d bytes.", name, before, after)
+    if after > IAM_POLICY_LIMIT:
+        logger.warning("%s is %d bytes, over the %d bytes of inline "
+                       "policies IAM allows per role.", name, after,
+                       IAM_POLICY_LIMIT)
+    return document
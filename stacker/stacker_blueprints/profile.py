@@ -0,0 +1,190 @@
+"""Opt-in timing of the phases of a blueprint render.
+
+Blueprints build their template through a chain of ``create_*`` (and
+``generate_*``) methods. When ``STACKER_BLUEPRINTS_PROFILE_DIR`` is set, every
+render times each of those methods, plus ``import_mappings``,
+``setup_parameters`` and the final ``to_dict()``. It also counts the
+resources and outputs each method adds, and writes two reports per stack to
+that directory:
+
+* ``<stack>.json``, the tree of phases;
+* ``<stack>.folded``, the same tree in the folded stack format read by
+  ``flamegraph.pl`` and speedscope, one line per phase with its own (self)
+  time in microseconds.
+
+Repeated calls of a method from the same caller are merged into one phase,
+with ``calls`` counting them.
+"""
+import collections
+import contextlib
+import functools
+import inspect
+import json
+import os
+import time
+import types
+
+PROFILE_DIR_ENV = "STACKER_BLUEPRINTS_PROFILE_DIR"
+
+PHASE_PREFIXES = ("create_", "generate_")
+
+# Stacker's own steps of a render, timed next to the create_* methods.
+RENDER_PHASES = ("import_mappings", "setup_parameters")
+
+
+def profile_dir():
+    """The directory to write profiles to, or None when profiling is off."""
+    return os.environ.get(PROFILE_DIR_ENV) or None
+
+
+class Phase(object):
+    """The time spent in, and the resources added by, one phase."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.resources = 0
+        self.outputs = 0
+        self.children = collections.OrderedDict()
+
+    @property
+    def self_seconds(self):
+        return max(0.0, self.seconds - sum(
+            child.seconds for child in self.children.values()))
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "self_seconds": self.self_seconds,
+            "resources": self.resources,
+            "outputs": self.outputs,
+            "children": [c.to_dict() for c in self.children.values()],
+        }
+
+
+class Profiler(object):
+    """Records nested phases against a troposphere template.
+
+    Args:
+        template (:class:`troposphere.Template`): The template the phases
+            add resources and outputs to.
+        name (str): The name of the root phase.
+    """
+
+    def __init__(self, template, name="render"):
+        self.template = template
+        self.root = Phase(name)
+        self._stack = [self.root]
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        parent = self._stack[-1]
+        phase = parent.children.get(name)
+        if phase is None:
+            phase = parent.children[name] = Phase(name)
+        self._stack.append(phase)
+        resources = len(self.template.resources)
+        outputs = len(self.template.outputs)
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.calls += 1
+            phase.seconds += time.perf_counter() - start
+            phase.resources += len(self.template.resources) - resources
+            phase.outputs += len(self.template.outputs) - outputs
+            self._stack.pop()
+
+    @contextlib.contextmanager
+    def profile(self):
+        """Times the root phase."""
+        self.root.calls += 1
+        start = time.perf_counter()
+        try:
+            yield self.root
+        finally:
+            self.root.seconds += time.perf_counter() - start
+            self.root.resources = len(self.template.resources)
+            self.root.outputs = len(self.template.outputs)
+
+
+def _phase_methods(blueprint, extra=RENDER_PHASES):
+    for name in dir(type(blueprint)):
+        if not (name.startswith(PHASE_PREFIXES) or name in extra):
+            continue
+        if isinstance(inspect.getattr_static(blueprint, name),
+                      types.FunctionType):
+            yield name
+
+
+def _timed(profiler, name, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with profiler.phase(name):
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def instrument(blueprint, profiler):
+    """Times the phase methods of a blueprint while the context is active.
+
+    The methods are wrapped on the instance only, and restored on exit.
+    """
+    names = list(_phase_methods(blueprint))
+    for name in names:
+        setattr(blueprint, name,
+                _timed(profiler, name, getattr(blueprint, name)))
+    try:
+        yield profiler
+    finally:
+        for name in names:
+            delattr(blueprint, name)
+
+
+def build_report(blueprint, profiler):
+    blueprint_class = type(blueprint)
+    return {
+        "stack": blueprint.name,
+        "blueprint": "%s.%s" % (blueprint_class.__module__,
+                                blueprint_class.__name__),
+        "profile": profiler.root.to_dict(),
+    }
+
+
+def folded(report):
+    """Formats a report as folded stacks, with self times in microseconds.
+    """
+    lines = []
+
+    def visit(phase, path):
+        path = path + [phase["name"]]
+        micros = int(round(phase["self_seconds"] * 1e6))
+        if micros:
+            lines.append("%s %d" % (";".join(path), micros))
+        for child in phase["children"]:
+            visit(child, path)
+
+    visit(report["profile"], [report["stack"]])
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report, directory):
+    """Writes the JSON and folded reports of a stack to a directory.
+
+    Returns:
+        tuple: The paths of the JSON and the folded report.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    base = os.path.join(directory, report["stack"])
+    with open(base + ".json", "w") as fd:
+        json.dump(report, fd, indent=4)
+        fd.write("\n")
+    with open(base + ".folded", "w") as fd:
+        fd.write(folded(report))
+    return base + ".json", base + ".folded"
@@ -9,7 +9,7 @@ from troposphere.rds import (
 )
 from troposphere.route53 import RecordSetType
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import CFNString
 
 from stacker_blueprints.rds.base import validate_backup_retention_period
@@ -8,7 +8,7 @@ from troposphere.rds import (
 )
 from troposphere.route53 import RecordSetType
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from stacker.blueprints.variables.types import CFNString
 
 RDS_ENGINES = ["MySQL", "oracle-se1", "oracle-se", "oracle-ee", "sqlserver-ee",
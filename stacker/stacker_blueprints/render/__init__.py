@@ -0,0 +1,12 @@
+"""Renders every stack in a stacker config without touching AWS.
+
+Each stack's blueprint is instantiated from its ``class_path`` and rendered on
+a process pool. Lookups that need deployed stacks (``${output ...}``,
+``${xref ...}`` and ``${rxref ...}``) are replaced with stub values, so the
+templates can be pre-rendered in CI::
+
+    python -m stacker_blueprints.render conf/example_vpc/example.env \\
+        conf/example_vpc/stacker.yml --output-dir templates
+
+One JSON template is written per stack, along with a ``timings.json`` report.
+"""
@@ -0,0 +1,306 @@
+"""Renders the stacks of a stacker config concurrently."""
+from __future__ import print_function
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from stacker.commands.stacker.base import (
+    KeyValueAction,
+    environment_file,
+    key_value_arg,
+)
+from stacker.config import render_parse_load
+from stacker.context import Context
+from stacker.environment import DictWithSourceType
+from stacker.lookups.handlers import LookupHandler
+from stacker.lookups.registry import LOOKUP_HANDLERS
+
+from ..cache import CACHE_DIR_ENV
+from ..profile import PROFILE_DIR_ENV
+from ..serialize import COMPACT_ENV
+from ..split import SKIP_UPLOAD_ENV
+
+logger = logging.getLogger(__name__)
+
+# Lookups that read from deployed stacks, and so cannot be resolved offline.
+STUBBED_LOOKUPS = ("output", "xref", "rxref")
+
+REPORT_NAME = "timings.json"
+
+# The stacks loaded by each pool worker, keyed by stack name.
+_worker_stacks = {}
+
+
+def stub_value(lookup_type, value):
+    """Returns the value a stubbed lookup resolves to.
+
+    ``${output vpc::VpcId}`` resolves to ``stub-output-vpc-VpcId``.
+    """
+    return "stub-%s-%s" % (lookup_type, value.replace("::", "-"))
+
+
+def stub_lookup(lookup_type):
+    """Returns a lookup handler that resolves to :func:`stub_value`."""
+
+    class StubLookup(LookupHandler):
+        @classmethod
+        def handle(cls, value, context=None, provider=None, **kwargs):
+            return stub_value(lookup_type, value)
+
+    return StubLookup
+
+
+@contextlib.contextmanager
+def stubbed_lookups(lookup_types=STUBBED_LOOKUPS):
+    """Replaces the given lookup handlers with stubs for the duration.
+
+    Variables bind their lookup handler when they are parsed, so stacks
+    only need to be built inside this context, not resolved in it.
+    """
+    saved = dict((name, LOOKUP_HANDLERS.get(name)) for name in lookup_types)
+    for name in lookup_types:
+        LOOKUP_HANDLERS[name] = stub_lookup(name)
+    try:
+        yield
+    finally:
+        for name, handler in saved.items():
+            if handler is None:
+                LOOKUP_HANDLERS.pop(name, None)
+            else:
+                LOOKUP_HANDLERS[name] = handler
+
+
+def load_stacks(raw_config, environment, lookup_types=STUBBED_LOOKUPS):
+    """Loads the enabled stacks of a stacker config.
+
+    Args:
+        raw_config (str): The raw stacker config.
+        environment (dict): The environment to render the config with.
+        lookup_types (list, optional): The lookups to stub.
+
+    Returns:
+        list: The :class:`stacker.stack.Stack` objects of the config.
+    """
+    config = render_parse_load(raw_config, environment=environment)
+    context = Context(environment=environment, config=config)
+    with stubbed_lookups(lookup_types):
+        stacks = context.get_stacks()
+    return [stack for stack in stacks if stack.enabled]
+
+
+def write_template(blueprint, fd):
+    """Renders a blueprint to a file object, streaming it when possible.
+
+    Returns:
+        tuple: The template version and its size in bytes.
+    """
+    if hasattr(blueprint, "write_template"):
+        return blueprint.write_template(fd)
+    version, rendered = blueprint.render_template()
+    fd.write(rendered)
+    return version, len(rendered.encode("utf-8"))
+
+
+def render_stack(stack, output_dir):
+    """Resolves and renders a single stack, writing its template to disk.
+
+    Returns:
+        dict: The outcome of the render. ``status`` is ``rendered`` or
+            ``failed``; failures carry an ``error`` instead of timings.
+    """
+    result = {"name": stack.name, "fqn": stack.fqn, "pid": os.getpid()}
+    path = os.path.join(output_dir, "%s.json" % stack.name)
+    blueprint = stack.blueprint
+    start = time.perf_counter()
+    try:
+        stack.resolve(stack.context, None)
+        resolved = time.perf_counter()
+        with open(path, "w") as fd:
+            _, output_bytes = write_template(blueprint, fd)
+    except Exception as e:
+        logger.debug("Failed to render %s.", stack.name, exc_info=True)
+        result.update(status="failed", error="%s: %s" % (
+            type(e).__name__, e))
+        return result
+    finished = time.perf_counter()
+
+    nested = getattr(blueprint, "nested_templates", {})
+    for name, child in nested.items():
+        child_path = os.path.join(output_dir, "%s-%s.json" % (
+            stack.name, name))
+        with open(child_path, "w") as fd:
+            fd.write(child)
+
+    result.update(
+        status="rendered",
+        path=path,
+        resolve_seconds=resolved - start,
+        render_seconds=finished - resolved,
+        output_bytes=output_bytes,
+        nested_stacks=len(nested),
+    )
+    return result
+
+
+def _init_worker(raw_config, environment, lookup_types):
+    for stack in load_stacks(raw_config, environment, lookup_types):
+        _worker_stacks[stack.name] = stack
+
+
+def _render_in_worker(name, output_dir):
+    return render_stack(_worker_stacks[name], output_dir)
+
+
+def render_all(raw_config, environment, output_dir, stack_names=None,
+               jobs=None, lookup_types=STUBBED_LOOKUPS):
+    """Renders the stacks of a stacker config on a process pool.
+
+    Args:
+        raw_config (str): The raw stacker config.
+        environment (dict): The environment to render the config with.
+        output_dir (str): Directory the templates are written to.
+        stack_names (list, optional): Only render these stacks.
+        jobs (int, optional): Number of worker processes. Defaults to the
+            number of CPUs; ``1`` renders in this process.
+        lookup_types (list, optional): The lookups to stub.
+
+    Returns:
+        dict: A timing report, with one entry per stack under ``stacks``.
+    """
+    start = time.perf_counter()
+    stacks = load_stacks(raw_config, environment, lookup_types)
+    if stack_names:
+        known = set(stack.name for stack in stacks)
+        unknown = [name for name in stack_names if name not in known]
+        if unknown:
+            raise ValueError("Unknown stack(s): %s" % ", ".join(unknown))
+        stacks = [stack for stack in stacks if stack.name in stack_names]
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    jobs = jobs or os.cpu_count()
+    if jobs == 1:
+        results = [render_stack(stack, output_dir) for stack in stacks]
+    else:
+        names = [stack.name for stack in stacks]
+        with ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker,
+                initargs=(raw_config, environment, lookup_types)) as pool:
+            results = list(pool.map(_render_in_worker, names,
+                                    [output_dir] * len(names)))
+
+    return {
+        "jobs": jobs,
+        "seconds": time.perf_counter() - start,
+        "stacks": results,
+    }
+
+
+def format_report(report):
+    lines = ["%-32s %-8s %10s %10s %12s" % (
+        "stack", "status", "resolve", "render", "output_bytes")]
+    for result in report["stacks"]:
+        if result["status"] == "rendered":
+            lines.append("%-32s %-8s %10.4f %10.4f %12d" % (
+                result["name"], result["status"], result["resolve_seconds"],
+                result["render_seconds"], result["output_bytes"]))
+        else:
+            lines.append("%-32s %-8s %s" % (
+                result["name"], result["status"], result["error"]))
+    lines.append("Rendered %d stack(s) in %.3fs with %d job(s)." % (
+        len(report["stacks"]), report["seconds"], report["jobs"]))
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.render",
+        description="Render every stack of a stacker config to JSON, "
+                    "without calling AWS.",
+    )
+    parser.add_argument(
+        "-e", "--env", dest="cli_envs", metavar="ENV=VALUE",
+        type=key_value_arg, action=KeyValueAction, default={},
+        help="Adds environment key/value pairs from the command line. "
+             "Overrides your environment file settings. Can be specified "
+             "more than once.")
+    parser.add_argument(
+        "--stacks", action="append", metavar="STACKNAME",
+        help="Only render this stack. Can be specified more than once.")
+    parser.add_argument(
+        "-j", "--jobs", type=int,
+        help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument(
+        "-o", "--output-dir", default="templates",
+        help="Directory the templates are written to. Default: %(default)s")
+    parser.add_argument(
+        "--report",
+        help="Path of the JSON timing report. Default: %s in the output "
+             "directory." % REPORT_NAME)
+    parser.add_argument(
+        "--cache-dir",
+        help="Serve unchanged templates from, and store new ones in, this "
+             "template cache directory. Defaults to $%s." % CACHE_DIR_ENV)
+    parser.add_argument(
+        "--profile", metavar="DIR",
+        help="Write a timing profile of every stack to this directory, see "
+             "stacker_blueprints.profile.")
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="Write minified templates, see stacker_blueprints.serialize.")
+    parser.add_argument(
+        "--stub", action="append", default=list(STUBBED_LOOKUPS),
+        metavar="LOOKUP",
+        help="Also stub this lookup type. Can be specified more than once. "
+             "Stubbed by default: %s" % ", ".join(STUBBED_LOOKUPS))
+    parser.add_argument(
+        "environment", type=environment_file, nargs="?",
+        default=DictWithSourceType("simple"),
+        help="Path to a stacker environment file.")
+    parser.add_argument(
+        "config", type=argparse.FileType(),
+        help="The stacker config file. If `-` is provided, then the config "
+             "will be read from stdin.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    args.environment.update(args.cli_envs)
+    if args.cache_dir:
+        # Set in the environment so that the pool workers inherit it.
+        os.environ[CACHE_DIR_ENV] = args.cache_dir
+    if args.profile:
+        os.environ[PROFILE_DIR_ENV] = os.path.abspath(args.profile)
+    if args.compact:
+        os.environ[COMPACT_ENV] = "1"
+    # Rendering never touches AWS, nested templates are only written out.
+    os.environ[SKIP_UPLOAD_ENV] = "1"
+    report = render_all(args.config.read(), args.environment,
+                        args.output_dir, args.stacks, args.jobs, args.stub)
+    print(format_report(report))
+
+    report_path = args.report or os.path.join(args.output_dir, REPORT_NAME)
+    with open(report_path, "w") as fd:
+        json.dump(report, fd, indent=4, sort_keys=True)
+        fd.write("\n")
+    logger.info("Wrote timing report to %s", report_path)
+
+    failed = [r for r in report["stacks"] if r["status"] != "rendered"]
+    if failed:
+        logger.error("%d stack(s) failed to render.", len(failed))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,10 @@
+import csv
+import os
+import re
 from hashlib import md5
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
+from stacker_blueprints.cache import file_digest
 
 from troposphere import (
     Ref,
@@ -58,6 +62,24 @@ S3_WEBSITE_ZONE_IDS = {
 }
 
 
+# The TTL of streamed records that set none, and whose zone file has no $TTL.
+DEFAULT_TTL = 300
+
+ZONE_CLASSES = ("IN", "CH", "HS")
+
+# The index of the domain name in the data of the record types that have one,
+# from the end for CNAME, NS and PTR.
+NAME_FIELDS = {
+    "CNAME": -1,
+    "MX": 1,
+    "NS": -1,
+    "PTR": -1,
+    "SRV": 3,
+}
+
+TTL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+TTL_PART = re.compile(r"(\d+)([smhdw]?)", re.IGNORECASE)
+
 CF_DOMAIN = ".cloudfront.net."
 ELB_DOMAIN = ".elb.amazonaws.com."
 S3_WEBSITE_PREFIX = "s3-website"
@@ -69,7 +91,7 @@ def get_record_set_md5(rs_name, rs_type):
     rs_type = rs_type.upper()
     # Make A and CNAME records hash to same sum to support updates.
     rs_type = "ACNAME" if rs_type in ["A", "CNAME"] else rs_type
-    return md5(rs_name + rs_type).hexdigest()
+    return md5((rs_name + rs_type).encode("utf-8")).hexdigest()
 
 
 def add_hosted_zone_id_if_missing(record_set, hosted_zone_id):
@@ -79,6 +101,199 @@ def add_hosted_zone_id_if_missing(record_set, hosted_zone_id):
     return record_set
 
 
+def parse_ttl(value):
+    """Parses a zone file TTL such as ``300``, ``1h`` or ``1h30m``."""
+    value = value.strip()
+    parts = TTL_PART.findall(value)
+    if not parts or "".join(n + u for n, u in parts).lower() != value.lower():
+        raise ValueError("Invalid TTL: %s" % value)
+    return sum(int(n) * TTL_UNITS[u.lower() or "s"] for n, u in parts)
+
+
+def qualify_name(name, origin):
+    """Makes a zone file name absolute, relative to ``origin``."""
+    if name == "@":
+        name = origin
+    elif not name.endswith("."):
+        if not origin:
+            raise ValueError(
+                "Cannot qualify the relative name %s without an origin, "
+                "set Origin in RecordSetsSource." % name)
+        name = "%s.%s" % (name, origin)
+    return name
+
+
+def _tokenize(line):
+    """Splits a zone file line, keeping quoted strings (and their quotes)
+    whole and dropping comments."""
+    tokens = []
+    token = ""
+    quoted = False
+    escaped = False
+    for char in line:
+        if quoted:
+            token += char
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            token += char
+            quoted = True
+        elif char == ";":
+            break
+        elif char.isspace() or char in "()":
+            if token:
+                tokens.append(token)
+                token = ""
+            if char in "()":
+                tokens.append(char)
+        else:
+            token += char
+    if token:
+        tokens.append(token)
+    return tokens
+
+
+def _zone_entries(lines):
+    """Yields the tokens of every entry of a zone file, joining the lines of
+    parenthesized entries, and whether the entry has no owner name."""
+    entry = []
+    depth = 0
+    blank_owner = False
+    for line in lines:
+        tokens = _tokenize(line)
+        if not tokens:
+            continue
+        if not depth:
+            blank_owner = line[:1].isspace()
+        for token in tokens:
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            else:
+                entry.append(token)
+        if depth <= 0:
+            depth = 0
+            yield entry, blank_owner
+            entry = []
+    if entry:
+        yield entry, blank_owner
+
+
+def iter_zone_file(lines, origin="", ttl=DEFAULT_TTL):
+    """Streams the records of a BIND zone file.
+
+    The SOA record, and the NS records of the zone apex, are skipped since
+    Route53 manages them.
+
+    Args:
+        lines (iterable): The lines of the zone file, e.g. an open file.
+        origin (str): The origin relative names are qualified with, until a
+            ``$ORIGIN`` directive changes it.
+        ttl (int): The TTL of records without one, until a ``$TTL``
+            directive changes it.
+
+    Returns:
+        iterator: A dict per record, with the Name, Type, TTL and
+            ResourceRecords (of one value) of a RecordSetType.
+    """
+    apex = origin
+    previous_name = origin
+    for tokens, blank_owner in _zone_entries(lines):
+        directive = tokens[0].upper()
+        if directive == "$ORIGIN":
+            origin = qualify_name(tokens[1], origin)
+            apex = apex or origin
+            continue
+        if directive == "$TTL":
+            ttl = parse_ttl(tokens[1])
+            continue
+        if directive.startswith("$"):
+            raise ValueError("Unsupported zone file directive: %s" %
+                             tokens[0])
+
+        if blank_owner:
+            name = previous_name
+        else:
+            name = previous_name = qualify_name(tokens.pop(0), origin)
+
+        record_ttl = ttl
+        while tokens and (tokens[0].upper() in ZONE_CLASSES or
+                          tokens[0][:1].isdigit()):
+            token = tokens.pop(0)
+            if token.upper() not in ZONE_CLASSES:
+                record_ttl = parse_ttl(token)
+        if not tokens:
+            raise ValueError("Record %s has no type." % name)
+
+        record_type = tokens.pop(0).upper()
+        if record_type == "SOA" or (record_type == "NS" and name == apex):
+            continue
+        if record_type in NAME_FIELDS and tokens:
+            index = NAME_FIELDS[record_type]
+            tokens[index] = qualify_name(tokens[index], origin)
+
+        yield {
+            "Name": name,
+            "Type": record_type,
+            "TTL": str(record_ttl),
+            "ResourceRecords": [" ".join(tokens)],
+        }
+
+
+def iter_csv_records(lines, origin="", ttl=DEFAULT_TTL):
+    """Streams the records of a CSV file.
+
+    The file has a header row with ``Name``, ``Type`` and ``Value`` columns,
+    and an optional ``TTL`` column. A record set with several values takes
+    one row per value.
+
+    Returns:
+        iterator: A dict per row, like :func:`iter_zone_file`.
+    """
+    for row in csv.DictReader(lines):
+        if not row.get("Name"):
+            continue
+        yield {
+            "Name": qualify_name(row["Name"].strip(), origin),
+            "Type": row["Type"].strip().upper(),
+            "TTL": str(parse_ttl(row.get("TTL") or str(ttl))),
+            "ResourceRecords": [row["Value"].strip()],
+        }
+
+
+def iter_record_sets_source(source, origin=""):
+    """Streams the records of a ``RecordSetsSource`` variable.
+
+    Args:
+        source (dict): The ``Path`` of a BIND zone file or CSV file, and
+            optionally its ``Format`` (``bind`` or ``csv``, by default
+            guessed from the extension), ``Origin`` and default ``TTL``.
+        origin (str): The origin to use when the source sets none.
+    """
+    path = source["Path"]
+    source_format = source.get("Format")
+    if not source_format:
+        extension = os.path.splitext(path)[1].lower()
+        source_format = "csv" if extension == ".csv" else "bind"
+    readers = {"bind": iter_zone_file, "csv": iter_csv_records}
+    if source_format not in readers:
+        raise ValueError("Unknown RecordSetsSource Format %s, use one of: "
+                         "%s" % (source_format, ", ".join(sorted(readers))))
+
+    origin = source.get("Origin", origin)
+    if origin and not origin.endswith("."):
+        origin += "."
+    ttl = source.get("TTL", DEFAULT_TTL)
+    with open(path, newline="") as fd:
+        for record in readers[source_format](fd, origin, ttl):
+            yield record
+
+
 class DNSRecords(Blueprint):
     VARIABLES = {
         "VPC": {
@@ -118,8 +333,25 @@ class DNSRecords(Blueprint):
                            "Also accepts an optional 'Enabled' boolean.",
             "default": {}
         },
+        "RecordSetsSource": {
+            "type": dict,
+            "description": "Record sets to stream from a file, rather than "
+                           "listing them in RecordSets: the 'Path' of a BIND "
+                           "zone file or CSV file (with Name, Type, Value and "
+                           "optional TTL columns), and optionally its "
+                           "'Format' (bind or csv, guessed from the "
+                           "extension by default), 'Origin' (defaults to "
+                           "HostedZoneName) and default 'TTL'.",
+            "default": {},
+        },
     }
 
+    def cache_inputs(self):
+        source = self.get_variables()["RecordSetsSource"]
+        if source:
+            return file_digest(source["Path"])
+        return None
+
     def add_hosted_zone_id_for_alias_target_if_missing(self, rs):
         """Add proper hosted zone id to record set alias target if missing."""
         alias_target = getattr(rs, "AliasTarget", None)
@@ -165,6 +397,32 @@ class DNSRecords(Blueprint):
                 )
         return record_set_objects
 
+    def create_record_sets_from_source(self, source, origin=""):
+        """Accept a RecordSetsSource dict. Return the number of record sets.
+
+        The file is read one record at a time, rather than loaded whole. The
+        values of records with the same name and type are merged into one
+        record set, which is added to the template with its first record.
+        """
+        record_sets = {}
+        for record in iter_record_sets_source(source, origin):
+            key = get_record_set_md5(record["Name"], record["Type"])
+            record_set = record_sets.get(key)
+            if record_set is None:
+                record_sets[key] = self.create_record_set(record)
+            elif record_set.Type.upper() != record["Type"]:
+                raise ValueError(
+                    "%s has both %s and %s records." % (
+                        record["Name"], record_set.Type, record["Type"]))
+            elif record_set.TTL != record["TTL"]:
+                raise ValueError(
+                    "%s %s records have different TTLs: %s and %s." % (
+                        record["Name"], record["Type"], record_set.TTL,
+                        record["TTL"]))
+            else:
+                record_set.ResourceRecords.extend(record["ResourceRecords"])
+        return len(record_sets)
+
     def create_record_set_groups(self, record_set_group_dicts):
         """Accept list of record_set_group dicts.
         Return list of record_set_group objects."""
@@ -231,4 +489,7 @@ class DNSRecords(Blueprint):
         )
 
         self.create_record_set_groups(variables["RecordSetGroups"])
+        if variables["RecordSetsSource"]:
+            self.create_record_sets_from_source(
+                variables["RecordSetsSource"], hosted_zone_name)
         return self.create_record_sets(variables["RecordSets"])
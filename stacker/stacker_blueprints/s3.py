@@ -1,4 +1,4 @@
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 from troposphere import (
     FindInMap,
     GetAtt,
@@ -0,0 +1,13 @@
+"""Deployment schedules for stacker configs.
+
+Stacks depend on each other through ``${output stack::Output}`` lookups and
+explicit ``requires``/``required_by`` entries. This package turns a config
+into that dependency graph, and reports the waves of stacks that can be
+deployed in parallel, the critical path, and the dependencies that serialize
+stacks for no reason::
+
+    python -m stacker_blueprints.schedule conf/example_vpc/example.env \\
+        conf/example_vpc/stacker.yml
+
+Nothing is resolved, so AWS is never called.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from .graph import main
+
+sys.exit(main())
@@ -0,0 +1,438 @@
+"""Builds the dependency graph of a stacker config and schedules it."""
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import re
+import sys
+
+from stacker.commands.stacker.base import (
+    KeyValueAction,
+    environment_file,
+    key_value_arg,
+)
+from stacker.environment import DictWithSourceType
+
+from ..render.runner import load_stacks
+
+logger = logging.getLogger(__name__)
+
+# ``${output stack::Output}``, as parsed by stacker's output lookup.
+OUTPUT_LOOKUP = re.compile(r"\$\{output\s+([^:}\s]+)::([^}\s]+)\}")
+
+# The kinds of edges that serialize stacks without a need to.
+REDUNDANT = "redundant"
+EXPLICIT = "explicit"
+
+# Rounding of the times reported, in seconds.
+PRECISION = 3
+
+
+def output_reads(value):
+    """The ``(stack, output)`` pairs read by the output lookups of a raw
+    variable value.
+    """
+    found = set()
+    if isinstance(value, dict):
+        for item in value.values():
+            found |= output_reads(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            found |= output_reads(item)
+    elif isinstance(value, str):
+        found.update(OUTPUT_LOOKUP.findall(value))
+    return found
+
+
+def build_graph(stacks):
+    """The dependencies of stacks, and the outputs each dependency is for.
+
+    Dependencies are the ones stacker walks: the stacks whose outputs a
+    stack reads, its ``requires`` and the stacks it is ``required_by``.
+
+    Args:
+        stacks (list): :class:`stacker.stack.Stack` objects, loaded with
+            real output lookups.
+
+    Returns:
+        tuple: The set of stack names each stack requires, and the sorted
+            outputs read for each ``(stack, dependency)`` edge. Edges that
+            read no output are missing from the latter.
+    """
+    requires = dict((stack.name, set(stack.requires)) for stack in stacks)
+    outputs = {}
+    for stack in stacks:
+        for dependant in stack.required_by:
+            requires.setdefault(dependant, set()).add(stack.name)
+        for variable in stack.variables:
+            for name, output in output_reads(variable._raw_value):
+                outputs.setdefault((stack.name, name), set()).add(output)
+    outputs = dict((edge, sorted(names)) for edge, names in outputs.items())
+    check_graph(requires)
+    return requires, outputs
+
+
+def check_graph(requires):
+    """Checks that every dependency is a stack, and that there is no cycle.
+
+    Raises:
+        ValueError: If a stack requires an unknown stack, or a cycle.
+    """
+    for name in sorted(requires):
+        unknown = sorted(requires[name] - set(requires))
+        if unknown:
+            raise ValueError("Stack %s requires unknown stack(s): %s" % (
+                name, ", ".join(unknown)))
+
+    done = set()
+    for start in sorted(requires):
+        path = []
+        on_path = set()
+        stack = [(start, iter(sorted(requires[start])))]
+        while stack:
+            name, deps = stack[-1]
+            if name not in on_path:
+                path.append(name)
+                on_path.add(name)
+            for dep in deps:
+                if dep in on_path:
+                    cycle = path[path.index(dep):] + [dep]
+                    raise ValueError("Dependency cycle: %s" % (
+                        " -> ".join(cycle)))
+                if dep not in done:
+                    stack.append((dep, iter(sorted(requires[dep]))))
+                    break
+            else:
+                stack.pop()
+                path.pop()
+                on_path.discard(name)
+                done.add(name)
+
+
+def topological_order(requires):
+    """The stacks, each one after all of its dependencies."""
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in sorted(requires[name]):
+            visit(dep)
+        order.append(name)
+
+    for name in sorted(requires):
+        visit(name)
+    return order
+
+
+def waves(requires):
+    """Groups the stacks in the waves they can be deployed in.
+
+    Every stack of a wave only requires stacks of the previous waves, so
+    each wave can be deployed at once.
+
+    Returns:
+        list: Sorted lists of stack names, one per wave.
+    """
+    level = {}
+    for name in topological_order(requires):
+        level[name] = 1 + max([level[d] for d in requires[name]] or [-1])
+    grouped = [[] for _ in range(1 + max(level.values() or [-1]))]
+    for name in sorted(level):
+        grouped[level[name]].append(name)
+    return grouped
+
+
+def timings(requires, durations):
+    """The earliest start and finish of every stack, with unlimited
+    concurrency.
+
+    Args:
+        requires (dict): The stacks each stack requires.
+        durations (dict): The seconds each stack takes to deploy.
+
+    Returns:
+        tuple: The start and finish times, keyed by stack name.
+    """
+    start = {}
+    finish = {}
+    for name in topological_order(requires):
+        start[name] = max([finish[d] for d in requires[name]] or [0.0])
+        finish[name] = start[name] + durations[name]
+    return start, finish
+
+
+def makespan(requires, durations):
+    """How long deploying every stack takes, with unlimited concurrency."""
+    return max(timings(requires, durations)[1].values() or [0])
+
+
+def critical_path(requires, durations):
+    """The chain of dependencies that bounds how fast stacks deploy.
+
+    Returns:
+        tuple: The stacks of the path, from the first deployed, and the
+            slack of every stack: how long it could be delayed without
+            delaying the whole deploy.
+    """
+    start, finish = timings(requires, durations)
+    end = max(finish.values() or [0])
+
+    dependants = dict((name, set()) for name in requires)
+    for name, deps in requires.items():
+        for dep in deps:
+            dependants[dep].add(name)
+    latest = {}
+    for name in reversed(topological_order(requires)):
+        latest[name] = min([latest[d] - durations[d]
+                            for d in dependants[name]] or [end])
+    slack = dict((name, latest[name] - finish[name]) for name in requires)
+
+    path = []
+    candidates = [n for n in requires if finish[n] == end]
+    while candidates:
+        name = sorted(candidates)[0]
+        path.append(name)
+        candidates = [d for d in requires[name] if finish[d] == start[name]]
+    return list(reversed(path)), slack
+
+
+def peak_concurrency(requires, durations):
+    """The most stacks in progress at once, when each one starts as soon as
+    its dependencies are deployed, as stacker does.
+    """
+    start, finish = timings(requires, durations)
+    events = sorted([(finish[n], -1) for n in requires] +
+                    [(start[n], 1) for n in requires])
+    peak = running = 0
+    for _, change in events:
+        running += change
+        peak = max(peak, running)
+    return peak
+
+
+def _reachable(requires, name, skip):
+    """The stacks a stack depends on, without following the ``skip`` edge.
+    """
+    found = set()
+    pending = [d for d in requires[name] if (name, d) != skip]
+    while pending:
+        dep = pending.pop()
+        if dep not in found:
+            found.add(dep)
+            pending.extend(requires[dep])
+    return found
+
+
+def needless_edges(requires, outputs, durations):
+    """Finds the dependencies that serialize stacks for no reason.
+
+    Only the edges that come from ``requires`` or ``required_by``, and read
+    no output of the required stack, are considered. An edge is
+    ``redundant`` when the stack already depends on the required stack
+    through another one, so dropping it changes nothing but the config.
+    Otherwise it is ``explicit``: it may still be needed, for resources
+    looked up by name or for hooks, so it is reported along with how much
+    faster the deploy would be without it.
+
+    Returns:
+        list: dicts with the ``stack``, the ``requires`` stack, the
+            ``kind`` of edge and the ``saved`` seconds.
+    """
+    end = makespan(requires, durations)
+    found = []
+    for name in sorted(requires):
+        for dep in sorted(requires[name]):
+            edge = (name, dep)
+            if edge in outputs:
+                continue
+            if dep in _reachable(requires, name, edge):
+                kind = REDUNDANT
+            else:
+                kind = EXPLICIT
+            without = dict(requires)
+            without[name] = requires[name] - set([dep])
+            found.append({
+                "stack": name,
+                "requires": dep,
+                "kind": kind,
+                "saved": round(end - makespan(without, durations),
+                               PRECISION),
+            })
+    return found
+
+
+def schedule(requires, outputs, durations=None, default_duration=1.0):
+    """Plans the deploy of a dependency graph.
+
+    Args:
+        requires (dict): The stacks each stack requires.
+        outputs (dict): The outputs read by each edge, see
+            :func:`build_graph`.
+        durations (dict, optional): The seconds each stack takes to
+            deploy, e.g. from previous builds.
+        default_duration (float): The seconds of the stacks missing from
+            ``durations``.
+
+    Returns:
+        dict: The waves, critical path, needless edges, and the
+            ``max_parallel`` stacker needs to deploy as fast as the graph
+            allows.
+    """
+    durations = dict(
+        (name, float((durations or {}).get(name, default_duration)))
+        for name in requires
+    )
+    start, finish = timings(requires, durations)
+    path, slack = critical_path(requires, durations)
+    stacks = {}
+    for name in sorted(requires):
+        stacks[name] = {
+            "requires": sorted(requires[name]),
+            "outputs": dict((dep, outputs[(name, dep)])
+                            for dep in requires[name]
+                            if (name, dep) in outputs),
+            "duration": durations[name],
+            "start": round(start[name], PRECISION),
+            "finish": round(finish[name], PRECISION),
+            "slack": round(slack[name], PRECISION),
+        }
+    return {
+        "stacks": stacks,
+        "waves": waves(requires),
+        "critical_path": path,
+        "makespan": round(max(finish.values() or [0]), PRECISION),
+        "serial": round(sum(durations.values()), PRECISION),
+        "max_parallel": peak_concurrency(requires, durations),
+        "needless_edges": needless_edges(requires, outputs, durations),
+    }
+
+
+def format_schedule(plan):
+    lines = []
+    for number, wave in enumerate(plan["waves"], 1):
+        lines.append("wave %d: %s" % (number, ", ".join(wave)))
+    lines.append("")
+    lines.append("critical path: %s" % " -> ".join(plan["critical_path"]))
+    lines.append("makespan: %ss, %ss deployed one at a time" % (
+        plan["makespan"], plan["serial"]))
+    lines.append("")
+    lines.append("%-32s %9s %9s %9s" % ("stack", "start", "finish",
+                                        "slack"))
+    for name, stack in sorted(plan["stacks"].items(),
+                              key=lambda item: (item[1]["start"], item[0])):
+        lines.append("%-32s %9s %9s %9s" % (
+            name, stack["start"], stack["finish"], stack["slack"]))
+
+    if plan["needless_edges"]:
+        lines.append("")
+        lines.append("needless dependencies:")
+        for edge in plan["needless_edges"]:
+            if edge["kind"] == REDUNDANT:
+                reason = "already implied by another dependency"
+            else:
+                reason = "reads no output"
+            lines.append("  %s -> %s: %s, %ss saved without it" % (
+                edge["stack"], edge["requires"], reason, edge["saved"]))
+
+    lines.append("")
+    lines.append("stacker build --max-parallel %d" % plan["max_parallel"])
+    return "\n".join(lines)
+
+
+def format_dot(plan):
+    """The graph in Graphviz dot syntax, critical path in bold and
+    needless edges dashed.
+    """
+    critical = set(zip(plan["critical_path"][1:], plan["critical_path"]))
+    needless = set((e["stack"], e["requires"])
+                   for e in plan["needless_edges"])
+    lines = ["digraph stacks {", "    rankdir=LR;"]
+    for name in sorted(plan["stacks"]):
+        style = ' [style=bold]' if name in plan["critical_path"] else ""
+        lines.append('    "%s"%s;' % (name, style))
+    for name, stack in sorted(plan["stacks"].items()):
+        for dep in stack["requires"]:
+            attributes = []
+            if (name, dep) in critical:
+                attributes.append("style=bold")
+            elif (name, dep) in needless:
+                attributes.append("style=dashed")
+            if dep in stack["outputs"]:
+                attributes.append('label="%s"' % (
+                    ", ".join(stack["outputs"][dep])))
+            lines.append('    "%s" -> "%s"%s;' % (
+                dep, name,
+                " [%s]" % ", ".join(attributes) if attributes else ""))
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.schedule",
+        description="Report the deployment waves, critical path and "
+                    "needless dependencies of a stacker config.",
+    )
+    parser.add_argument(
+        "-e", "--env", dest="cli_envs", metavar="ENV=VALUE",
+        type=key_value_arg, action=KeyValueAction, default={},
+        help="Adds environment key/value pairs from the command line. "
+             "Overrides your environment file settings. Can be specified "
+             "more than once.")
+    parser.add_argument(
+        "--durations", type=argparse.FileType(),
+        help="JSON file of the seconds each stack takes to deploy, keyed "
+             "by stack name.")
+    parser.add_argument(
+        "--default-duration", type=float, default=1.0,
+        help="Seconds of the stacks missing from --durations. "
+             "Default: %(default)s")
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument(
+        "--json", action="store_true",
+        help="Print the schedule as JSON.")
+    output.add_argument(
+        "--dot", action="store_true",
+        help="Print the dependency graph in Graphviz dot syntax.")
+    parser.add_argument(
+        "environment", type=environment_file, nargs="?",
+        default=DictWithSourceType("simple"),
+        help="Path to a stacker environment file.")
+    parser.add_argument(
+        "config", type=argparse.FileType(),
+        help="The stacker config file. If `-` is provided, then the config "
+             "will be read from stdin.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    args.environment.update(args.cli_envs)
+    # Output lookups are kept, stacker reads the dependencies off them.
+    stacks = load_stacks(args.config.read(), args.environment,
+                         lookup_types=())
+    durations = json.load(args.durations) if args.durations else None
+    try:
+        requires, outputs = build_graph(stacks)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 1
+    plan = schedule(requires, outputs, durations, args.default_duration)
+
+    if args.json:
+        print(json.dumps(plan, indent=4, sort_keys=True))
+    elif args.dot:
+        print(format_dot(plan))
+    else:
+        print(format_schedule(plan))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,239 @@
+import ipaddress
+import logging
+
 from troposphere.ec2 import SecurityGroupIngress, SecurityGroupEgress
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
+
+logger = logging.getLogger(__name__)
 
 CLASS_MAP = {
     "IngressRules": SecurityGroupIngress,
     "EgressRules": SecurityGroupEgress,
 }
 
+CIDR_KEYS = ("CidrIp", "CidrIpv6")
+
+# The protocols whose FromPort/ToPort are a port range. For ICMP they are a
+# type and a code, which cannot be merged.
+PORT_RANGE_PROTOCOLS = ("tcp", "udp", "6", "17")
+
+
+def _network(value):
+    try:
+        return ipaddress.ip_network(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _port(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Rule(object):
+    """A rule being compiled: one CIDR and one port range."""
+
+    def __init__(self, index, title, attrs):
+        self.titles = [(index, title)]
+        self.attrs = dict(attrs)
+        self.cidr_key = next((k for k in CIDR_KEYS if k in attrs), None)
+        self.network = (_network(attrs[self.cidr_key])
+                        if self.cidr_key else None)
+        self.ports = None
+        if str(attrs.get("IpProtocol")).lower() in PORT_RANGE_PROTOCOLS:
+            ports = (_port(attrs.get("FromPort")), _port(attrs.get("ToPort")))
+            if None not in ports and ports[0] <= ports[1]:
+                self.ports = ports
+
+    def group_key(self):
+        """The attributes a rule has to share with the rules it merges with.
+        """
+        other = dict((k, v) for k, v in self.attrs.items()
+                     if k not in ("FromPort", "ToPort", self.cidr_key))
+        return repr(sorted(other.items())), self.cidr_key
+
+    def cidr(self):
+        return str(self.network) if self.network else self.attrs.get(
+            self.cidr_key)
+
+    def port_range(self):
+        if self.ports:
+            return self.ports
+        return self.attrs.get("FromPort"), self.attrs.get("ToPort")
+
+    def merge(self, rules, network=None, ports=None):
+        for rule in rules:
+            if rule is not self:
+                self.titles.extend(rule.titles)
+        if network is not None:
+            self.network = network
+        if ports is not None:
+            self.ports = ports
+        return self
+
+    def to_attrs(self):
+        attrs = dict(self.attrs)
+        if self.network is not None:
+            attrs[self.cidr_key] = str(self.network)
+        if self.ports is not None:
+            attrs["FromPort"], attrs["ToPort"] = self.ports
+        return attrs
+
+
+def _merge_networks(rules):
+    """Merges rules with the same port range whose networks are adjacent,
+    or contain each other."""
+    result = []
+    by_ports = {}
+    for rule in rules:
+        if rule.network is None:
+            result.append(rule)
+        else:
+            by_ports.setdefault(
+                (rule.network.version, repr(rule.port_range())),
+                []).append(rule)
+
+    for same in by_ports.values():
+        # Both are sorted, so the rules of each collapsed network follow
+        # each other.
+        same.sort(key=lambda r: (r.network, min(r.titles)))
+        rules = iter(same)
+        rule = next(rules)
+        for network in ipaddress.collapse_addresses(r.network for r in same):
+            merged = []
+            while rule is not None and rule.network.subnet_of(network):
+                merged.append(rule)
+                rule = next(rules, None)
+            merged.sort(key=lambda r: min(r.titles))
+            result.append(merged[0].merge(merged, network=network))
+    return result
+
+
+def _merge_ports(rules):
+    """Merges rules with the same CIDR whose port ranges overlap or touch."""
+    result = []
+    by_cidr = {}
+    for rule in rules:
+        if rule.ports is None:
+            result.append(rule)
+        else:
+            by_cidr.setdefault(repr(rule.cidr()), []).append(rule)
+
+    for same in by_cidr.values():
+        same.sort(key=lambda r: r.ports)
+        current = [same[0]]
+        end = same[0].ports[1]
+        for rule in same[1:]:
+            if rule.ports[0] <= end + 1:
+                current.append(rule)
+                end = max(end, rule.ports[1])
+                continue
+            result.append(current[0].merge(
+                current, ports=(current[0].ports[0], end)))
+            current = [rule]
+            end = rule.ports[1]
+        result.append(current[0].merge(
+            current, ports=(current[0].ports[0], end)))
+    return result
+
+
+def _covers(rule, other):
+    """Whether a rule allows everything another rule of its group does."""
+    if rule.ports is not None and other.ports is not None:
+        return (rule.ports[0] <= other.ports[0] and
+                other.ports[1] <= rule.ports[1])
+    return rule.port_range() == other.port_range()
+
+
+def _drop_covered(rules):
+    """Drops the rules whose network and ports are within another rule's."""
+    by_network = {}
+    prefixes = set()
+    for rule in rules:
+        if rule.network is not None:
+            network = rule.network
+            prefixes.add((network.version, network.prefixlen))
+            by_network.setdefault(
+                (network.version, network.prefixlen,
+                 int(network.network_address)), []).append(rule)
+
+    result = []
+    for rule in rules:
+        network = rule.network
+        cover = None
+        if network is not None:
+            bits = network.max_prefixlen
+            address = int(network.network_address)
+            for version, prefix in prefixes:
+                if version != network.version or prefix > network.prefixlen:
+                    continue
+                mask = ((1 << bits) - 1) ^ ((1 << (bits - prefix)) - 1)
+                cover = next((
+                    other for other in by_network.get(
+                        (version, prefix, address & mask), ())
+                    if other is not rule and _covers(other, rule) and not (
+                        other.network == network and
+                        other.port_range() == rule.port_range())), None)
+                if cover is not None:
+                    break
+        if cover is None:
+            result.append(rule)
+        else:
+            cover.merge([rule])
+    return result
+
+
+def _dedupe(rules):
+    result = []
+    seen = {}
+    for rule in rules:
+        key = repr((rule.cidr(), rule.port_range()))
+        if key in seen:
+            seen[key].merge([rule])
+        else:
+            seen[key] = rule
+            result.append(rule)
+    return result
+
+
+def compile_rules(rules):
+    """Compiles security group rules into the fewest equivalent rules.
+
+    Rules that only differ in their CIDR, or only in their port range, are
+    merged: adjacent and overlapping CIDR blocks are collapsed, and so are
+    contiguous port ranges (TCP and UDP only). Identical rules, and rules
+    within the CIDR and ports of another rule, are dropped. A rule is never
+    widened to anything the original rules did not allow. Rules whose CIDR
+    or ports are not literal values (such as lookups resolved to something
+    other than a CIDR) are only deduplicated.
+
+    Args:
+        rules (dict): Rule titles mapped to their attributes.
+
+    Returns:
+        dict: The compiled rules, each under the first title (in the
+            original order) of the rules merged into it.
+    """
+    groups = {}
+    for index, (title, attrs) in enumerate(rules.items()):
+        rule = _Rule(index, title, attrs)
+        groups.setdefault(rule.group_key(), []).append(rule)
+
+    compiled = []
+    for same in groups.values():
+        same = _dedupe(same)
+        while True:
+            count = len(same)
+            same = _drop_covered(_merge_ports(_merge_networks(same)))
+            if len(same) == count:
+                break
+        compiled.extend(same)
+
+    compiled.sort(key=lambda r: min(r.titles))
+    return dict((min(r.titles)[1], r.to_attrs()) for r in compiled)
+
 
 class Rules(Blueprint):
     """Used to add Ingress/Egress rules to existing security groups.
@@ -19,6 +247,9 @@ class Rules(Blueprint):
             A dict with keys of the virtual titles for each rule, and with the
             value being a dict of the parameters taken directly from:
                 http://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/aws-resource-ec2-security-group-egress.html
+        CompileRules:
+            When true, the rules are first merged into the fewest
+            equivalent rules, see :func:`compile_rules`.
 
     An example:
 
@@ -54,14 +285,28 @@ class Rules(Blueprint):
                            ":class:`troposphere.ec2.SecurityGroupEgress` "
                            "class.",
             "default": {},
-        }
+        },
+        "CompileRules": {
+            "type": bool,
+            "description": "Merge adjacent CIDR blocks and contiguous port "
+                           "ranges, and drop duplicate rules, before "
+                           "creating them. Merged rules keep the name of "
+                           "the first rule merged into them.",
+            "default": False,
+        },
     }
 
     def create_security_rules(self):
         t = self.template
         variables = self.get_variables()
         for rule_type, rule_class in CLASS_MAP.items():
-            for rule_title, rule_attrs in variables[rule_type].items():
+            rules = variables[rule_type]
+            if variables["CompileRules"]:
+                compiled = compile_rules(rules)
+                logger.debug("Compiled %d %s into %d.", len(rules),
+                             rule_type, len(compiled))
+                rules = compiled
+            for rule_title, rule_attrs in rules.items():
                 t.add_resource(rule_class.from_dict(rule_title, rule_attrs))
 
     def create_template(self):
@@ -0,0 +1,92 @@
+"""Deterministic serialization of rendered templates.
+
+Templates are always serialized with sorted keys, so the same template gives
+the same bytes and the same stacker template version. By default they are
+indented like troposphere's ``to_json()``. In compact mode they are minified
+instead, which makes them noticeably smaller, especially for long
+environment lists and IAM policies.
+
+Compact mode is turned on for a blueprint class with ``COMPACT_TEMPLATE =
+True``, or for every blueprint with ``STACKER_BLUEPRINTS_COMPACT_TEMPLATES``.
+
+:func:`dump` streams a template to a file object without building the whole
+document as one string first.
+"""
+import hashlib
+import json
+import os
+
+COMPACT_ENV = "STACKER_BLUEPRINTS_COMPACT_TEMPLATES"
+
+SEPARATORS = (",", ": ")
+COMPACT_SEPARATORS = (",", ":")
+
+_compact = json.JSONEncoder(sort_keys=True, separators=COMPACT_SEPARATORS)
+
+
+def compact_enabled():
+    """Whether compact templates are turned on through the environment."""
+    return bool(os.environ.get(COMPACT_ENV))
+
+
+def _iter_compact(template):
+    # Every resource, output, ... is encoded on its own by the (C) encoder,
+    # which keeps the chunks small without falling back to the much slower
+    # pure Python iterencode().
+    yield "{"
+    for i, key in enumerate(sorted(template)):
+        if i:
+            yield ","
+        yield _compact.encode(key) + ":"
+        value = template[key]
+        if not isinstance(value, dict):
+            yield _compact.encode(value)
+            continue
+        yield "{"
+        for j, name in enumerate(sorted(value)):
+            yield "%s%s:%s" % ("," if j else "", _compact.encode(name),
+                               _compact.encode(value[name]))
+        yield "}"
+    yield "}"
+
+
+def iterencode(template, indent=None):
+    """Yields the JSON of a template dict in chunks.
+
+    Args:
+        template (dict): The template, as returned by ``to_dict()``.
+        indent (int): The indent to use, or None for compact output.
+    """
+    if indent is None:
+        return _iter_compact(template)
+    encoder = json.JSONEncoder(indent=indent, sort_keys=True,
+                               separators=SEPARATORS)
+    return encoder.iterencode(template)
+
+
+def dumps(template, indent=None):
+    """Serializes a template dict to a string."""
+    return "".join(iterencode(template, indent))
+
+
+def dump(template, fd, indent=None):
+    """Streams a template dict to a text file object.
+
+    Returns:
+        tuple: The stacker version (the first 8 characters of the md5 of the
+            template) and the size of the template in bytes.
+    """
+    md5 = hashlib.md5()
+    size = 0
+    for chunk in iterencode(template, indent):
+        fd.write(chunk)
+        data = chunk.encode("utf-8")
+        md5.update(data)
+        size += len(data)
+    return md5.hexdigest()[:8], size
+
+
+def encoded_size(template, indent=None):
+    """The size, in bytes, of a serialized template dict."""
+    return sum(len(chunk.encode("utf-8"))
+               for chunk in iterencode(template, indent))
@@ -0,0 +1,476 @@
+"""Splitting of over-limit templates into nested stacks.
+
+troposphere refuses a template's 201st resource as soon as it is added, while
+CloudFormation accepts 500 resources and a 1 MB template. Blueprints therefore
+build on an :class:`UnboundedTemplate`, and once ``create_template()`` is done
+a template over the CloudFormation limits is split by :func:`split_template`.
+
+Splitting keeps resources, in the order they were added, in the parent
+until it is full, and spills the rest into ``AWS::CloudFormation::Stack``
+children (see :func:`partition`). The parent keeps its parameters, mappings,
+conditions and outputs (so outputs keep their names and resolve to the same
+values), and references that now cross a stack boundary are wired through
+child parameters and outputs:
+
+* a child referencing a resource of the parent or of another child gets a
+  parameter named after that resource (``RoleArn`` for ``GetAtt Role.Arn``),
+  fed from the parent's resource or the other child's matching output;
+* the parent referencing a resource of a child uses the child's output;
+* a child using the parent's parameters or conditions gets copies of them;
+* ``DependsOn`` across stacks becomes a dependency on the child stack.
+
+Children are named after the resource they start with, and where the
+overflow is cut depends on the logical IDs rather than on positions, so
+adding or removing a resource only changes the child it falls in (and may
+spill one more resource of the parent). A resource that does move between
+stacks is deleted from one and created in the other by CloudFormation: its
+data is lost, and a resource with a fixed name fails to create while the old
+one still exists. Templates split by earlier releases moved every resource
+into ``NestedStack<n>`` children, so deploying them again moves most of
+their resources. Set a ``DeletionPolicy`` of ``Retain`` on stateful
+resources, and import them again, before deploying such a change.
+"""
+import hashlib
+import json
+import os
+import re
+
+from troposphere import Template
+
+# The CloudFormation quotas for a template uploaded to S3.
+MAX_RESOURCES = 500
+MAX_TEMPLATE_BYTES = 1024 * 1024
+
+# Set to render nested templates without uploading them, e.g. offline.
+SKIP_UPLOAD_ENV = "STACKER_BLUEPRINTS_SKIP_NESTED_UPLOAD"
+
+NESTED_STACK_NAME = "NestedStack%s"
+
+# On average, one resource in ANCHOR_INTERVAL starts a new child stack.
+ANCHOR_INTERVAL = 100
+
+# GetAtt attributes that return lists, which have to be passed between
+# stacks as comma delimited strings.
+LIST_ATTRIBUTES = (
+    "CidrBlockAssociations",
+    "DnsEntries",
+    "Ipv6CidrBlocks",
+    "NetworkInterfaceIds",
+)
+
+SUB_TOKEN = re.compile(r"\$\{([^!}][^}]*)\}")
+
+
+class UnboundedTemplate(Template):
+    """A Template that leaves the resource limit to :func:`split_template`.
+    """
+
+    def add_resource(self, resource):
+        return self._update(self.resources, resource)
+
+
+def exceeds_limits(template, size, max_resources=MAX_RESOURCES,
+                   max_bytes=MAX_TEMPLATE_BYTES):
+    """Whether a template of ``size`` bytes is over the CloudFormation limits.
+    """
+    return (len(template.get("Resources", {})) > max_resources or
+            size > max_bytes)
+
+
+def _rewrite_sub(string, replace, local_names):
+    def token(match):
+        name, _, attr = match.group(1).partition(".")
+        if name in local_names or "::" in name:
+            return match.group(0)
+        replaced = replace(name, attr or None)
+        if replaced is None:
+            return match.group(0)
+        return "${%s}" % replaced[1]
+
+    return SUB_TOKEN.sub(token, string)
+
+
+def rewrite_references(value, replace):
+    """Rewrites the Ref, GetAtt and Sub references in a template fragment.
+
+    Args:
+        value: A JSON fragment of a template.
+        replace (func): Called with the ``(name, attribute)`` of every
+            reference (``attribute`` is None for a Ref). It returns None to
+            keep the reference, or a ``(node, sub_token)`` tuple with its
+            replacement as a JSON node and as the inside of a ``${}`` token.
+
+    Returns:
+        A rewritten copy of ``value``.
+    """
+    if isinstance(value, list):
+        return [rewrite_references(v, replace) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    if len(value) == 1:
+        key, arg = list(value.items())[0]
+        if key == "Ref" and isinstance(arg, str):
+            replaced = replace(arg, None)
+            return value if replaced is None else replaced[0]
+        if key == "Fn::GetAtt":
+            if isinstance(arg, str):
+                arg = arg.split(".", 1)
+            if len(arg) == 2 and all(isinstance(a, str) for a in arg):
+                replaced = replace(arg[0], arg[1])
+                return value if replaced is None else replaced[0]
+        if key == "Fn::Sub":
+            if isinstance(arg, str):
+                return {key: _rewrite_sub(arg, replace, ())}
+            if isinstance(arg, list) and len(arg) == 2:
+                return {key: [_rewrite_sub(arg[0], replace, arg[1]),
+                              rewrite_references(arg[1], replace)]}
+
+    return dict((k, rewrite_references(v, replace))
+                for k, v in value.items())
+
+
+def _references(value):
+    """Returns the set of ``(name, attribute)`` a fragment references."""
+    found = set()
+
+    def record(name, attr):
+        found.add((name, attr))
+
+    rewrite_references(value, record)
+    return found
+
+
+def _attribute_name(name, attr):
+    if attr is None:
+        return name
+    return name + re.sub(r"[^A-Za-z0-9]", "", attr)
+
+
+def _depends_on(resource):
+    depends_on = resource.get("DependsOn", [])
+    if isinstance(depends_on, str):
+        return [depends_on]
+    return list(depends_on)
+
+
+def _digest(logical_id):
+    return hashlib.md5(logical_id.encode("utf-8")).hexdigest()
+
+
+def is_anchor(logical_id):
+    """Whether a resource starts a new child stack of :func:`partition`."""
+    return int(_digest(logical_id), 16) % ANCHOR_INTERVAL == 0
+
+
+def partition(resources, max_resources=MAX_RESOURCES,
+              max_bytes=MAX_TEMPLATE_BYTES):
+    """Chunks resources, in order, into groups that fit in a child stack.
+
+    A group ends before an anchor (see :func:`is_anchor`), or before the
+    resource that would take it over ``max_resources`` resources or half of
+    ``max_bytes``, leaving room for the parameters, mappings, conditions and
+    outputs of the child. Cutting at anchors keeps the other groups the same
+    when a resource is added or removed.
+
+    Returns:
+        list: Lists of logical IDs.
+    """
+    groups = [[]]
+    size = 0
+    for logical_id, resource in resources.items():
+        resource_size = len(json.dumps({logical_id: resource}))
+        group = groups[-1]
+        if group and (is_anchor(logical_id) or
+                      len(group) >= max_resources or
+                      size + resource_size > max_bytes // 2):
+            groups.append([])
+            size = 0
+        groups[-1].append(logical_id)
+        size += resource_size
+    return [group for group in groups if group]
+
+
+def _fill_parent(resources, max_resources, max_bytes):
+    """Returns the logical IDs the parent keeps, and groups of the rest."""
+    children = 1
+    while True:
+        kept, size = [], 0
+        for logical_id, resource in resources.items():
+            resource_size = len(json.dumps({logical_id: resource}))
+            if (len(kept) >= max_resources - children or
+                    size + resource_size > max_bytes // 2):
+                break
+            kept.append(logical_id)
+            size += resource_size
+        overflow = dict((logical_id, resources[logical_id])
+                        for logical_id in list(resources)[len(kept):])
+        groups = partition(overflow, max_resources, max_bytes)
+        # Every child is a resource of the parent too.
+        if len(groups) <= children:
+            return kept, groups
+        children = len(groups)
+
+
+def nested_stack_name(group, first=False):
+    """The logical ID of the child stack of a group of resources.
+
+    The first group of the overflow, unless it starts at an anchor, is
+    always ``NestedStack``, since which resource it starts with moves as the
+    parent fills up.
+    """
+    if first and not is_anchor(group[0]):
+        return NESTED_STACK_NAME % ""
+    return NESTED_STACK_NAME % _digest(group[0])[:8]
+
+
+def _check_acyclic(dependencies):
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(
+                "Cannot split the template: its nested stacks would depend "
+                "on each other (%s)." % name)
+        visiting.add(name)
+        for dependency in dependencies[name]:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in dependencies:
+        visit(name)
+
+
+def _export_value(logical_id, attr):
+    if attr is None:
+        return {"Ref": logical_id}
+    value = {"Fn::GetAtt": [logical_id, attr]}
+    if attr in LIST_ATTRIBUTES:
+        value = {"Fn::Join": [",", value]}
+    return value
+
+
+def split_template(template, template_url, max_resources=MAX_RESOURCES,
+                   max_bytes=MAX_TEMPLATE_BYTES):
+    """Spills the resources a template has no room for into nested stacks.
+
+    Args:
+        template (dict): The template, as returned by ``to_dict()``.
+        template_url (func): Called with the logical ID and the template
+            (dict) of every child, returns the TemplateURL to use for it.
+        max_resources (int): Most resources in the parent and in a child.
+        max_bytes (int): Largest size of a template.
+
+    Returns:
+        tuple: The parent template (dict), and a dict of the child templates
+            (dicts) keyed by the logical ID of their stack in the parent.
+
+    Raises:
+        ValueError: If the template cannot be split.
+    """
+    if "Transform" in template:
+        raise ValueError("Cannot split a template that uses a Transform.")
+
+    resources = template.get("Resources", {})
+    parameters = template.get("Parameters", {})
+    conditions = template.get("Conditions", {})
+    mappings = template.get("Mappings", {})
+
+    kept, groups = _fill_parent(resources, max_resources, max_bytes)
+    names = [nested_stack_name(group, i == 0)
+             for i, group in enumerate(groups)]
+    if len(set(names) | set(kept)) != len(names) + len(kept):
+        raise ValueError("Cannot split the template: its nested stack "
+                         "names clash (%s)." % ", ".join(names))
+    # The stack of every resource, None for the parent.
+    owner = dict((logical_id, None) for logical_id in kept)
+    for name, group in zip(names, groups):
+        for logical_id in group:
+            owner[logical_id] = name
+
+    exports = dict((name, {}) for name in names)
+
+    def export(logical_id, attr):
+        child = owner[logical_id]
+        output = _attribute_name(logical_id, attr)
+        exports[child][output] = (logical_id, attr)
+        return {"Fn::GetAtt": [child, "Outputs.%s" % output]}
+
+    children = {}
+    stack_parameters = {}
+    dependencies = {}
+    for name, group in zip(names, groups):
+        child_parameters = {}
+        values = {}
+        depends_on = set()
+
+        def replace(ref, attr):
+            if ref in owner and owner[ref] != name:
+                param = _attribute_name(ref, attr)
+                definition = {"Type": "String"}
+                if attr in LIST_ATTRIBUTES:
+                    definition = {"Type": "CommaDelimitedList"}
+                child_parameters[param] = definition
+                if owner[ref] is None:
+                    values[param] = _export_value(ref, attr)
+                    depends_on.add(ref)
+                else:
+                    values[param] = export(ref, attr)
+                    depends_on.add(owner[ref])
+                return {"Ref": param}, param
+            if ref in parameters and attr is None:
+                child_parameters[ref] = parameters[ref]
+                values[ref] = {"Ref": ref}
+            return None
+
+        child_resources = {}
+        for logical_id in group:
+            resource = rewrite_references(resources[logical_id], replace)
+            local, foreign = [], []
+            for dependency in _depends_on(resource):
+                if owner.get(dependency) == name:
+                    local.append(dependency)
+                else:
+                    foreign.append(dependency)
+            depends_on.update(owner[d] or d for d in foreign if d in owner)
+            if foreign:
+                if local:
+                    resource["DependsOn"] = local
+                else:
+                    del resource["DependsOn"]
+            child_resources[logical_id] = resource
+
+        child = {
+            "AWSTemplateFormatVersion": "2010-09-09",
+            "Resources": child_resources,
+        }
+        if conditions:
+            child["Conditions"] = rewrite_references(conditions, replace)
+        if mappings:
+            child["Mappings"] = mappings
+        children[name] = child
+        stack_parameters[name] = (child_parameters, values)
+        dependencies[name] = depends_on - set([name])
+
+    def replace_in_parent(ref, attr):
+        if owner.get(ref) is None:
+            return None
+        node = export(ref, attr)
+        token = "%s.%s" % tuple(node["Fn::GetAtt"])
+        if attr in LIST_ATTRIBUTES:
+            # The child output joins the list, split it back.
+            node = {"Fn::Split": [",", node]}
+        return node, token
+
+    parent_resources = {}
+    for logical_id in kept:
+        resource = rewrite_references(resources[logical_id],
+                                      replace_in_parent)
+        depends_on = _depends_on(resource)
+        if depends_on:
+            stacks = [owner.get(d) or d for d in depends_on]
+            resource["DependsOn"] = sorted(set(stacks), key=stacks.index)
+        dependencies[logical_id] = set(
+            owner[ref] or ref for ref, _ in _references(resource)
+            if ref in owner) | set(
+            owner[d] or d for d in depends_on if d in owner)
+        dependencies[logical_id].discard(logical_id)
+        parent_resources[logical_id] = resource
+
+    outputs = rewrite_references(template.get("Outputs", {}),
+                                 replace_in_parent)
+    _check_acyclic(dependencies)
+
+    parent = dict((k, v) for k, v in template.items() if k != "Resources")
+    if outputs:
+        parent["Outputs"] = outputs
+    parent["Resources"] = parent_resources
+    for name in names:
+        child = children[name]
+        child_parameters, values = stack_parameters[name]
+        if child_parameters:
+            child["Parameters"] = child_parameters
+        if exports[name]:
+            child["Outputs"] = dict(
+                (output, {"Value": _export_value(logical_id, attr)})
+                for output, (logical_id, attr) in exports[name].items())
+
+        properties = {"TemplateURL": template_url(name, child)}
+        if values:
+            properties["Parameters"] = values
+        stack = {"Type": "AWS::CloudFormation::Stack",
+                 "Properties": properties}
+        if dependencies[name]:
+            stack["DependsOn"] = sorted(dependencies[name])
+        parent["Resources"][name] = stack
+
+    return parent, children
+
+
+def nested_template_key(blueprint, name, rendered):
+    """The S3 key of a nested template, next to stacker's own templates."""
+    version = hashlib.md5(rendered.encode("utf-8")).hexdigest()[:8]
+    return "stack_templates/%s/%s-%s-%s.json" % (
+        blueprint.context.get_fqn(blueprint.name), blueprint.name, name,
+        version)
+
+
+def nested_template_url(blueprint, name, rendered):
+    """The URL of a nested template in the stacker bucket.
+
+    Without a bucket, this is the relative path ``render`` writes the nested
+    template to, and :func:`upload_nested_templates` refuses to deploy it.
+    """
+    bucket = blueprint.context.bucket_name
+    if not bucket:
+        return "%s-%s.json" % (blueprint.name, name)
+    key = nested_template_key(blueprint, name, rendered)
+    return "https://%s.s3.amazonaws.com/%s" % (bucket, key)
+
+
+def upload_nested_templates(blueprint, s3=None):
+    """Pushes a blueprint's nested templates to the stacker bucket.
+
+    Rendering never uploads anything; :mod:`stacker_blueprints.builder` does it
+    before pushing the parent template. Templates already in the bucket are
+    not uploaded again. Nothing is uploaded when
+    ``STACKER_BLUEPRINTS_SKIP_NESTED_UPLOAD`` is set.
+
+    Args:
+        blueprint (:class:`stacker_blueprints.base.Blueprint`): A rendered
+            blueprint.
+        s3 (optional): The S3 client to upload with. One for the stacker
+            bucket region is created if not given.
+
+    Raises:
+        ValueError: If stacker has no bucket to upload the templates to.
+    """
+    if not blueprint.nested_templates or os.environ.get(SKIP_UPLOAD_ENV):
+        return
+
+    context = blueprint.context
+    bucket = context.bucket_name
+    if not bucket:
+        raise ValueError(
+            "Cannot deploy %s as nested stacks: their templates need a "
+            "stacker_bucket to be uploaded to." % blueprint.name)
+
+    import botocore.exceptions
+    from stacker.session_cache import get_session
+
+    if s3 is None:
+        s3 = get_session(context.config.stacker_bucket_region).client("s3")
+    for name, rendered in blueprint.nested_templates.items():
+        key = nested_template_key(blueprint, name, rendered)
+        try:
+            s3.head_object(Bucket=bucket, Key=key)
+            continue
+        except botocore.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] != "404":
+                raise
+        s3.put_object(Bucket=bucket, Key=key, Body=rendered,
+                      ServerSideEncryption="AES256",
+                      ACL="bucket-owner-full-control")
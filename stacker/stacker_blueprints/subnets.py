@@ -0,0 +1,258 @@
+"""Subnet CIDR allocation for the VPC and Network blueprints.
+
+:func:`allocate_subnets` carves one private and one public subnet per
+Availability Zone out of a VPC's CidrBlock: large private subnets (/19 by
+default) from the start of the block, then small public ones (/24). Room is
+always kept for :data:`MAX_AZ_COUNT` zones, so raising the AZ count adds
+subnets without moving the existing ones.
+
+IPv6 subnets are /64s of the VPC's Amazon provided /56, numbered by
+:func:`ipv6_subnet_index` in the same order.
+
+The subnets of every VPC and Network stack of a config can be checked for
+overlaps, without calling AWS::
+
+    python -m stacker_blueprints.subnets conf/example_vpc/example.env \\
+        conf/example_vpc/stacker.yml
+"""
+from __future__ import print_function
+
+import ipaddress
+import logging
+import sys
+
+from troposphere import Cidr, Select
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRIVATE_PREFIX = 19
+DEFAULT_PUBLIC_PREFIX = 24
+
+# The Availability Zones room is kept for in a layout.
+MAX_AZ_COUNT = 6
+
+# The /64 subnets of an Amazon provided /56 IPv6 block.
+IPV6_SUBNET_COUNT = 256
+IPV6_SUBNET_BITS = 64
+
+
+def allocate(cidr_block, prefixes):
+    """Allocates consecutive, aligned subnets from a block.
+
+    Args:
+        cidr_block (str): The block to allocate from.
+        prefixes (list): The prefix length of each subnet, in order.
+
+    Returns:
+        list: The subnets, as strings.
+
+    Raises:
+        ValueError: If the subnets do not fit in the block.
+    """
+    network = ipaddress.ip_network(cidr_block)
+    cursor = int(network.network_address)
+    end = int(network.broadcast_address) + 1
+    subnets = []
+    for prefix in prefixes:
+        if prefix < network.prefixlen or prefix > network.max_prefixlen:
+            raise ValueError("A /%d subnet cannot be allocated from %s." % (
+                prefix, cidr_block))
+        size = 2 ** (network.max_prefixlen - prefix)
+        cursor = -(-cursor // size) * size
+        if cursor + size > end:
+            raise ValueError("%s is too small for %d subnets of /%s." % (
+                cidr_block, len(prefixes),
+                ", /".join(str(p) for p in sorted(set(prefixes)))))
+        subnets.append(str(type(network)((cursor, prefix))))
+        cursor += size
+    return subnets
+
+
+def allocate_subnets(cidr_block, az_count,
+                     private_prefix=DEFAULT_PRIVATE_PREFIX,
+                     public_prefix=DEFAULT_PUBLIC_PREFIX):
+    """The private and public subnets of the first ``az_count`` zones.
+
+    Returns:
+        tuple: The list of private subnets and the list of public subnets.
+    """
+    slots = max(az_count, MAX_AZ_COUNT)
+    subnets = allocate(cidr_block,
+                       [private_prefix] * slots + [public_prefix] * slots)
+    return subnets[:az_count], subnets[slots:slots + az_count]
+
+
+def network_cidr_block(vpc_cidr_block, az_index, network_type,
+                       private_prefix=DEFAULT_PRIVATE_PREFIX,
+                       public_prefix=DEFAULT_PUBLIC_PREFIX):
+    """The subnet :func:`allocate_subnets` gives a zone's private or public
+    network.
+    """
+    private, public = allocate_subnets(vpc_cidr_block, az_index + 1,
+                                       private_prefix, public_prefix)
+    return (private if network_type == "private" else public)[az_index]
+
+
+def ipv6_subnet_index(az_index, network_type, az_count=0):
+    """The index of the IPv6 /64 of a zone's private or public subnet."""
+    if network_type == "private":
+        return az_index
+    return max(az_count, az_index + 1, MAX_AZ_COUNT) + az_index
+
+
+def ipv6_cidr_block(vpc_ipv6_cidr_block, index):
+    """The ``index``-th /64 of a VPC's IPv6 block, as a template function.
+    """
+    return Select(index, Cidr(vpc_ipv6_cidr_block, IPV6_SUBNET_COUNT,
+                              IPV6_SUBNET_BITS))
+
+
+def find_overlaps(subnets):
+    """Finds the subnets that overlap.
+
+    Args:
+        subnets (list): ``(name, cidr)`` pairs.
+
+    Returns:
+        list: The ``(name, name)`` pairs of overlapping subnets.
+    """
+    ranges = sorted(
+        (int(n.network_address), int(n.broadcast_address), name)
+        for name, n in ((name, ipaddress.ip_network(cidr))
+                        for name, cidr in subnets)
+    )
+    overlaps = []
+    open_ranges = []
+    for start, end, name in ranges:
+        open_ranges = [r for r in open_ranges if r[1] >= start]
+        overlaps.extend((other, name) for _, _, other in open_ranges)
+        open_ranges.append((start, end, name))
+    return overlaps
+
+
+def check_subnets(subnets, cidr_block=None):
+    """Checks that subnets do not overlap, and fit in ``cidr_block``.
+
+    Raises:
+        ValueError: If they do not.
+    """
+    if cidr_block:
+        block = ipaddress.ip_network(cidr_block)
+        for name, cidr in subnets:
+            subnet = ipaddress.ip_network(cidr)
+            if (subnet.version != block.version or
+                    subnet.network_address < block.network_address or
+                    subnet.broadcast_address > block.broadcast_address):
+                raise ValueError("Subnet %s (%s) is not in %s." % (
+                    name, cidr, cidr_block))
+    overlaps = find_overlaps(subnets)
+    if overlaps:
+        raise ValueError("Overlapping subnets: %s" % ", ".join(
+            "%s and %s" % pair for pair in overlaps))
+
+
+def config_subnets(stacks):
+    """The subnets of the VPC and Network stacks of a config.
+
+    Args:
+        stacks (list): :class:`stacker.stack.Stack` objects, with stubbed
+            lookups.
+
+    Returns:
+        tuple: The ``(name, cidr)`` subnets by VPC, the VpcCidrBlock given
+            for each VPC, if any, and the errors of the stacks that failed
+            to resolve. Networks are grouped by their resolved VpcId.
+    """
+    from .network import Network
+    from .vpc import VPC
+
+    by_vpc = {}
+    blocks = {}
+    errors = []
+    for stack in stacks:
+        blueprint = stack.blueprint
+        if not isinstance(blueprint, (VPC, Network)):
+            continue
+        try:
+            stack.resolve(stack.context, None)
+            if isinstance(blueprint, VPC):
+                vpc = stack.name
+                cidrs = blueprint.get_subnet_cidrs()
+                found = [("%s %s%d" % (stack.name, net_type, i), cidr)
+                         for net_type in sorted(cidrs)
+                         for i, cidr in enumerate(cidrs[net_type])]
+                blocks[vpc] = blueprint.get_variables()["CidrBlock"]
+            else:
+                vpc = blueprint.vpc_id
+                found = [(stack.name, blueprint.cidr_block)]
+                if blueprint.get_variables()["VpcCidrBlock"]:
+                    blocks.setdefault(
+                        vpc, blueprint.get_variables()["VpcCidrBlock"])
+        except Exception as e:
+            logger.debug("Failed to resolve %s.", stack.name, exc_info=True)
+            errors.append("%s: %s" % (stack.name, e))
+            continue
+        by_vpc.setdefault(vpc, []).extend(found)
+    return by_vpc, blocks, errors
+
+
+def parse_args(argv=None):
+    # Only the CLI needs these, keep them out of the blueprints' imports.
+    import argparse
+    from stacker.commands.stacker.base import (
+        KeyValueAction,
+        environment_file,
+        key_value_arg,
+    )
+    from stacker.environment import DictWithSourceType
+
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.subnets",
+        description="Check that the subnets of the VPC and Network stacks "
+                    "of a stacker config do not overlap.",
+    )
+    parser.add_argument(
+        "-e", "--env", dest="cli_envs", metavar="ENV=VALUE",
+        type=key_value_arg, action=KeyValueAction, default={},
+        help="Adds environment key/value pairs from the command line. "
+             "Overrides your environment file settings. Can be specified "
+             "more than once.")
+    parser.add_argument(
+        "environment", type=environment_file, nargs="?",
+        default=DictWithSourceType("simple"),
+        help="Path to a stacker environment file.")
+    parser.add_argument(
+        "config", type=argparse.FileType(),
+        help="The stacker config file. If `-` is provided, then the config "
+             "will be read from stdin.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from .render.runner import load_stacks
+
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    args.environment.update(args.cli_envs)
+    stacks = load_stacks(args.config.read(), args.environment)
+    by_vpc, blocks, errors = config_subnets(stacks)
+    for vpc in sorted(by_vpc):
+        print("%s%s" % (vpc, " (%s)" % blocks[vpc] if vpc in blocks else ""))
+        for name, cidr in sorted(by_vpc[vpc],
+                                 key=lambda s: ipaddress.ip_network(s[1])):
+            print("  %-18s %s" % (cidr, name))
+        try:
+            check_subnets(by_vpc[vpc], blocks.get(vpc))
+        except ValueError as e:
+            errors.append("%s: %s" % (vpc, e))
+
+    if errors:
+        for error in errors:
+            logger.error("%s", error)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Snapshot tests of every blueprint against golden templates.
+
+Each ``fixtures/configs/*.yaml`` file is a small stacker config: a
+``namespace`` and a list of ``stacks`` with a ``name``, a ``class_path`` and
+``variables``. Every stack is rendered and compared with
+``fixtures/blueprints/<name>.json``. The comparison is structural: both
+templates go through :func:`canonicalize` first, so key order, indentation and
+equivalent spellings (``Fn::GetAtt`` as a string or a list, a single
+``DependsOn``) do not matter.
+
+Config files are rendered in parallel, one per worker. Rewrite the golden
+templates after an intentional change with::
+
+    python -m stacker_blueprints.tests.snapshots --update
+"""
+from __future__ import print_function
+
+import argparse
+import glob
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+from stacker.blueprints.base import Blueprint
+from stacker.config import Config
+from stacker.context import Context
+from stacker.util import load_object_from_string
+from stacker.variables import Variable
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+CONFIGS = os.path.join(FIXTURES, "configs")
+SNAPSHOTS = os.path.join(FIXTURES, "blueprints")
+
+# Blueprints that are only ever subclassed, and have no snapshot of their own.
+ABSTRACT_BLUEPRINTS = (
+    "stacker_blueprints.base.Blueprint",
+    "stacker_blueprints.ecs.BaseECSApp",
+    "stacker_blueprints.ecs.BaseECSTask",
+    "stacker_blueprints.elasticache.base.BaseReplicationGroup",
+    "stacker_blueprints.empire.base.EmpireBase",
+    "stacker_blueprints.firehose.base.BaseDeliveryStream",
+    "stacker_blueprints.iam_roles.RoleBaseBlueprint",
+    "stacker_blueprints.rds.aurora.base.AuroraCluster",
+    "stacker_blueprints.rds.aurora.base.Cluster",
+    "stacker_blueprints.rds.base.BaseRDS",
+    "stacker_blueprints.rds.base.ClusterInstance",
+    "stacker_blueprints.rds.base.MasterInstance",
+    "stacker_blueprints.rds.base.ReadReplica",
+)
+
+
+def canonicalize(value):
+    """Normalizes a template fragment for structural comparison."""
+    if isinstance(value, list):
+        return [canonicalize(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    result = {}
+    for key, item in value.items():
+        if key == "Fn::GetAtt" and isinstance(item, str):
+            item = item.split(".", 1)
+        elif key == "DependsOn" and isinstance(item, str):
+            item = [item]
+        elif key == "DependsOn" and isinstance(item, list) and all(
+                isinstance(i, str) for i in item):
+            # A resource's DependsOn; a container's is a list of objects.
+            item = sorted(item)
+        result[key] = canonicalize(item)
+    return result
+
+
+def load_template(path):
+    with open(path) as fd:
+        return canonicalize(json.load(fd))
+
+
+def differences(expected, actual, path="$"):
+    """Yields a readable line for every place two templates differ."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            child = "%s.%s" % (path, key)
+            if key not in actual:
+                yield "%s: missing" % child
+            elif key not in expected:
+                yield "%s: unexpected %s" % (child, json.dumps(actual[key]))
+            else:
+                for line in differences(expected[key], actual[key], child):
+                    yield line
+    elif (isinstance(expected, list) and isinstance(actual, list) and
+            len(expected) == len(actual)):
+        for i, (old, new) in enumerate(zip(expected, actual)):
+            for line in differences(old, new, "%s[%d]" % (path, i)):
+                yield line
+    elif expected != actual:
+        yield "%s: expected %s, got %s" % (
+            path, json.dumps(expected), json.dumps(actual))
+
+
+class FixtureLoader(yaml.SafeLoader):
+    """Loads ``!troposphere/<module>.<class>`` mappings as troposphere objects,
+    for variables that take one rather than a dict."""
+
+
+def _construct_troposphere(loader, suffix, node):
+    cls = load_object_from_string("troposphere." + suffix)
+    return cls.from_dict(None, loader.construct_mapping(node, deep=True))
+
+
+FixtureLoader.add_multi_constructor("!troposphere/", _construct_troposphere)
+
+
+def load_config(path):
+    with open(path) as fd:
+        return yaml.load(fd, Loader=FixtureLoader)
+
+
+def config_paths():
+    return sorted(glob.glob(os.path.join(CONFIGS, "*.yaml")))
+
+
+def render_stack(stack, namespace):
+    """Renders a fixture stack, returning its canonical template."""
+    context = Context(config=Config({"namespace": namespace}))
+    blueprint_class = load_object_from_string(stack["class_path"])
+    blueprint = blueprint_class(stack["name"], context)
+    blueprint.resolve_variables([
+        Variable(k, v) for k, v in (stack.get("variables") or {}).items()])
+    return canonicalize(json.loads(blueprint.render_template()[1]))
+
+
+def blueprint_classes():
+    """Returns the class path of every blueprint in stacker_blueprints."""
+    import stacker_blueprints
+
+    found = set()
+    for module in pkgutil.walk_packages(stacker_blueprints.__path__,
+                                        "stacker_blueprints."):
+        name = module.name
+        if name.endswith("__main__") or name.split(".")[1] in (
+                "benchmarks", "render", "tests"):
+            continue
+        for value in vars(importlib.import_module(name)).values():
+            if (inspect.isclass(value) and issubclass(value, Blueprint) and
+                    value.__module__ == name):
+                found.add("%s.%s" % (name, value.__name__))
+    return found
+
+
+def check_config(path, update=False):
+    """Renders the stacks of a config file against their snapshots.
+
+    Returns:
+        list: A ``(stack name, class path, differences)`` tuple per stack.
+            A render error, or a missing snapshot, is reported as a
+            difference.
+    """
+    config = load_config(path)
+    results = []
+    for stack in config["stacks"]:
+        snapshot = os.path.join(SNAPSHOTS, "%s.json" % stack["name"])
+        try:
+            rendered = render_stack(stack, config["namespace"])
+        except Exception as e:
+            results.append((stack["name"], stack["class_path"],
+                            ["render failed: %s: %s" % (
+                                type(e).__name__, e)]))
+            continue
+
+        if update:
+            with open(snapshot, "w") as fd:
+                json.dump(rendered, fd, indent=4, sort_keys=True)
+                fd.write("\n")
+        if not os.path.exists(snapshot):
+            found = ["no snapshot at %s" % snapshot]
+        else:
+            found = list(differences(load_template(snapshot), rendered))
+        results.append((stack["name"], stack["class_path"], found))
+    return results
+
+
+def check_all(paths=None, update=False, jobs=None):
+    """Checks every config file, in parallel.
+
+    Returns:
+        list: The results of :func:`check_config` for all the files.
+    """
+    paths = config_paths() if paths is None else paths
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(check_config, path, update) for path in paths]
+        return [result for f in futures for result in f.result()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m stacker_blueprints.tests.snapshots",
+        description="Compare every blueprint fixture with its snapshot.")
+    parser.add_argument(
+        "--update", action="store_true",
+        help="Rewrite the snapshots from the rendered templates.")
+    parser.add_argument(
+        "-j", "--jobs", type=int,
+        help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument(
+        "configs", nargs="*", metavar="CONFIG",
+        help="Fixture configs to check. Defaults to all of them.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = check_all(args.configs or None, args.update, args.jobs)
+    failed = 0
+    for name, class_path, found in results:
+        if found:
+            failed += 1
+            print("%s (%s):" % (name, class_path))
+            for line in found:
+                print("    %s" % line)
+    print("%d of %d snapshot(s) differ." % (failed, len(results)))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
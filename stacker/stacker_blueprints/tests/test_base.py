@@ -0,0 +1,57 @@
+import unittest
+
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.base import Blueprint, variable_property
+from stacker_blueprints.vpc import VPC
+
+
+class Example(Blueprint):
+    VARIABLES = {
+        "Name": {"type": str, "default": "example"},
+    }
+
+    calls = 0
+
+    @variable_property
+    def upper_name(self):
+        self.calls += 1
+        return self.get_variables()["Name"].upper()
+
+
+class TestBlueprint(unittest.TestCase):
+    def setUp(self):
+        self.blueprint = Example("example", Context())
+        self.blueprint.resolve_variables([Variable("Name", "first")])
+
+    def test_variables_are_read_only(self):
+        variables = self.blueprint.get_variables()
+        with self.assertRaises(TypeError):
+            variables["Name"] = "other"
+
+    def test_variables_view_is_reused(self):
+        self.assertIs(self.blueprint.get_variables(),
+                      self.blueprint.get_variables())
+
+    def test_variable_property_is_cached(self):
+        self.assertEqual(self.blueprint.upper_name, "FIRST")
+        self.assertEqual(self.blueprint.upper_name, "FIRST")
+        self.assertEqual(self.blueprint.calls, 1)
+
+    def test_resolve_variables_invalidates_cache(self):
+        self.assertEqual(self.blueprint.upper_name, "FIRST")
+        self.blueprint.resolve_variables([Variable("Name", "second")])
+        self.assertEqual(self.blueprint.upper_name, "SECOND")
+        self.assertEqual(self.blueprint.calls, 2)
+
+    def test_vpc_subnets_are_allocated_once(self):
+        vpc = VPC("vpc", Context({"namespace": "test"}))
+        vpc.resolve_variables([Variable("AZCount", 6),
+                               Variable("CidrBlock", "10.0.0.0/16")])
+        self.assertIs(vpc.get_subnet_cidrs(), vpc.get_subnet_cidrs())
+        self.assertIs(vpc.nat_instance_kwargs, vpc.nat_instance_kwargs)
+        vpc.resolve_variables([Variable("AZCount", 2),
+                               Variable("CidrBlock", "10.1.0.0/16")])
+        self.assertEqual(vpc.get_subnet_cidrs()["private"],
+                         ["10.1.0.0/19", "10.1.32.0/19"])
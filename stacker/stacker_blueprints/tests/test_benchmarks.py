@@ -0,0 +1,135 @@
+import importlib.util
+import json
+import os
+import unittest
+
+import boto3
+from botocore.stub import Stubber
+
+from stacker_blueprints.benchmarks import deploy
+from stacker_blueprints.benchmarks.cases import CASES
+from stacker_blueprints.benchmarks.imports import over_budget
+from stacker_blueprints.benchmarks.suite import (
+    build_blueprint,
+    compare,
+    render,
+)
+from stacker_blueprints.split import SKIP_UPLOAD_ENV
+
+
+class TestBenchmarkCases(unittest.TestCase):
+    def setUp(self):
+        os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    def tearDown(self):
+        del os.environ[SKIP_UPLOAD_ENV]
+
+    def test_every_case_renders(self):
+        for case in CASES:
+            for size in case.sizes:
+                rendered = render(build_blueprint(case, size))
+                self.assertIn("Resources", json.loads(rendered))
+
+
+class TestCompare(unittest.TestCase):
+    def setUp(self):
+        self.baseline = {
+            "VPC": {
+                "small": {
+                    "seconds": 0.1,
+                    "peak_memory": 1000000,
+                    "output_bytes": 1000,
+                },
+            },
+        }
+
+    def results(self, **kwargs):
+        result = dict(self.baseline["VPC"]["small"])
+        result.update(kwargs)
+        return {"VPC": {"small": result}}
+
+    def test_no_regression(self):
+        self.assertEqual(compare(self.results(seconds=0.12), self.baseline),
+                         [])
+
+    def test_time_regression(self):
+        regressions = compare(self.results(seconds=0.2), self.baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("seconds", regressions[0])
+
+    def test_output_growth_is_a_regression(self):
+        regressions = compare(self.results(output_bytes=1001), self.baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("output_bytes", regressions[0])
+
+    def test_custom_tolerance(self):
+        regressions = compare(self.results(output_bytes=1001), self.baseline,
+                              {"output_bytes": 0.01})
+        self.assertEqual(regressions, [])
+
+    def test_missing_baseline_is_ignored(self):
+        self.assertEqual(compare({"Network": self.results()["VPC"]},
+                                 self.baseline), [])
+
+
+class TestOverBudget(unittest.TestCase):
+    def test_over_budget(self):
+        messages = over_budget({"a": 0.2, "b": 0.05}, {"a": 0.1, "b": 0.1})
+        self.assertEqual(len(messages), 1)
+        self.assertIn("a", messages[0])
+
+    def test_missing_budget_is_ignored(self):
+        self.assertEqual(over_budget({"a": 0.2}, {}), [])
+
+
+def get_case(name):
+    return next(case for case in CASES if case.name == name)
+
+
+class TestDeploy(unittest.TestCase):
+    def setUp(self):
+        os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    def tearDown(self):
+        del os.environ[SKIP_UPLOAD_ENV]
+
+    def test_call_counter(self):
+        client = boto3.client("cloudformation", region_name="us-east-1",
+                              aws_access_key_id="a", aws_secret_access_key="b")
+        counter = deploy.CallCounter(client)
+        with Stubber(client) as stubber:
+            for _ in range(2):
+                stubber.add_response("describe_stacks", {"Stacks": []})
+            client.describe_stacks()
+            client.describe_stacks()
+        self.assertEqual(counter.total, 2)
+        self.assertEqual(counter.calls["DescribeStacks"], 2)
+
+    def test_update_template(self):
+        blueprint, _ = deploy.update_template(get_case("Queues"), "small")
+        self.assertEqual(blueprint.name, "Queues-medium")
+        _, template = deploy.update_template(get_case("Cluster"), "small")
+        self.assertEqual(json.loads(template)["Metadata"],
+                         {"DeployBenchmark": "update"})
+
+    def test_no_longer_deployed(self):
+        case = get_case("Queues")
+        baseline = {"Queues": {"small": {}, "large": {}}}
+        self.assertEqual(
+            deploy.no_longer_deployed({}, baseline, [case], ["small"]),
+            ["Queues (small): no longer deploys"])
+        self.assertEqual(deploy.no_longer_deployed(
+            {"Queues": {"small": {}}}, baseline, [case], ["small"]), [])
+
+    @unittest.skipUnless(importlib.util.find_spec("moto"),
+                         "moto is not installed")
+    def test_deploy_case(self):
+        server, endpoint_url = deploy.start_server()
+        try:
+            client = deploy.get_client(endpoint_url)
+            result = deploy.deploy_case(client, deploy.CallCounter(client),
+                                        get_case("Queues"), "small")
+        finally:
+            server.stop()
+        self.assertEqual(result["status"], "deployed")
+        self.assertEqual(result["create_calls"], 2)
@@ -0,0 +1,46 @@
+import os
+import unittest
+from unittest import mock
+
+from stacker.config import Config
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints import split
+from stacker_blueprints.builder.command import Action
+from stacker_blueprints.sqs import Queues
+
+
+class SmallQueues(Queues):
+    RESOURCE_LIMIT = 2
+
+
+class TestAction(unittest.TestCase):
+    def action(self, bucket):
+        context = Context(config=Config({
+            "namespace": "test", "stacker_bucket": bucket,
+            "stacker_bucket_region": "us-east-1"}))
+        blueprint = SmallQueues("queues", context)
+        blueprint.resolve_variables([Variable("Queues", dict(
+            ("Q%d" % i, {"DelaySeconds": i}) for i in range(3)))])
+        return Action(context), blueprint
+
+    def test_nested_templates_are_uploaded_first(self):
+        action, blueprint = self.action("b")
+        calls = mock.Mock()
+        with mock.patch.object(split, "upload_nested_templates",
+                               calls.upload), \
+                mock.patch.object(Action, "s3_stack_push", calls.push):
+            calls.push.return_value = "https://b.s3.amazonaws.com/queues"
+            template = action._template(blueprint)
+        self.assertEqual(calls.mock_calls, [
+            mock.call.upload(blueprint, action.s3_conn),
+            mock.call.push(blueprint)])
+        self.assertEqual(template.url, calls.push.return_value)
+
+    def test_no_bucket(self):
+        action, blueprint = self.action("")
+        with mock.patch.dict(os.environ):
+            os.environ.pop(split.SKIP_UPLOAD_ENV, None)
+            with self.assertRaisesRegex(ValueError, "stacker_bucket"):
+                action._template(blueprint)
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from stacker.config import Config
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.cache import (
+    CACHE_DIR_ENV,
+    TemplateCache,
+    template_key,
+)
+from stacker_blueprints.sqs import Queues
+
+
+def queues(name, **properties):
+    blueprint = Queues("queues", Context(
+        config=Config({"namespace": "test"})))
+    blueprint.resolve_variables(
+        [Variable("Queues", {name: properties})])
+    return blueprint
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_and_set(self):
+        cache = TemplateCache(self.path)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", "{}")
+        self.assertEqual(cache.get("key"), "{}")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TemplateCache(self.path, max_bytes=20)
+        cache.set("a", "x" * 10)
+        cache.set("b", "x" * 10)
+        past = time.time() - 60
+        os.utime(os.path.join(self.path, "b.json"), (past, past))
+        cache.get("a")
+        cache.set("c", "x" * 10)
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+
+class TestTemplateKey(unittest.TestCase):
+    def test_same_variables_same_key(self):
+        self.assertEqual(template_key(queues("a", DelaySeconds=1)),
+                         template_key(queues("a", DelaySeconds=1)))
+
+    def test_different_variables_different_key(self):
+        self.assertNotEqual(template_key(queues("a", DelaySeconds=1)),
+                            template_key(queues("a", DelaySeconds=2)))
+
+
+class TestCachedRender(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        os.environ[CACHE_DIR_ENV] = self.path
+
+    def tearDown(self):
+        del os.environ[CACHE_DIR_ENV]
+        shutil.rmtree(self.path)
+
+    def test_render_is_served_from_cache(self):
+        first = queues("a", DelaySeconds=1)
+        rendered = first.render_template()
+
+        second = queues("a", DelaySeconds=1)
+
+        def create_template():
+            raise AssertionError("create_template() should not run")
+
+        second.create_template = create_template
+        self.assertEqual(second.render_template(), rendered)
+        self.assertEqual(second.get_output_definitions(),
+                         first.get_output_definitions())
+        self.assertFalse(second.requires_change_set)
@@ -0,0 +1,79 @@
+import unittest
+
+from stacker_blueprints.diff import (
+    ADDED,
+    MODIFIED,
+    REMOVED,
+    diff_templates,
+    requires_replacement,
+    summarize,
+)
+
+
+def subnet(cidr, **tags):
+    return {
+        "Type": "AWS::EC2::Subnet",
+        "Properties": {"CidrBlock": cidr, "VpcId": "vpc-1", "Tags": tags},
+    }
+
+
+class TestDiffTemplates(unittest.TestCase):
+    def setUp(self):
+        self.old = {
+            "Resources": {
+                "A": subnet("10.0.0.0/24"),
+                "B": subnet("10.0.1.0/24"),
+                "C": subnet("10.0.2.0/24"),
+            },
+            "Outputs": {"A": {"Value": {"Ref": "A"}}},
+        }
+
+    def changes(self, new):
+        return dict(((c.section, c.logical_id), c)
+                    for c in diff_templates(self.old, new))
+
+    def test_identical(self):
+        self.assertEqual(diff_templates(self.old, self.old), [])
+
+    def test_added_removed_and_modified(self):
+        new = {
+            "Resources": {
+                "A": subnet("10.0.0.0/24", Name="a"),
+                "B": subnet("10.0.5.0/24"),
+                "D": subnet("10.0.3.0/24"),
+            },
+            "Outputs": {"A": {"Value": {"Ref": "B"}}},
+        }
+        changes = self.changes(new)
+        self.assertEqual(changes[("Resources", "D")].action, ADDED)
+        self.assertEqual(changes[("Resources", "C")].action, REMOVED)
+        self.assertEqual(changes[("Outputs", "A")].action, MODIFIED)
+
+        tags_only = changes[("Resources", "A")]
+        self.assertEqual(tags_only.properties, ["Tags"])
+        self.assertFalse(tags_only.replacement)
+
+        cidr = changes[("Resources", "B")]
+        self.assertEqual(cidr.properties, ["CidrBlock"])
+        self.assertTrue(cidr.replacement)
+
+        self.assertEqual(summarize(list(changes.values())), {
+            ADDED: 1, REMOVED: 1, MODIFIED: 3, "replacements": 1})
+
+    def test_type_change_replaces(self):
+        new = {"Resources": dict(self.old["Resources"])}
+        new["Resources"]["A"] = {"Type": "AWS::EC2::RouteTable",
+                                 "Properties": {"VpcId": "vpc-1"}}
+        new["Outputs"] = self.old["Outputs"]
+        change = self.changes(new)[("Resources", "A")]
+        self.assertTrue(change.replacement)
+        self.assertEqual(change.attributes, ["Properties", "Type"])
+
+
+class TestRequiresReplacement(unittest.TestCase):
+    def test_all_properties(self):
+        self.assertTrue(requires_replacement("AWS::ECS::TaskDefinition",
+                                             ["Cpu"]))
+
+    def test_unknown_type(self):
+        self.assertIsNone(requires_replacement("AWS::Foo::Bar", ["Baz"]))
@@ -0,0 +1,260 @@
+import unittest
+
+from stacker.context import Context
+from stacker.variables import Variable
+from troposphere import ecs
+
+from stacker_blueprints.ecs import (
+    FARGATE_CAPACITY_PROVIDERS,
+    BaseECSApp,
+    CapacityProviderStrategyItem,
+    Cluster,
+    SimpleECSApp,
+    SimpleECSTask,
+    SimpleFargateApp,
+    SimpleFargateTask,
+    check_capacity_provider_strategy,
+    check_containers,
+)
+
+
+def build(cls, **variables):
+    """Builds a task or app blueprint with the variables it requires."""
+    variables.setdefault("TaskName", "app")
+    variables.setdefault("Image", "app:latest")
+    variables.setdefault("CPU", 256)
+    variables.setdefault("Memory", 512)
+    if issubclass(cls, BaseECSApp):
+        variables.setdefault("AppName", "app")
+        variables.setdefault("Cluster", "cluster")
+    if issubclass(cls, SimpleFargateApp):
+        variables.setdefault("Subnets", ["subnet-1"])
+        variables.setdefault("SecurityGroup", "sg-1")
+    blueprint = cls("app", Context({"namespace": "test"}))
+    blueprint.resolve_variables(
+        [Variable(k, v) for k, v in variables.items()])
+    return blueprint
+
+
+def resources_of(blueprint):
+    blueprint.create_template()
+    return blueprint.template.to_dict()["Resources"]
+
+
+class TestAutoScaling(unittest.TestCase):
+    def test_disabled(self):
+        self.assertNotIn("ScalableTarget", resources_of(build(SimpleECSApp)))
+
+    def test_target_tracking(self):
+        resources = resources_of(build(SimpleECSApp, AutoScaling={
+            "MinCapacity": 1, "MaxCapacity": 4, "CPUTarget": 50}))
+        target = resources["ScalableTarget"]["Properties"]
+        self.assertEqual(target["ResourceId"]["Fn::Sub"][0],
+                         "service/cluster/${Name}")
+        policy = resources["CPUScalingPolicy"]["Properties"]
+        config = policy["TargetTrackingScalingPolicyConfiguration"]
+        self.assertEqual(config["TargetValue"], 50.0)
+        self.assertNotIn("MemoryScalingPolicy", resources)
+
+    def test_invalid(self):
+        cases = [
+            ({"MinCapacity": 1, "CPUTarget": 50}, "MaxCapacity"),
+            ({"MinCapacity": 3, "MaxCapacity": 2, "CPUTarget": 50},
+             "more than"),
+            ({"MinCapacity": 1, "MaxCapacity": 2}, "requires a target"),
+            ({"MinCapacity": 1, "MaxCapacity": 2, "CpuTarget": 50},
+             "Unknown AutoScaling key"),
+            ({"MinCapacity": 1, "MaxCapacity": 2, "RequestCountTarget": 50,
+              "RequestCountResourceLabel": "app/a/1/targetgroup/b/2"},
+             "LoadBalancerTargetGroupArns"),
+            ({"MinCapacity": 1, "MaxCapacity": 2,
+              "ScheduledActions": [{"Name": "night"}]}, "Schedule"),
+        ]
+        for config, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                build(SimpleECSApp, AutoScaling=config).create_template()
+
+    def test_desired_count(self):
+        service = resources_of(build(SimpleECSApp, Count=3))["Service"]
+        self.assertEqual(service["Properties"]["DesiredCount"], 3)
+        service = resources_of(build(SimpleECSApp, Count=3, AutoScaling={
+            "MinCapacity": 2, "MaxCapacity": 4, "CPUTarget": 50}))["Service"]
+        self.assertEqual(service["Properties"]["DesiredCount"],
+                         {"Ref": "AWS::NoValue"})
+
+    def test_count_out_of_range(self):
+        for count in (1, 5):
+            with self.assertRaisesRegex(ValueError, "Count"):
+                build(SimpleECSApp, Count=count, AutoScaling={
+                    "MinCapacity": 2, "MaxCapacity": 4, "CPUTarget": 50,
+                }).create_template()
+
+
+class TestCapacityProviderStrategy(unittest.TestCase):
+    def strategy(self, *items):
+        return [CapacityProviderStrategyItem(**item) for item in items]
+
+    def test_valid(self):
+        check_capacity_provider_strategy(self.strategy(
+            {"CapacityProvider": "FARGATE", "Base": 1, "Weight": 1},
+            {"CapacityProvider": "FARGATE_SPOT", "Weight": 3},
+        ), FARGATE_CAPACITY_PROVIDERS)
+
+    def test_invalid(self):
+        cases = [
+            ([{"CapacityProvider": "FARGATE", "Weight": 1},
+              {"CapacityProvider": "FARGATE", "Weight": 2}], "once"),
+            ([{"CapacityProvider": "my-asg", "Weight": 1}],
+             "Unknown capacity provider"),
+            ([{"CapacityProvider": "FARGATE", "Base": 1, "Weight": 1},
+              {"CapacityProvider": "FARGATE_SPOT", "Base": 1, "Weight": 1}],
+             "Base"),
+            ([{"CapacityProvider": "FARGATE", "Base": 1}], "Weight"),
+        ]
+        for items, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                check_capacity_provider_strategy(
+                    self.strategy(*items), FARGATE_CAPACITY_PROVIDERS)
+
+    def test_cluster_providers(self):
+        blueprint = Cluster("cluster", Context({"namespace": "test"}))
+        blueprint.resolve_variables([
+            Variable("CapacityProviders", ["FARGATE"]),
+            Variable("DefaultCapacityProviderStrategy", [
+                {"CapacityProvider": "FARGATE_SPOT", "Weight": 1}]),
+        ])
+        with self.assertRaisesRegex(ValueError, "FARGATE_SPOT"):
+            blueprint.create_template()
+
+
+class TestSidecars(unittest.TestCase):
+    def container(self, name, **kwargs):
+        return ecs.ContainerDefinition(Name=name, Image=name, **kwargs)
+
+    def depends_on(self, *names):
+        return [ecs.ContainerDependency(ContainerName=name, Condition="START")
+                for name in names]
+
+    def test_valid(self):
+        check_containers([
+            self.container("app", Cpu=256, Memory=512,
+                           DependsOn=self.depends_on("cache"),
+                           MountPoints=[ecs.MountPoint(
+                               SourceVolume="data", ContainerPath="/data")]),
+            self.container("cache", Cpu=256, MemoryReservation=512),
+        ], volumes=["data"], cpu="512", memory="1024")
+
+    def test_invalid(self):
+        cases = [
+            ([self.container("app", Memory=1), self.container("app")],
+             "Duplicate"),
+            ([self.container("app", Memory=1,
+                             DependsOn=self.depends_on("cache"))],
+             "unknown container cache"),
+            ([self.container("app", Memory=1, MountPoints=[ecs.MountPoint(
+                SourceVolume="data", ContainerPath="/data")])],
+             "unknown volume data"),
+            ([self.container("app", Memory=1,
+                             DependsOn=self.depends_on("cache")),
+              self.container("cache", Memory=1,
+                             DependsOn=self.depends_on("app"))],
+             "app -> cache -> app"),
+            ([self.container("app", Cpu=256)], "Memory or MemoryReservation"),
+        ]
+        for containers, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                check_containers(containers)
+
+    def test_task_totals(self):
+        with self.assertRaisesRegex(ValueError, "768 CPU units"):
+            check_containers([self.container("app", Cpu=512),
+                              self.container("proxy", Cpu=256)],
+                             cpu="512", memory="1024")
+
+    def test_fargate_remainder(self):
+        blueprint = build(SimpleFargateApp, CPU=512, Memory=1024, Sidecars=[
+            {"Name": "proxy", "Image": "proxy", "Cpu": 128, "Memory": 256}])
+        containers = resources_of(blueprint)[
+            "TaskDefinition"]["Properties"]["ContainerDefinitions"]
+        self.assertEqual([(c["Cpu"], c["Memory"]) for c in containers],
+                         [(384, 768), (128, 256)])
+        self.assertEqual(containers[1]["LogConfiguration"]["Options"][
+            "awslogs-stream-prefix"], "proxy")
+
+    def test_variables_are_not_changed(self):
+        blueprint = build(SimpleFargateApp, Sidecars=[
+            {"Name": "proxy", "Image": "proxy", "Memory": 256}])
+        resources_of(blueprint)
+        sidecar = blueprint.get_variables()["Sidecars"][0]
+        self.assertNotIn("LogConfiguration", sidecar.properties)
+
+    def test_fargate_exhausted(self):
+        blueprint = build(SimpleFargateApp, CPU=512, Memory=1024, Sidecars=[
+            {"Name": "proxy", "Image": "proxy", "Cpu": 512}])
+        with self.assertRaisesRegex(ValueError, "512 CPU units"):
+            blueprint.create_template()
+
+
+class TestResourceTuning(unittest.TestCase):
+    def test_fargate_ephemeral_storage(self):
+        blueprint = build(SimpleFargateTask, EphemeralStorage=50)
+        properties = resources_of(blueprint)[
+            "TaskDefinition"]["Properties"]
+        self.assertEqual(properties["EphemeralStorage"], {"SizeInGiB": 50})
+
+    def test_invalid(self):
+        nofile = {"Name": "nofile", "SoftLimit": 2048, "HardLimit": 1024}
+        cases = [
+            (SimpleECSTask, {"EphemeralStorage": 50}, "only be set on"),
+            (SimpleFargateTask, {"EphemeralStorage": 10}, "from 21 to 200"),
+            (SimpleFargateTask, {"SharedMemorySize": 64}, "SharedMemorySize"),
+            (SimpleFargateTask, {"Ulimits": [dict(nofile,
+                                                  HardLimit=2 ** 21)]},
+             "nofile to 1048576"),
+            (SimpleECSTask, {"Ulimits": [nofile]}, "SoftLimit"),
+            (SimpleECSTask, {"MemoryReservation": 1024}, "at most"),
+        ]
+        for cls, variables, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                build(cls, **variables).create_template()
+
+
+class TestServiceDiscovery(unittest.TestCase):
+    def test_existing_namespace(self):
+        resources = resources_of(build(
+            SimpleECSApp, ContainerPort=8080,
+            ServiceDiscovery={"NamespaceId": "ns-1"}))
+        self.assertNotIn("ServiceDiscoveryNamespace", resources)
+        dns = resources["ServiceDiscoveryService"]["Properties"]["DnsConfig"]
+        self.assertEqual(dns["DnsRecords"], [{"TTL": "10", "Type": "SRV"}])
+        self.assertEqual(
+            resources["Service"]["Properties"]["ServiceRegistries"],
+            [{"ContainerName": "app", "ContainerPort": 8080,
+              "RegistryArn": {"Fn::GetAtt": ["ServiceDiscoveryService",
+                                             "Arn"]}}])
+
+    def test_fargate_a_records(self):
+        resources = resources_of(build(
+            SimpleFargateApp,
+            ServiceDiscovery={"NamespaceName": "internal",
+                              "VpcId": "vpc-1"}))
+        self.assertIn("ServiceDiscoveryNamespace", resources)
+        registries = resources["Service"]["Properties"]["ServiceRegistries"]
+        self.assertNotIn("ContainerPort", registries[0])
+
+    def test_invalid(self):
+        cases = [
+            ({}, {"NamespaceId": "ns-1", "NamespaceName": "internal"},
+             "either NamespaceId"),
+            ({}, {"NamespaceName": "internal"}, "VpcId"),
+            ({}, {"NamespaceId": "ns-1", "Ttl": 5}, "Unknown"),
+            ({"ContainerPort": 80},
+             {"NamespaceId": "ns-1", "RecordTypes": ["A"]}, "awsvpc"),
+            ({}, {"NamespaceId": "ns-1"}, "ContainerPort"),
+            ({"ContainerPort": 80},
+             {"NamespaceId": "ns-1", "RecordTypes": ["CNAME"]}, "A or SRV"),
+        ]
+        for variables, config, message in cases:
+            with self.assertRaisesRegex(ValueError, message):
+                build(SimpleECSApp, ServiceDiscovery=config,
+                      **variables).create_template()
@@ -0,0 +1,54 @@
+import unittest
+
+from stacker.context import Context
+from stacker.variables import Variable
+from troposphere import Template
+
+from stacker_blueprints.network import Network
+from stacker_blueprints.endpoints import (
+    add_interface_endpoints,
+    interface_endpoint_title,
+)
+
+
+class TestInterfaceEndpoints(unittest.TestCase):
+    def test_titles(self):
+        self.assertEqual(interface_endpoint_title("ecr.api"),
+                         "EcrApiInterfaceEndpoint")
+        self.assertEqual(interface_endpoint_title("kinesis-streams"),
+                         "KinesisStreamsInterfaceEndpoint")
+        self.assertEqual(
+            interface_endpoint_title("com.amazonaws.eu-west-1.ecr.dkr"),
+            "EcrDkrInterfaceEndpoint")
+
+    def test_title_collision(self):
+        with self.assertRaisesRegex(ValueError, "EcrApiInterfaceEndpoint"):
+            add_interface_endpoints(Template(), ["ecr.api", "ecr-api"],
+                                    "vpc-1", ["subnet-1"], ["sg-1"])
+
+    def network(self, **variables):
+        variables.setdefault("VpcId", "vpc-1")
+        variables.setdefault("AvailabilityZone", "us-east-1a")
+        variables.setdefault("CidrBlock", "10.0.0.0/24")
+        variables.setdefault("InterfaceEndpoints", ["logs"])
+        blueprint = Network("network", Context({"namespace": "test"}))
+        blueprint.resolve_variables(
+            [Variable(k, v) for k, v in variables.items()])
+        return blueprint
+
+    def test_public_network(self):
+        blueprint = self.network(InternetGatewayId="igw-1",
+                                 VpcCidrBlock="10.0.0.0/16")
+        with self.assertRaisesRegex(ValueError, "private Network"):
+            blueprint.create_template()
+
+    def test_public_egress_only_gateway(self):
+        blueprint = self.network(InternetGatewayId="igw-1",
+                                 InterfaceEndpoints=[],
+                                 EgressOnlyInternetGatewayId="eigw-1")
+        with self.assertRaisesRegex(ValueError, "EgressOnlyInternetGateway"):
+            blueprint.create_template()
+
+    def test_security_group_required(self):
+        with self.assertRaisesRegex(ValueError, "VpcCidrBlock"):
+            self.network(NatGatewayId="nat-1").create_template()
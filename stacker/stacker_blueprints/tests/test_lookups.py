@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+
+from stacker.exceptions import StackDoesNotExist
+from stacker.lookups.registry import LOOKUP_HANDLERS
+from stacker.variables import Variable
+
+from stacker_blueprints import lookups
+from stacker_blueprints.lookups import (
+    OUTPUT_CACHE_DIR_ENV,
+    BatchedOutputLookup,
+    OutputCache,
+    referenced_stacks,
+    saved_calls,
+)
+
+
+def describe(*names):
+    return {"Stacks": [
+        {
+            "StackName": name,
+            "CreationTime": "2020-01-01T00:00:00Z",
+            "StackStatus": "CREATE_COMPLETE",
+            "Outputs": [{"OutputKey": "Id", "OutputValue": "%s-id" % name}],
+        }
+        for name in names
+    ]}
+
+
+class FakeStack(object):
+    def __init__(self, name, variables, outputs=None):
+        self.name = name
+        self.variables = [Variable(k, v) for k, v in variables.items()]
+        self.outputs = outputs
+
+
+class FakeContext(object):
+    def __init__(self, stacks):
+        self.stacks = stacks
+
+    def get_stacks(self):
+        return self.stacks
+
+    def get_stack(self, name):
+        for stack in self.stacks:
+            if stack.name == name:
+                return stack
+
+    def get_fqn(self, name):
+        return "test-%s" % name
+
+
+class FakeProvider(object):
+    region = "us-east-1"
+
+    def __init__(self):
+        self.cloudformation = boto3.client(
+            "cloudformation", region_name=self.region,
+            aws_access_key_id="testing", aws_secret_access_key="testing")
+
+    def get_stack(self, name):
+        return self.cloudformation.describe_stacks(
+            StackName=name)["Stacks"][0]
+
+
+class TestBatchedOutputLookup(unittest.TestCase):
+    def setUp(self):
+        lookups.reset()
+        self.saved_handler = LOOKUP_HANDLERS.get("output")
+        LOOKUP_HANDLERS["output"] = BatchedOutputLookup
+        self.provider = FakeProvider()
+        self.stubber = Stubber(self.provider.cloudformation)
+        self.context = FakeContext([
+            FakeStack("vpc", {}, outputs={"VpcId": "vpc-built"}),
+            FakeStack("app", {
+                "VpcId": "${output vpc::VpcId}",
+                "Subnets": ["${output netA::Id}", "${output netB::Id}"],
+            }),
+        ])
+
+    def tearDown(self):
+        LOOKUP_HANDLERS["output"] = self.saved_handler
+        os.environ.pop(OUTPUT_CACHE_DIR_ENV, None)
+        lookups.reset()
+
+    def lookup(self, value):
+        return BatchedOutputLookup.handle(value, context=self.context,
+                                          provider=self.provider)
+
+    def test_referenced_stacks(self):
+        self.assertEqual(
+            referenced_stacks(self.context, BatchedOutputLookup),
+            set(["test-vpc", "test-netA", "test-netB"]))
+
+    def test_outputs_of_built_stacks(self):
+        with self.stubber:
+            self.assertEqual(self.lookup("vpc::VpcId"), "vpc-built")
+        self.assertEqual(saved_calls(), 0)
+
+    def test_prefetches_referenced_stacks(self):
+        self.stubber.add_response("describe_stacks", dict(
+            describe("test-other", "test-netA"), NextToken="page2"), {})
+        self.stubber.add_response("describe_stacks", describe("test-netB"),
+                                  {"NextToken": "page2"})
+        with self.stubber:
+            self.assertEqual(self.lookup("netA::Id"), "test-netA-id")
+            self.assertEqual(self.lookup("netB::Id"), "test-netB-id")
+            self.assertEqual(self.lookup("netA::Id"), "test-netA-id")
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(saved_calls(), 1)
+
+    def test_stops_once_every_stack_is_found(self):
+        self.stubber.add_response("describe_stacks", dict(
+            describe("test-netA", "test-netB", "test-vpc"),
+            NextToken="page2"), {})
+        with self.stubber:
+            self.lookup("netB::Id")
+        self.stubber.assert_no_pending_responses()
+
+    def test_missing_stack(self):
+        self.stubber.add_response("describe_stacks",
+                                  describe("test-netA", "test-netB"), {})
+        self.stubber.add_client_error(
+            "describe_stacks",
+            service_message="Stack with id test-db does not exist",
+            expected_params={"StackName": "test-db"})
+        with self.stubber:
+            self.assertEqual(self.lookup("netA::Id"), "test-netA-id")
+            with self.assertRaises(ClientError):
+                self.lookup("db::Id")
+        self.stubber.assert_no_pending_responses()
+
+    def test_missing_from_prefetch(self):
+        self.stubber.add_response("describe_stacks", describe("test-netA"),
+                                  {})
+        with self.stubber:
+            with self.assertRaises(StackDoesNotExist):
+                self.lookup("netB::Id")
+
+    def test_disk_cache(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        os.environ[OUTPUT_CACHE_DIR_ENV] = path
+        self.stubber.add_response("describe_stacks",
+                                  describe("test-netA", "test-netB"), {})
+        with self.stubber:
+            self.lookup("netA::Id")
+        lookups.reset()
+        with self.stubber:
+            self.assertEqual(self.lookup("netB::Id"), "test-netB-id")
+        self.assertEqual(saved_calls(), 1)
+
+        cache = OutputCache(path, ttl=-1)
+        self.assertEqual(cache.get("us-east-1"), {})
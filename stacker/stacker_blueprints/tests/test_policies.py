@@ -0,0 +1,53 @@
+import unittest
+
+from awacs.aws import Statement
+from troposphere import Ref
+
+from stacker_blueprints.policies import (
+    FrozenPolicyError,
+    flowlogs_assumerole_policy,
+    lambda_basic_execution_statements,
+    lambda_vpc_execution_statements,
+    memoized_policy,
+)
+
+
+class TestMemoizedPolicy(unittest.TestCase):
+    def test_same_policy(self):
+        self.assertIs(flowlogs_assumerole_policy(),
+                      flowlogs_assumerole_policy())
+
+    def test_statement_lists_can_be_extended(self):
+        statements = lambda_vpc_execution_statements()
+        statements.append(Statement())
+        self.assertEqual(len(lambda_vpc_execution_statements()), 1)
+
+    def test_frozen(self):
+        statement = lambda_vpc_execution_statements()[0]
+        self.assertIsInstance(statement, Statement)
+        with self.assertRaises(FrozenPolicyError):
+            statement.Resource = ["arn:aws:ec2:::*"]
+        with self.assertRaises(AttributeError):
+            statement.Resource.append("arn:aws:ec2:::*")
+
+    def test_helpers_are_keyed_by_value(self):
+        first = lambda_basic_execution_statements(Ref("Function"))
+        second = lambda_basic_execution_statements(Ref("Function"))
+        other = lambda_basic_execution_statements(Ref("Other"))
+        self.assertIs(first[0], second[0])
+        self.assertIsNot(first[0], other[0])
+
+    def test_unkeyable_arguments_are_not_cached(self):
+        calls = []
+
+        @memoized_policy
+        def builder(value):
+            calls.append(value)
+            return []
+
+        argument = object()
+        builder(argument)
+        builder(argument)
+        builder("a")
+        builder("a")
+        self.assertEqual(calls, [argument, argument, "a"])
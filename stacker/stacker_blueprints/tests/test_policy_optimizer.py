@@ -0,0 +1,115 @@
+import unittest
+
+from awacs import ecs, s3, sqs
+from awacs.aws import Allow, Deny, Policy, Statement
+from troposphere import Ref
+
+from stacker_blueprints.policy_optimizer import (
+    collapse_actions,
+    compact_statements,
+    optimize_policy,
+    policy_size,
+    prune,
+)
+
+
+class TestPrune(unittest.TestCase):
+    def test_duplicates(self):
+        self.assertEqual(prune(["a", {"Ref": "B"}, "a", {"Ref": "B"}]),
+                         ["a", {"Ref": "B"}])
+
+    def test_wildcards(self):
+        self.assertEqual(
+            prune(["s3:getobject", "s3:Get*", "s3:PutObject"], True),
+            ["s3:Get*", "s3:PutObject"])
+        self.assertEqual(prune(["arn:aws:s3:::b/x", "arn:aws:s3:::b/*"]),
+                         ["arn:aws:s3:::b/*"])
+        self.assertEqual(prune([{"Ref": "B"}, "*"]), ["*"])
+
+    def test_patterns_matching_each_other(self):
+        self.assertEqual(prune(["a*", "a**"]), ["a*"])
+
+
+class TestCollapseActions(unittest.TestCase):
+    def test_verb(self):
+        describe = [a for a in dir(ecs) if a.startswith("Describe")]
+        actions = ["ecs:%s" % a for a in describe] + ["ecs:RunTask"]
+        self.assertEqual(collapse_actions(actions),
+                         ["ecs:Describe*", "ecs:RunTask"])
+
+    def test_incomplete(self):
+        actions = ["s3:GetObject", "s3:GetObjectAcl"]
+        self.assertEqual(collapse_actions(actions), actions)
+
+    def test_unknown_service(self):
+        actions = ["nope:GetA", "nope:GetB"]
+        self.assertEqual(collapse_actions(actions), actions)
+
+
+class TestCompactStatements(unittest.TestCase):
+    def test_merge_actions(self):
+        statements = [
+            {"Effect": "Allow", "Action": ["s3:GetObject"],
+             "Resource": ["*"]},
+            {"Effect": "Allow", "Action": ["sqs:SendMessage", "s3:GetObject"],
+             "Resource": "*"},
+        ]
+        self.assertEqual(compact_statements(statements), [
+            {"Effect": "Allow", "Action": ["s3:GetObject", "sqs:SendMessage"],
+             "Resource": "*"}])
+
+    def test_merge_resources(self):
+        statements = [
+            {"Effect": "Allow", "Action": ["s3:GetObject"],
+             "Resource": ["arn:aws:s3:::a/*"]},
+            {"Effect": "Allow", "Action": ["s3:GetObject"],
+             "Resource": [{"Ref": "B"}]},
+        ]
+        self.assertEqual(compact_statements(statements), [
+            {"Effect": "Allow", "Action": "s3:GetObject",
+             "Resource": ["arn:aws:s3:::a/*", {"Ref": "B"}]}])
+
+    def test_wildcards_are_opt_in(self):
+        describe = ["ecs:%s" % a for a in dir(ecs) if a.startswith("Describe")]
+        statements = [{"Effect": "Allow", "Action": describe,
+                       "Resource": "*"}]
+        self.assertEqual(compact_statements(statements), statements)
+        self.assertEqual(compact_statements(statements, wildcards=True), [
+            {"Effect": "Allow", "Action": "ecs:Describe*", "Resource": "*"}])
+
+    def test_no_cross_product(self):
+        statements = [
+            {"Effect": "Allow", "Action": "s3:GetObject", "Resource": "a"},
+            {"Effect": "Allow", "Action": "s3:PutObject", "Resource": "b"},
+        ]
+        self.assertEqual(compact_statements(statements), statements)
+
+    def test_different_effect_condition_or_sid(self):
+        statements = [
+            {"Effect": "Allow", "Action": "s3:GetObject", "Resource": "*"},
+            {"Effect": "Deny", "Action": "s3:PutObject", "Resource": "*"},
+            {"Effect": "Allow", "Action": "s3:PutObject", "Resource": "*",
+             "Condition": {"Bool": {"aws:SecureTransport": "true"}}},
+            {"Sid": "Named", "Effect": "Allow", "Action": "s3:ListBucket",
+             "Resource": "*"},
+        ]
+        self.assertEqual(compact_statements(statements), statements)
+
+
+class TestOptimizePolicy(unittest.TestCase):
+    def test_policy(self):
+        policy = Policy(Statement=[
+            Statement(Effect=Allow, Action=[sqs.SendMessage],
+                      Resource=[Ref("Queue")]),
+            Statement(Effect=Allow, Action=[sqs.SendMessage],
+                      Resource=[Ref("Queue")]),
+            Statement(Effect=Deny, Action=[s3.DeleteBucket],
+                      Resource=["*"]),
+        ])
+        document = optimize_policy(policy)
+        self.assertEqual(document["Statement"], [
+            {"Effect": "Allow", "Action": "sqs:SendMessage",
+             "Resource": {"Ref": "Queue"}},
+            {"Effect": "Deny", "Action": "s3:DeleteBucket", "Resource": "*"},
+        ])
+        self.assertLess(policy_size(document), policy_size(policy))
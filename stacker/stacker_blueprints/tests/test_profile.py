@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from stacker.context import Context
+from troposphere import Output, sqs
+
+from stacker_blueprints.base import Blueprint
+from stacker_blueprints.profile import PROFILE_DIR_ENV, folded
+
+
+class Phased(Blueprint):
+    def create_queue(self, name):
+        self.template.add_resource(sqs.Queue(name))
+
+    def create_queues(self):
+        for name in ("A", "B", "C"):
+            self.create_queue(name)
+
+    def create_outputs(self):
+        self.template.add_output(Output("A", Value="a"))
+
+    def create_template(self):
+        self.create_queues()
+        self.create_outputs()
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        os.environ.pop(PROFILE_DIR_ENV, None)
+        shutil.rmtree(self.path)
+
+    def test_off_by_default(self):
+        blueprint = Phased("phased", Context())
+        blueprint.render_template()
+        self.assertIsNone(blueprint.profile)
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_report(self):
+        os.environ[PROFILE_DIR_ENV] = self.path
+        blueprint = Phased("phased", Context())
+        blueprint.render_template()
+
+        root = blueprint.profile["profile"]
+        self.assertEqual(root["resources"], 3)
+        self.assertEqual(
+            [c["name"] for c in root["children"]],
+            ["import_mappings", "create_template", "setup_parameters",
+             "to_dict"])
+
+        create_template = root["children"][1]
+        queues, outputs = create_template["children"]
+        self.assertEqual((queues["name"], queues["resources"]),
+                         ("create_queues", 3))
+        queue = queues["children"][0]
+        self.assertEqual((queue["name"], queue["calls"]), ("create_queue", 3))
+        self.assertEqual((outputs["resources"], outputs["outputs"]), (0, 1))
+
+        # The instrumentation does not outlive the render.
+        self.assertNotIn("create_queue", vars(blueprint))
+
+        with open(os.path.join(self.path, "phased.json")) as fd:
+            self.assertEqual(json.load(fd), blueprint.profile)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.path, "phased.folded")))
+
+    def test_folded(self):
+        report = {"stack": "s", "profile": {
+            "name": "render", "self_seconds": 0.001, "children": [
+                {"name": "create_template", "self_seconds": 0.0025,
+                 "children": []},
+            ]}}
+        self.assertEqual(folded(report),
+                         "s;render 1000\ns;render;create_template 2500\n")
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from stacker.environment import parse_environment
+from stacker.lookups.registry import LOOKUP_HANDLERS
+
+from stacker_blueprints.lazy import LAZY_IMPORTS_ENV
+from stacker_blueprints.render.runner import (
+    render_all,
+    stub_value,
+    stubbed_lookups,
+)
+
+CONFIG = """
+namespace: ${namespace}
+stacks:
+  - name: vpc
+    class_path: stacker_blueprints.vpc.VPC2
+    variables:
+      VPC:
+        VPC:
+          CidrBlock: 10.128.0.0/16
+  - name: network
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc::VpcId}
+      VpcDefaultSecurityGroup: ${output vpc::DefaultSecurityGroup}
+      InternetGatewayId: ${output vpc::InternetGatewayId}
+      AvailabilityZone: ${availability_zone}
+      CidrBlock: 10.128.0.0/23
+  - name: broken
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc::VpcId}
+      AvailabilityZone: ${availability_zone}
+      CidrBlock: 10.128.2.0/23
+      NatGatewayId: ${output vpc::NatGatewayId}
+      InternetGatewayId: ${output vpc::InternetGatewayId}
+"""
+
+
+class TestRenderAll(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.environment = parse_environment(
+            "namespace: test\navailability_zone: us-east-1a\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def render(self, **kwargs):
+        report = render_all(CONFIG, self.environment, self.output_dir,
+                            **kwargs)
+        return dict((r["name"], r) for r in report["stacks"])
+
+    def test_writes_one_template_per_stack(self):
+        results = self.render(stack_names=["vpc", "network"], jobs=1)
+        self.assertEqual(sorted(results), ["network", "vpc"])
+        for name in results:
+            self.assertEqual(results[name]["status"], "rendered")
+            with open(os.path.join(self.output_dir, name + ".json")) as fd:
+                self.assertIn("Resources", json.load(fd))
+
+    def test_output_lookups_are_stubbed(self):
+        self.render(stack_names=["network"], jobs=1)
+        with open(os.path.join(self.output_dir, "network.json")) as fd:
+            template = json.load(fd)
+        subnet = template["Resources"]["Subnet"]["Properties"]
+        self.assertEqual(subnet["VpcId"], stub_value("output", "vpc::VpcId"))
+
+    def test_failures_are_reported(self):
+        results = self.render(jobs=1)
+        self.assertEqual(results["broken"]["status"], "failed")
+        self.assertIn("error", results["broken"])
+        self.assertEqual(results["network"]["status"], "rendered")
+
+    def test_process_pool(self):
+        results = self.render(stack_names=["vpc", "network"], jobs=2)
+        self.assertEqual(set(r["status"] for r in results.values()),
+                         set(["rendered"]))
+
+    def test_unknown_stack(self):
+        with self.assertRaises(ValueError):
+            self.render(stack_names=["missing"], jobs=1)
+
+
+class TestStubbedLookups(unittest.TestCase):
+    def test_handlers_are_restored(self):
+        original = LOOKUP_HANDLERS["output"]
+        with stubbed_lookups():
+            self.assertIsNot(LOOKUP_HANDLERS["output"], original)
+        self.assertIs(LOOKUP_HANDLERS["output"], original)
+
+
+# Resolves and renders a VPC and eight Networks on threads, the way
+# `stacker build` does, in a fresh interpreter so that the troposphere and
+# awacs modules are first imported by those threads.
+THREADED_RENDER = r'''
+import threading
+
+from stacker.environment import parse_environment
+from stacker_blueprints.render.runner import load_stacks
+
+CONFIG = """
+namespace: test
+stacks:
+  - name: vpc
+    class_path: stacker_blueprints.vpc.VPC
+    variables:
+      AZCount: 2
+      CidrBlock: 10.0.0.0/16
+"""
+for i in range(8):
+    CONFIG += """
+  - name: network%d
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc::VpcId}
+      NatGatewayId: ${output vpc::NatGateway0Id}
+      AvailabilityZone: us-east-1a
+      CidrBlock: 10.0.%d.0/24
+""" % (i, i)
+
+errors = []
+
+
+def render(stack):
+    try:
+        stack.resolve(stack.context, None)
+        stack.blueprint.render_template()
+    except Exception as e:
+        errors.append("%s: %r" % (stack.name, e))
+
+
+threads = [threading.Thread(target=render, args=(stack,))
+           for stack in load_stacks(CONFIG, parse_environment(""))]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert not errors, errors
+'''
+
+
+class TestThreadedRender(unittest.TestCase):
+    def test_stacks_render_on_threads(self):
+        env = dict(os.environ)
+        env.pop(LAZY_IMPORTS_ENV, None)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        env["PYTHONPATH"] = os.pathsep.join(
+            [root] + [p for p in [env.get("PYTHONPATH")] if p])
+        process = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", THREADED_RENDER], env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.assertEqual(process.returncode, 0,
+                         process.stdout.decode("utf-8"))
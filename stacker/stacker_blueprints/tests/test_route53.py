@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from stacker.config import Config
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.cache import CACHE_DIR_ENV
+from stacker_blueprints.route53 import (
+    DNSRecords,
+    iter_csv_records,
+    iter_zone_file,
+    parse_ttl,
+)
+from stacker_blueprints.split import SKIP_UPLOAD_ENV
+
+ZONE = """\
+$ORIGIN example.com.
+$TTL 1h
+@       IN SOA ns1.example.com. admin.example.com. (
+            2024010101 ; serial
+            7200 3600 1209600 3600 )
+        IN NS  ns1.example.com.
+        IN MX  10 mail
+www     300 IN A 10.0.0.1
+        IN 300 A 10.0.0.2
+txt     IN TXT "v=spf1 include:example.net ~all" ; a comment
+alias   CNAME www
+"""
+
+
+class SmallDNSRecords(DNSRecords):
+    RESOURCE_LIMIT = 10
+
+
+class TestReaders(unittest.TestCase):
+    def test_parse_ttl(self):
+        self.assertEqual(parse_ttl("300"), 300)
+        self.assertEqual(parse_ttl("1h30m"), 5400)
+        self.assertEqual(parse_ttl("2D"), 172800)
+        with self.assertRaises(ValueError):
+            parse_ttl("1x")
+
+    def test_zone_file(self):
+        records = list(iter_zone_file(io.StringIO(ZONE)))
+        self.assertEqual(
+            [(r["Name"], r["Type"], r["TTL"], r["ResourceRecords"][0])
+             for r in records],
+            [("example.com.", "MX", "3600", "10 mail.example.com."),
+             ("www.example.com.", "A", "300", "10.0.0.1"),
+             ("www.example.com.", "A", "300", "10.0.0.2"),
+             ("txt.example.com.", "TXT", "3600",
+              '"v=spf1 include:example.net ~all"'),
+             ("alias.example.com.", "CNAME", "3600", "www.example.com.")])
+
+    def test_zone_file_needs_an_origin(self):
+        with self.assertRaises(ValueError):
+            list(iter_zone_file(io.StringIO("www IN A 10.0.0.1\n")))
+
+    def test_csv(self):
+        lines = io.StringIO("Name,Type,TTL,Value\n"
+                            "www,A,60,10.0.0.1\n"
+                            "api.example.com.,cname,,www.example.com.\n")
+        records = list(iter_csv_records(lines, "example.com."))
+        self.assertEqual(records[0], {
+            "Name": "www.example.com.", "Type": "A", "TTL": "60",
+            "ResourceRecords": ["10.0.0.1"]})
+        self.assertEqual(records[1]["Type"], "CNAME")
+        self.assertEqual(records[1]["TTL"], "300")
+
+
+class TestRecordSetsSource(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+        del os.environ[SKIP_UPLOAD_ENV]
+
+    def render(self, cls, name, content, **source):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as fd:
+            fd.write(content)
+        source["Path"] = path
+        blueprint = cls("records", Context(
+            config=Config({"namespace": "test", "stacker_bucket": "b"})))
+        blueprint.resolve_variables([
+            Variable("HostedZoneName", "example.com."),
+            Variable("RecordSetsSource", source),
+        ])
+        return blueprint, json.loads(blueprint.render_template()[1])
+
+    def test_zone_file(self):
+        _, template = self.render(DNSRecords, "example.com.zone", ZONE)
+        record_sets = dict(
+            (r["Properties"]["Name"], r["Properties"])
+            for r in template["Resources"].values()
+            if r["Type"] == "AWS::Route53::RecordSet")
+        self.assertEqual(sorted(record_sets), [
+            "alias.example.com.", "example.com.", "txt.example.com.",
+            "www.example.com."])
+        www = record_sets["www.example.com."]
+        self.assertEqual(www["ResourceRecords"], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(www["HostedZoneId"], {"Ref": "HostedZone"})
+
+    def test_conflicting_types(self):
+        with self.assertRaises(ValueError):
+            self.render(DNSRecords, "records.csv",
+                        "Name,Type,Value\nwww,A,10.0.0.1\n"
+                        "other,A,10.0.0.2\nwww,CNAME,other\n")
+
+    def test_conflicting_ttls(self):
+        with self.assertRaisesRegex(ValueError, "www.example.com. A .* TTLs"):
+            self.render(DNSRecords, "records.csv",
+                        "Name,Type,TTL,Value\nwww,A,60,10.0.0.1\n"
+                        "www,A,300,10.0.0.2\n")
+
+    def test_changed_file_is_not_served_from_cache(self):
+        cache_dir = os.path.join(self.tmp, "cache")
+        with mock.patch.dict(os.environ, {CACHE_DIR_ENV: cache_dir}):
+            for address in ("10.0.0.1", "10.0.0.2", "10.0.0.1"):
+                _, template = self.render(
+                    DNSRecords, "records.csv",
+                    "Name,Type,Value\nwww,A,%s\n" % address)
+                record_set = [r["Properties"] for r in
+                              template["Resources"].values()
+                              if r["Type"] == "AWS::Route53::RecordSet"][0]
+                self.assertEqual(record_set["ResourceRecords"], [address])
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_large_zone_is_split(self):
+        lines = ["Name,Type,Value\n"] + [
+            "host%d,A,10.0.%d.%d\n" % (i, i // 250, i % 250)
+            for i in range(25)]
+        blueprint, template = self.render(
+            SmallDNSRecords, "records", "".join(lines), Format="csv")
+        self.assertEqual(sorted(blueprint.nested_templates), [
+            "NestedStack", "NestedStack1eec6c7c"])
+        self.assertIn("HostedZoneId", template["Outputs"])
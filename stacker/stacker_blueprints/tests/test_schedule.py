@@ -0,0 +1,135 @@
+import unittest
+
+from stacker.environment import parse_environment
+
+from stacker_blueprints.render.runner import load_stacks
+from stacker_blueprints.schedule.graph import (
+    EXPLICIT,
+    REDUNDANT,
+    build_graph,
+    check_graph,
+    critical_path,
+    output_reads,
+    schedule,
+    waves,
+)
+
+CONFIG = """
+namespace: test
+stacks:
+  - name: vpc
+    class_path: stacker_blueprints.vpc.VPC2
+    variables:
+      VPC:
+        VPC:
+          CidrBlock: 10.128.0.0/16
+  - name: public
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc::VpcId}
+      InternetGatewayId: ${output vpc::InternetGatewayId}
+      AvailabilityZone: us-east-1a
+      CidrBlock: 10.128.0.0/23
+  - name: private
+    class_path: stacker_blueprints.network.Network
+    requires:
+      - vpc
+    variables:
+      VpcId: ${output vpc::VpcId}
+      NatGatewayId: ${output public::NatGatewayId}
+      AvailabilityZone: us-east-1a
+      CidrBlock: 10.128.16.0/21
+  - name: bucket
+    class_path: stacker_blueprints.s3.Buckets
+    required_by:
+      - private
+    variables:
+      Buckets: {}
+"""
+
+
+class TestBuildGraph(unittest.TestCase):
+    def setUp(self):
+        stacks = load_stacks(CONFIG, parse_environment(""), lookup_types=())
+        self.requires, self.outputs = build_graph(stacks)
+
+    def test_requires(self):
+        self.assertEqual(self.requires, {
+            "vpc": set(),
+            "public": set(["vpc"]),
+            "private": set(["vpc", "public", "bucket"]),
+            "bucket": set(),
+        })
+
+    def test_outputs(self):
+        self.assertEqual(self.outputs, {
+            ("public", "vpc"): ["InternetGatewayId", "VpcId"],
+            ("private", "vpc"): ["VpcId"],
+            ("private", "public"): ["NatGatewayId"],
+        })
+
+    def test_output_reads(self):
+        self.assertEqual(
+            output_reads({"A": ["x-${output vpc::VpcId}-${output b::C}"],
+                          "B": 1}),
+            set([("vpc", "VpcId"), ("b", "C")]))
+
+
+class TestSchedule(unittest.TestCase):
+    requires = {
+        "vpc": set(),
+        "dns": set(),
+        "public": set(["vpc"]),
+        "private": set(["vpc", "public"]),
+        "app": set(["private", "vpc", "dns"]),
+        "logs": set(["vpc"]),
+    }
+    outputs = {
+        ("public", "vpc"): ["VpcId"],
+        ("private", "public"): ["NatGatewayId"],
+        ("app", "private"): ["SubnetId"],
+        ("logs", "vpc"): ["VpcId"],
+    }
+
+    def test_waves(self):
+        self.assertEqual(waves(self.requires), [
+            ["dns", "vpc"], ["logs", "public"], ["private"], ["app"]])
+
+    def test_critical_path(self):
+        durations = dict((name, 1.0) for name in self.requires)
+        durations["dns"] = 2.5
+        path, slack = critical_path(self.requires, durations)
+        self.assertEqual(path, ["vpc", "public", "private", "app"])
+        self.assertEqual(slack["dns"], 0.5)
+        self.assertEqual(slack["logs"], 2.0)
+        self.assertEqual(slack["private"], 0.0)
+
+    def test_needless_edges(self):
+        plan = schedule(self.requires, self.outputs, {"dns": 5})
+        self.assertEqual(plan["makespan"], 6.0)
+        self.assertEqual(plan["needless_edges"], [
+            {"stack": "app", "requires": "dns", "kind": EXPLICIT,
+             "saved": 1.0},
+            {"stack": "app", "requires": "vpc", "kind": REDUNDANT,
+             "saved": 0.0},
+            {"stack": "private", "requires": "vpc", "kind": REDUNDANT,
+             "saved": 0.0},
+        ])
+
+    def test_schedule(self):
+        plan = schedule(self.requires, self.outputs)
+        self.assertEqual(plan["makespan"], 4.0)
+        self.assertEqual(plan["serial"], 6.0)
+        self.assertEqual(plan["max_parallel"], 2)
+        self.assertEqual(plan["stacks"]["app"]["start"], 3.0)
+        self.assertEqual(plan["stacks"]["app"]["outputs"],
+                         {"private": ["SubnetId"]})
+
+    def test_unknown_stack(self):
+        with self.assertRaisesRegex(ValueError, "unknown stack.*: db"):
+            check_graph({"app": set(["db"])})
+
+    def test_cycle(self):
+        with self.assertRaisesRegex(ValueError, "a -> b -> c -> a"):
+            check_graph({"a": set(["b"]), "b": set(["c"]),
+                         "c": set(["a"]), "d": set(["a"])})
@@ -0,0 +1,84 @@
+import unittest
+
+from stacker_blueprints.security_rules import compile_rules
+
+
+def rule(cidr, from_port, to_port, protocol="tcp", **attrs):
+    attrs.update(CidrIp=cidr, FromPort=from_port, ToPort=to_port,
+                 IpProtocol=protocol)
+    attrs.setdefault("GroupId", "sg-1")
+    return attrs
+
+
+class TestCompileRules(unittest.TestCase):
+    def test_adjacent_cidrs(self):
+        rules = dict(("Rule%d" % i, rule("10.0.%d.0/24" % i, 443, 443))
+                     for i in range(5))
+        self.assertEqual(compile_rules(rules), {
+            "Rule0": rule("10.0.0.0/22", 443, 443),
+            "Rule4": rule("10.0.4.0/24", 443, 443),
+        })
+
+    def test_contiguous_ports(self):
+        rules = {
+            "Http": rule("10.0.0.0/24", 80, 80),
+            "Alt": rule("10.0.0.0/24", 81, 90),
+            "Overlap": rule("10.0.0.0/24", 85, 95),
+            "Gap": rule("10.0.0.0/24", 100, 100),
+        }
+        self.assertEqual(compile_rules(rules), {
+            "Http": rule("10.0.0.0/24", 80, 95),
+            "Gap": rule("10.0.0.0/24", 100, 100),
+        })
+
+    def test_duplicates_and_covered_rules(self):
+        rules = {
+            "Wide": rule("10.0.0.0/16", 0, 65535),
+            "Host": rule("10.0.3.4/32", 22, 22),
+            "Again": rule("10.0.0.0/16", 0, 65535),
+        }
+        self.assertEqual(compile_rules(rules),
+                         {"Wide": rule("10.0.0.0/16", 0, 65535)})
+
+    def test_no_cross_product(self):
+        rules = {
+            "A": rule("10.0.0.0/24", 80, 80),
+            "B": rule("10.0.1.0/24", 81, 81),
+        }
+        self.assertEqual(compile_rules(rules), rules)
+
+    def test_kept_apart(self):
+        rules = {
+            "OtherGroup": rule("10.0.1.0/24", 80, 80, GroupId="sg-2"),
+            "Udp": rule("10.0.1.0/24", 80, 80, "udp"),
+            "Described": rule("10.0.1.0/24", 80, 80, Description="x"),
+            "Tcp": rule("10.0.0.0/24", 80, 80),
+            "Icmp": rule("10.0.0.0/24", 3, 4, "icmp"),
+            "Icmp2": rule("10.0.0.0/24", 5, 5, "icmp"),
+        }
+        self.assertEqual(compile_rules(rules), rules)
+
+    def test_unparsed_values(self):
+        lookup = {"Ref": "Cidr"}
+        rules = {
+            "A": rule(lookup, 80, 80),
+            "B": rule(lookup, 81, 82),
+            "C": rule(lookup, 81, 82),
+            "Source": {"SourceSecurityGroupId": "sg-2", "IpProtocol": "-1",
+                       "FromPort": -1, "ToPort": -1, "GroupId": "sg-1"},
+        }
+        self.assertEqual(compile_rules(rules), {
+            "A": rule(lookup, 80, 82),
+            "Source": rules["Source"],
+        })
+
+    def test_ipv6(self):
+        rules = {
+            "A": rule(None, 443, 443, CidrIpv6="2001:db8::/33"),
+            "B": rule(None, 443, 443, CidrIpv6="2001:db8:8000::/33"),
+        }
+        for attrs in rules.values():
+            del attrs["CidrIp"]
+        compiled = compile_rules(rules)
+        self.assertEqual(list(compiled), ["A"])
+        self.assertEqual(compiled["A"]["CidrIpv6"], "2001:db8::/32")
@@ -0,0 +1,71 @@
+import io
+import json
+import os
+import unittest
+
+from stacker.config import Config
+from stacker.context import Context
+from stacker.variables import Variable
+
+from stacker_blueprints.serialize import (
+    COMPACT_ENV,
+    dump,
+    dumps,
+    encoded_size,
+)
+from stacker_blueprints.sqs import Queues
+
+TEMPLATE = {
+    "Resources": {
+        "B": {"Type": "AWS::SQS::Queue", "Properties": {"DelaySeconds": 1}},
+        "A": {"Type": "AWS::SQS::Queue",
+              "Properties": {"QueueName": u"café"}},
+    },
+    "Outputs": {},
+    "AWSTemplateFormatVersion": "2010-09-09",
+    "Description": "Queues",
+}
+
+
+class TestSerialize(unittest.TestCase):
+    def test_compact_matches_json(self):
+        self.assertEqual(
+            dumps(TEMPLATE),
+            json.dumps(TEMPLATE, sort_keys=True, separators=(",", ":")))
+
+    def test_indented_matches_troposphere(self):
+        self.assertEqual(
+            dumps(TEMPLATE, 4),
+            json.dumps(TEMPLATE, indent=4, sort_keys=True,
+                       separators=(",", ": ")))
+
+    def test_dump(self):
+        fd = io.StringIO()
+        version, size = dump(TEMPLATE, fd)
+        self.assertEqual(fd.getvalue(), dumps(TEMPLATE))
+        self.assertEqual(size, encoded_size(TEMPLATE))
+        self.assertEqual(len(version), 8)
+
+
+class TestBlueprint(unittest.TestCase):
+    def blueprint(self):
+        blueprint = Queues("queues", Context(
+            config=Config({"namespace": "test"})))
+        blueprint.resolve_variables([Variable("Queues", {
+            "Q": {"DelaySeconds": 1}})])
+        return blueprint
+
+    def tearDown(self):
+        os.environ.pop(COMPACT_ENV, None)
+
+    def test_compact_env(self):
+        indented = self.blueprint().render_template()[1]
+        os.environ[COMPACT_ENV] = "1"
+        version, compact = self.blueprint().render_template()
+        self.assertLess(len(compact), len(indented))
+        self.assertEqual(json.loads(compact), json.loads(indented))
+
+        fd = io.StringIO()
+        self.assertEqual(self.blueprint().write_template(fd),
+                         (version, len(compact)))
+        self.assertEqual(fd.getvalue(), compact)
@@ -0,0 +1,49 @@
+import unittest
+
+from stacker_blueprints.tests.snapshots import (
+    ABSTRACT_BLUEPRINTS,
+    blueprint_classes,
+    canonicalize,
+    check_all,
+    config_paths,
+    differences,
+    load_config,
+)
+
+
+class TestSnapshots(unittest.TestCase):
+    def test_snapshots(self):
+        for name, class_path, found in check_all():
+            with self.subTest(stack=name, blueprint=class_path):
+                self.assertEqual(found, [], "\n".join(found))
+
+    def test_every_blueprint_has_a_fixture(self):
+        covered = set(
+            stack["class_path"]
+            for path in config_paths()
+            for stack in load_config(path)["stacks"])
+        missing = blueprint_classes() - covered - set(ABSTRACT_BLUEPRINTS)
+        self.assertEqual(missing, set())
+
+
+class TestCanonicalize(unittest.TestCase):
+    def test_get_att(self):
+        self.assertEqual(canonicalize({"Fn::GetAtt": "Role.Arn"}),
+                         canonicalize({"Fn::GetAtt": ["Role", "Arn"]}))
+
+    def test_depends_on(self):
+        self.assertEqual(canonicalize({"DependsOn": "A"}),
+                         {"DependsOn": ["A"]})
+        self.assertEqual(canonicalize({"DependsOn": ["B", "A"]}),
+                         {"DependsOn": ["A", "B"]})
+
+
+class TestDifferences(unittest.TestCase):
+    def test_paths(self):
+        expected = {"Resources": {"A": {"Type": "X"}, "B": {}}}
+        actual = {"Resources": {"A": {"Type": "Y"}, "C": {}}}
+        self.assertEqual(list(differences(expected, actual)), [
+            '$.Resources.A.Type: expected "X", got "Y"',
+            "$.Resources.B: missing",
+            "$.Resources.C: unexpected {}",
+        ])
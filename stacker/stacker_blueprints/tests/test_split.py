@@ -0,0 +1,245 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+from stacker.config import Config
+from stacker.context import Context
+from stacker.variables import Variable
+from troposphere import sqs
+
+from stacker_blueprints import split
+from stacker_blueprints.split import (
+    SKIP_UPLOAD_ENV,
+    UnboundedTemplate,
+    partition,
+    split_template,
+)
+from stacker_blueprints.sqs import Queues
+
+
+def queue(**properties):
+    return {"Type": "AWS::SQS::Queue", "Properties": properties}
+
+
+def template_url(name, child):
+    return "%s.json" % name
+
+
+def owners(parent, children):
+    """The stack of every resource of a split template, None for the parent.
+    """
+    owner = dict((logical_id, None) for logical_id, resource in
+                 parent["Resources"].items()
+                 if resource["Type"] != "AWS::CloudFormation::Stack")
+    for name, child in children.items():
+        owner.update((logical_id, name) for logical_id in child["Resources"])
+    return owner
+
+
+class SmallQueues(Queues):
+    RESOURCE_LIMIT = 2
+
+
+class TestPartition(unittest.TestCase):
+    def test_max_resources(self):
+        resources = dict(("Q%d" % i, queue()) for i in range(5))
+        self.assertEqual(partition(resources, max_resources=2),
+                         [["Q0", "Q1"], ["Q2", "Q3"], ["Q4"]])
+
+    def test_max_bytes(self):
+        resources = {"A": queue(QueueName="a" * 100),
+                     "B": queue(QueueName="b" * 100)}
+        self.assertEqual(partition(resources, max_bytes=300),
+                         [["A"], ["B"]])
+
+    def test_anchors(self):
+        # Q137 and Q222 are anchors.
+        resources = dict(("Q%d" % i, queue()) for i in range(100, 300))
+        groups = partition(resources)
+        self.assertEqual([group[0] for group in groups],
+                         ["Q100", "Q137", "Q222"])
+
+
+class TestSplitTemplate(unittest.TestCase):
+    def setUp(self):
+        self.template = {
+            "Parameters": {"Delay": {"Type": "Number"}},
+            "Resources": {
+                "Dead": queue(
+                    DelaySeconds={"Ref": "Delay"},
+                    QueueName={"Fn::Sub": "${Endpoint}-dead"}),
+                "Live": queue(RedrivePolicy={
+                    "deadLetterTargetArn": {"Fn::GetAtt": ["Dead", "Arn"]},
+                    "maxReceiveCount": 3,
+                }),
+                "Other": dict(queue(QueueName={"Fn::Sub": "${Live}-other"}),
+                              DependsOn=["Live"]),
+                "Endpoint": {"Type": "AWS::EC2::VPCEndpoint",
+                             "Properties": {"VpcId": "vpc-1"}},
+            },
+            "Outputs": {
+                "LiveUrl": {"Value": {"Ref": "Live"}},
+                "OtherUrl": {"Value": {"Ref": "Other"}},
+                "DnsEntries": {"Value": {"Fn::Join": [",", {
+                    "Fn::GetAtt": ["Endpoint", "DnsEntries"]}]}},
+            },
+        }
+
+    def test_cross_stack_references(self):
+        parent, children = split_template(self.template, template_url,
+                                          max_resources=3)
+        self.assertEqual(sorted(children), ["NestedStack"])
+        self.assertEqual(sorted(parent["Resources"]),
+                         ["Dead", "Live", "NestedStack"])
+        self.assertEqual(sorted(children["NestedStack"]["Resources"]),
+                         ["Endpoint", "Other"])
+
+        dead = parent["Resources"]["Dead"]["Properties"]
+        self.assertEqual(dead["DelaySeconds"], {"Ref": "Delay"})
+        self.assertEqual(dead["QueueName"], {
+            "Fn::Sub": "${NestedStack.Outputs.Endpoint}-dead"})
+        self.assertEqual(parent["Resources"]["Live"], self.template[
+            "Resources"]["Live"])
+
+        stack = parent["Resources"]["NestedStack"]
+        self.assertEqual(stack["DependsOn"], ["Live"])
+        self.assertEqual(stack["Properties"]["Parameters"],
+                         {"Live": {"Ref": "Live"}})
+        child = children["NestedStack"]
+        self.assertEqual(child["Parameters"], {"Live": {"Type": "String"}})
+        other = child["Resources"]["Other"]
+        self.assertNotIn("DependsOn", other)
+        self.assertEqual(other["Properties"]["QueueName"],
+                         {"Fn::Sub": "${Live}-other"})
+
+        self.assertEqual(parent["Parameters"], self.template["Parameters"])
+        self.assertEqual(parent["Outputs"]["LiveUrl"]["Value"],
+                         {"Ref": "Live"})
+        self.assertEqual(parent["Outputs"]["OtherUrl"]["Value"], {
+            "Fn::GetAtt": ["NestedStack", "Outputs.Other"]})
+
+    def test_list_attributes(self):
+        parent, children = split_template(self.template, template_url,
+                                          max_resources=3)
+        self.assertEqual(
+            children["NestedStack"]["Outputs"]["EndpointDnsEntries"],
+            {"Value": {"Fn::Join": [",", {"Fn::GetAtt": ["Endpoint",
+                                                         "DnsEntries"]}]}})
+        self.assertEqual(parent["Outputs"]["DnsEntries"]["Value"], {
+            "Fn::Join": [",", {"Fn::Split": [",", {"Fn::GetAtt": [
+                "NestedStack", "Outputs.EndpointDnsEntries"]}]}]})
+
+    def test_cycle(self):
+        self.template["Resources"]["Dead"]["DependsOn"] = "Other"
+        with self.assertRaises(ValueError):
+            split_template(self.template, template_url, max_resources=3)
+
+    def split_queues(self, names):
+        template = {"Resources": dict((name, queue()) for name in names)}
+        parent, children = split_template(template, template_url,
+                                          max_resources=100)
+        return owners(parent, children)
+
+    def test_stable_boundaries(self):
+        names = ["Q%d" % i for i in range(300)]
+        before = self.split_queues(names)
+        # Q137 and Q222 are anchors.
+        self.assertEqual(set(before.values()), set([
+            None, "NestedStack", split.nested_stack_name(["Q137"]),
+            split.nested_stack_name(["Q222"])]))
+
+        # Added to a child: nothing else moves.
+        after = self.split_queues(names[:120] + ["Added"] + names[120:])
+        self.assertEqual(after.pop("Added"), before["Q120"])
+        self.assertEqual(after, before)
+
+        # Added to the parent: its last resource spills into the first child.
+        after = self.split_queues(names[:10] + ["Added"] + names[10:])
+        self.assertIsNone(after.pop("Added"))
+        moved = [name for name in names if after[name] != before[name]]
+        self.assertEqual(moved, ["Q96"])
+        self.assertEqual(after["Q96"], "NestedStack")
+
+
+class TestBlueprint(unittest.TestCase):
+    def setUp(self):
+        os.environ[SKIP_UPLOAD_ENV] = "1"
+
+    def tearDown(self):
+        del os.environ[SKIP_UPLOAD_ENV]
+
+    def blueprint(self, cls, count):
+        blueprint = cls("queues", Context(
+            config=Config({"namespace": "test", "stacker_bucket": "b"})))
+        blueprint.resolve_variables([Variable("Queues", dict(
+            ("Q%d" % i, {"DelaySeconds": i}) for i in range(count)))])
+        return blueprint
+
+    def test_unbounded_template(self):
+        template = UnboundedTemplate()
+        for i in range(201):
+            template.add_resource(sqs.Queue("Q%d" % i))
+        self.assertEqual(len(template.resources), 201)
+
+    def test_under_the_limit(self):
+        blueprint = self.blueprint(SmallQueues, 2)
+        blueprint.render_template()
+        self.assertEqual(blueprint.nested_templates, {})
+
+    def test_split(self):
+        blueprint = self.blueprint(SmallQueues, 3)
+        _, rendered = blueprint.render_template()
+        parent = json.loads(rendered)
+        self.assertEqual(sorted(parent["Resources"]), ["NestedStack", "Q0"])
+        self.assertEqual(sorted(blueprint.nested_templates), ["NestedStack"])
+        self.assertTrue(parent["Resources"]["NestedStack"]["Properties"][
+            "TemplateURL"].startswith(
+                "https://b.s3.amazonaws.com/stack_templates/test-queues/"
+                "queues-NestedStack-"))
+        self.assertEqual(blueprint.get_output_definitions()["Q2Url"], {
+            "Value": {"Fn::GetAtt": ["NestedStack", "Outputs.Q2"]}})
+
+    def test_no_bucket(self):
+        blueprint = SmallQueues("queues", Context(
+            config=Config({"namespace": "test", "stacker_bucket": ""})))
+        blueprint.resolve_variables([Variable("Queues", dict(
+            ("Q%d" % i, {"DelaySeconds": i}) for i in range(3)))])
+        properties = json.loads(blueprint.rendered)["Resources"][
+            "NestedStack"]["Properties"]
+        self.assertEqual(properties["TemplateURL"], "queues-NestedStack.json")
+        with mock.patch.dict(os.environ):
+            del os.environ[SKIP_UPLOAD_ENV]
+            with self.assertRaisesRegex(ValueError, "stacker_bucket"):
+                blueprint.upload_nested_templates()
+
+    def test_render_never_uploads(self):
+        blueprint = self.blueprint(SmallQueues, 3)
+        with mock.patch.object(split, "upload_nested_templates") as upload:
+            blueprint.rendered
+            self.assertFalse(blueprint.requires_change_set)
+            upload.assert_not_called()
+            blueprint.upload_nested_templates("s3")
+            upload.assert_called_once_with(blueprint, "s3")
+
+    def test_upload(self):
+        blueprint = self.blueprint(SmallQueues, 3)
+        s3 = mock.Mock()
+        s3.head_object.side_effect = ClientError(
+            {"Error": {"Code": "404"}}, "HeadObject")
+        with mock.patch.dict(os.environ):
+            del os.environ[SKIP_UPLOAD_ENV]
+            blueprint.upload_nested_templates(s3)
+        rendered = blueprint.nested_templates["NestedStack"]
+        s3.put_object.assert_called_once_with(
+            Bucket="b",
+            Key=split.nested_template_key(blueprint, "NestedStack", rendered),
+            Body=rendered, ServerSideEncryption="AES256",
+            ACL="bucket-owner-full-control")
+
+        s3 = mock.Mock()
+        with mock.patch.dict(os.environ):
+            del os.environ[SKIP_UPLOAD_ENV]
+            blueprint.upload_nested_templates(s3)
+        s3.put_object.assert_not_called()
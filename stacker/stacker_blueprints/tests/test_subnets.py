@@ -0,0 +1,124 @@
+import unittest
+
+from stacker.environment import parse_environment
+
+from stacker_blueprints.render.runner import load_stacks
+from stacker_blueprints.subnets import (
+    allocate,
+    allocate_subnets,
+    check_subnets,
+    config_subnets,
+    find_overlaps,
+    ipv6_subnet_index,
+    network_cidr_block,
+)
+
+CONFIG = """
+namespace: test
+stacks:
+  - name: vpc
+    class_path: stacker_blueprints.vpc.VPC
+    variables:
+      AZCount: 3
+      CidrBlock: 10.0.0.0/16
+  - name: publicA
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc2::VpcId}
+      InternetGatewayId: ${output vpc2::InternetGatewayId}
+      AvailabilityZone: us-east-1a
+      VpcCidrBlock: 10.1.0.0/16
+      AZIndex: 0
+  - name: privateA
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc2::VpcId}
+      AvailabilityZone: us-east-1a
+      VpcCidrBlock: 10.1.0.0/16
+      AZIndex: 0
+  - name: legacy
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc2::VpcId}
+      AvailabilityZone: us-east-1b
+      CidrBlock: 10.1.16.0/20
+  - name: broken
+    class_path: stacker_blueprints.network.Network
+    variables:
+      VpcId: ${output vpc2::VpcId}
+      AvailabilityZone: us-east-1b
+"""
+
+
+class TestAllocate(unittest.TestCase):
+    def test_aligned(self):
+        self.assertEqual(allocate("10.0.0.0/16", [24, 20, 24]),
+                         ["10.0.0.0/24", "10.0.16.0/20", "10.0.32.0/24"])
+
+    def test_too_small(self):
+        with self.assertRaisesRegex(ValueError, "too small"):
+            allocate("10.0.0.0/20", [21, 21, 21])
+        with self.assertRaisesRegex(ValueError, "/8 subnet"):
+            allocate("10.0.0.0/16", [8])
+
+    def test_layout(self):
+        private, public = allocate_subnets("10.128.0.0/16", 2)
+        self.assertEqual(private, ["10.128.0.0/19", "10.128.32.0/19"])
+        self.assertEqual(public, ["10.128.192.0/24", "10.128.193.0/24"])
+
+    def test_growing_keeps_subnets(self):
+        for count in range(1, 6):
+            smaller = allocate_subnets("10.0.0.0/16", count)
+            larger = allocate_subnets("10.0.0.0/16", count + 1)
+            self.assertEqual(larger[0][:count], smaller[0])
+            self.assertEqual(larger[1][:count], smaller[1])
+
+    def test_more_zones_than_reserved(self):
+        private, public = allocate_subnets("10.0.0.0/16", 8, 20, 24)
+        self.assertEqual(len(private), 8)
+        self.assertEqual(public[0], "10.0.128.0/24")
+
+    def test_network_cidr_block(self):
+        self.assertEqual(
+            network_cidr_block("10.0.0.0/16", 1, "private"), "10.0.32.0/19")
+        self.assertEqual(
+            network_cidr_block("10.0.0.0/16", 1, "public"), "10.0.193.0/24")
+
+    def test_ipv6_subnet_index(self):
+        self.assertEqual(ipv6_subnet_index(2, "private"), 2)
+        self.assertEqual(ipv6_subnet_index(2, "public"), 8)
+        self.assertEqual(ipv6_subnet_index(2, "public", az_count=8), 10)
+
+
+class TestOverlaps(unittest.TestCase):
+    def test_find_overlaps(self):
+        self.assertEqual(find_overlaps([
+            ("a", "10.0.0.0/16"),
+            ("b", "10.0.1.0/24"),
+            ("c", "10.1.0.0/24"),
+            ("d", "10.0.200.0/24"),
+        ]), [("a", "b"), ("a", "d")])
+
+    def test_check_subnets(self):
+        with self.assertRaisesRegex(ValueError, "a and b"):
+            check_subnets([("a", "10.0.0.0/23"), ("b", "10.0.1.0/24")])
+        with self.assertRaisesRegex(ValueError, "not in 10.0.0.0/16"):
+            check_subnets([("a", "10.1.0.0/24")], "10.0.0.0/16")
+        check_subnets([("a", "10.0.0.0/24"), ("b", "10.0.1.0/24")],
+                      "10.0.0.0/16")
+
+    def test_config_subnets(self):
+        stacks = load_stacks(CONFIG, parse_environment(""))
+        by_vpc, blocks, errors = config_subnets(stacks)
+        self.assertEqual(len(by_vpc["vpc"]), 6)
+        self.assertEqual(sorted(by_vpc["stub-output-vpc2-VpcId"]), [
+            ("legacy", "10.1.16.0/20"),
+            ("privateA", "10.1.0.0/19"),
+            ("publicA", "10.1.192.0/24"),
+        ])
+        self.assertEqual(blocks, {"vpc": "10.0.0.0/16",
+                                  "stub-output-vpc2-VpcId": "10.1.0.0/16"})
+        self.assertEqual(len(errors), 1)
+        self.assertIn("broken", errors[0])
+        with self.assertRaisesRegex(ValueError, "privateA and legacy"):
+            check_subnets(by_vpc["stub-output-vpc2-VpcId"])
@@ -9,7 +9,19 @@ from troposphere import (
 )
 from troposphere import ec2, route53
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint, variable_property
+from stacker_blueprints.endpoints import (
+    add_interface_endpoint_security_group,
+    add_interface_endpoints,
+)
+from stacker_blueprints.subnets import (
+    DEFAULT_PRIVATE_PREFIX,
+    DEFAULT_PUBLIC_PREFIX,
+    allocate_subnets,
+    check_subnets,
+    ipv6_cidr_block,
+    ipv6_subnet_index,
+)
 from stacker.blueprints.variables.types import TroposphereType
 
 NAT_INSTANCE_NAME = 'NatInstance%s'
@@ -23,6 +35,9 @@ NAT_SG = "NATSG"
 
 NOVALUE = Ref("AWS::NoValue")
 
+IPV6_BLOCK = "Ipv6CidrBlock"
+EGRESS_GATEWAY = "EgressOnlyInternetGateway"
+
 
 class VPC(Blueprint):
     VARIABLES = {
@@ -33,11 +48,33 @@ class VPC(Blueprint):
         "PrivateSubnets": {
             "type": list,
             "description": "List of subnets to use for non-public hosts. "
-                           "NOTE: Must have as many subnets as AZCount"},
+                           "NOTE: Must have as many subnets as AZCount. "
+                           "If empty, they are allocated from CidrBlock.",
+            "default": []},
         "PublicSubnets": {
             "type": list,
             "description": "List of subnets to use for public hosts. NOTE: "
-                           "Must have as many subnets as AZCount"},
+                           "Must have as many subnets as AZCount. If empty, "
+                           "they are allocated from CidrBlock.",
+            "default": []},
+        "PrivateSubnetPrefix": {
+            "type": int,
+            "description": "The prefix length of the private subnets "
+                           "allocated from CidrBlock.",
+            "default": DEFAULT_PRIVATE_PREFIX},
+        "PublicSubnetPrefix": {
+            "type": int,
+            "description": "The prefix length of the public subnets "
+                           "allocated from CidrBlock.",
+            "default": DEFAULT_PUBLIC_PREFIX},
+        "EnableIpv6": {
+            "type": bool,
+            "description": "Add an Amazon provided IPv6 block to the VPC, "
+                           "a /64 of it to every subnet, and IPv6 default "
+                           "routes: through the internet gateway for public "
+                           "subnets, and through an egress only internet "
+                           "gateway, rather than the NAT, for private ones.",
+            "default": False},
         "BaseDomain": {
             "type": str,
             "default": "",
@@ -78,9 +115,73 @@ class VPC(Blueprint):
             "description": "Create an DynamoDB endpoint gateway for vpc "
                            "access.",
             "default": False
-        }
+        },
+        "InterfaceEndpoints": {
+            "type": list,
+            "description": "Services to create interface endpoints for, "
+                           "with private DNS, in every private subnet, "
+                           "e.g. ecr.api, ecr.dkr, logs, sqs, "
+                           "kinesis-streams or secretsmanager.",
+            "default": [],
+        },
     }
 
+    def get_subnet_cidrs(self):
+        """Returns the CIDR blocks of the subnets, by network type.
+
+        The subnets not given in PrivateSubnets and PublicSubnets are
+        allocated from CidrBlock, see :mod:`stacker_blueprints.subnets`.
+        """
+        return self.subnet_cidrs
+
+    @variable_property
+    def subnet_cidrs(self):
+        variables = self.get_variables()
+        az_count = variables["AZCount"]
+        cidrs = {
+            "private": variables["PrivateSubnets"],
+            "public": variables["PublicSubnets"],
+        }
+        if not all(cidrs.values()):
+            private, public = allocate_subnets(
+                variables["CidrBlock"], az_count,
+                variables["PrivateSubnetPrefix"],
+                variables["PublicSubnetPrefix"])
+            cidrs["private"] = cidrs["private"] or private
+            cidrs["public"] = cidrs["public"] or public
+        for net_type, subnets in cidrs.items():
+            if len(subnets) < az_count:
+                raise ValueError("%d %s subnets given for an AZCount of "
+                                 "%d." % (len(subnets), net_type, az_count))
+        check_subnets(
+            [("%s subnet %s" % (net_type, cidr), cidr)
+             for net_type, subnets in sorted(cidrs.items())
+             for cidr in subnets[:az_count]],
+            variables["CidrBlock"])
+        return cidrs
+
+    @variable_property
+    def use_nat_gateway(self):
+        return self.get_variables()["UseNatGateway"]
+
+    @variable_property
+    def nat_instance_kwargs(self):
+        """The properties every NAT instance shares, built once for all the
+        zones."""
+        variables = self.get_variables()
+        return {
+            "ImageId": FindInMap(
+                'AmiMap',
+                Ref("AWS::Region"),
+                Ref("ImageName")
+            ),
+            "SecurityGroupIds": [Ref(DEFAULT_SG), Ref(NAT_SG)],
+            "InstanceType": variables["InstanceType"],
+            "SourceDestCheck": False,
+            "KeyName": variables["SshKeyName"],
+            "DependsOn": GW_ATTACH,
+        }
+
     def create_vpc(self):
         t = self.template
         t.add_resource(ec2.VPC(
@@ -91,6 +192,21 @@ class VPC(Blueprint):
         # Just about everything needs this, so storing it on the object
         t.add_output(Output("VpcId", Value=VPC_ID))
 
+        if self.get_variables()["EnableIpv6"]:
+            t.add_resource(
+                ec2.VPCCidrBlock(
+                    IPV6_BLOCK,
+                    AmazonProvidedIpv6CidrBlock=True,
+                    VpcId=VPC_ID,
+                )
+            )
+            t.add_output(
+                Output(
+                    "Ipv6CidrBlock",
+                    Value=Select(0, GetAtt(VPC_NAME, "Ipv6CidrBlocks"))
+                )
+            )
+
     def create_internal_zone(self):
         t = self.template
         variables = self.get_variables()
@@ -192,6 +308,20 @@ class VPC(Blueprint):
             )
         )
 
+        if self.get_variables()["EnableIpv6"]:
+            t.add_resource(
+                ec2.EgressOnlyInternetGateway(
+                    EGRESS_GATEWAY,
+                    VpcId=VPC_ID,
+                )
+            )
+            t.add_output(
+                Output(
+                    "EgressOnlyInternetGatewayId",
+                    Value=Ref(EGRESS_GATEWAY)
+                )
+            )
+
     def create_network(self):
         t = self.template
         variables = self.get_variables()
@@ -200,6 +330,9 @@ class VPC(Blueprint):
                                       VpcId=VPC_ID))
 
         self.create_nat_security_groups()
+        cidrs = self.get_subnet_cidrs()
+        ipv6 = variables["EnableIpv6"]
+        vpc_ipv6_block = Select(0, GetAtt(VPC_NAME, "Ipv6CidrBlocks"))
         subnets = {'public': [], 'private': []}
         net_types = subnets.keys()
         route_table_ids = []
@@ -212,16 +345,29 @@ class VPC(Blueprint):
                 name_prefix = net_type.capitalize()
                 subnet_name = "%sSubnet%s" % (name_prefix, name_suffix)
                 subnets[net_type].append(subnet_name)
-                t.add_resource(
+                subnet = t.add_resource(
                     ec2.Subnet(
                         subnet_name,
                         AvailabilityZone=az,
                         VpcId=VPC_ID,
                         DependsOn=GW_ATTACH,
-                        CidrBlock=variables.get("%sSubnets" % name_prefix)[i],
+                        CidrBlock=cidrs[net_type][i],
                         Tags=Tags(type=net_type)
                     )
                 )
+                if ipv6:
+                    # The VPC only lists its IPv6 block once associated.
+                    subnet.DependsOn = [GW_ATTACH, IPV6_BLOCK]
+                    subnet.Ipv6CidrBlock = ipv6_cidr_block(
+                        vpc_ipv6_block,
+                        ipv6_subnet_index(i, net_type, variables["AZCount"]))
+                    subnet.AssignIpv6AddressOnCreation = True
+                    t.add_output(
+                        Output(
+                            "%sIpv6CidrBlock" % subnet_name,
+                            Value=subnet.Ipv6CidrBlock
+                        )
+                    )
 
                 route_table_name = "%sRouteTable%s" % (name_prefix,
                                                        name_suffix)
@@ -259,6 +405,15 @@ class VPC(Blueprint):
                             GatewayId=Ref(GATEWAY)
                         )
                     )
+                    if ipv6:
+                        t.add_resource(
+                            ec2.Route(
+                                "%sIpv6Route%s" % (name_prefix, name_suffix),
+                                RouteTableId=Ref(route_table_name),
+                                DestinationIpv6CidrBlock="::/0",
+                                GatewayId=Ref(GATEWAY)
+                            )
+                        )
                     self.create_nat_instance(i, subnet_name)
                 else:
                     # Private subnets are where actual instances will live
@@ -268,13 +423,25 @@ class VPC(Blueprint):
                         RouteTableId=Ref(route_table_name),
                         DestinationCidrBlock='0.0.0.0/0',
                     )
-                    if variables["UseNatGateway"]:
+                    if self.use_nat_gateway:
                         route.NatGatewayId = Ref(
                                 NAT_GATEWAY_NAME % name_suffix)
                     else:
                         route.InstanceId = Ref(
                                 NAT_INSTANCE_NAME % name_suffix)
                     t.add_resource(route)
+                    if ipv6:
+                        # IPv6 traffic leaves through the egress only
+                        # gateway, bypassing the NAT.
+                        t.add_resource(
+                            ec2.Route(
+                                "%sIpv6Route%s" % (name_prefix, name_suffix),
+                                RouteTableId=Ref(route_table_name),
+                                DestinationIpv6CidrBlock="::/0",
+                                EgressOnlyInternetGatewayId=Ref(
+                                    EGRESS_GATEWAY)
+                            )
+                        )
 
         for net_type in net_types:
             t.add_output(
@@ -309,6 +476,7 @@ class VPC(Blueprint):
 
         self.create_s3_endpoint(route_table_ids)
         self.create_dynamo_endpoint(route_table_ids)
+        self.create_interface_endpoints(subnets["private"])
 
     def create_nat_security_groups(self):
         t = self.template
@@ -337,11 +505,10 @@ class VPC(Blueprint):
 
     def create_nat_instance(self, zone_id, subnet_name):
         t = self.template
-        variables = self.get_variables()
         suffix = zone_id
         eip_name = "NATExternalIp%s" % suffix
 
-        if variables["UseNatGateway"]:
+        if self.use_nat_gateway:
             gateway_name = NAT_GATEWAY_NAME % suffix
             t.add_resource(
                 ec2.NatGateway(
@@ -362,23 +529,13 @@ class VPC(Blueprint):
             # to the NAT Gateway in that resource above
             eip_instance_id = Ref("AWS::NoValue")
         else:
-            image_id = FindInMap(
-                'AmiMap',
-                Ref("AWS::Region"),
-                Ref("ImageName")
-            )
             instance_name = NAT_INSTANCE_NAME % suffix
             t.add_resource(
                 ec2.Instance(
                     instance_name,
-                    ImageId=image_id,
-                    SecurityGroupIds=[Ref(DEFAULT_SG), Ref(NAT_SG)],
                     SubnetId=Ref(subnet_name),
-                    InstanceType=variables["InstanceType"],
-                    SourceDestCheck=False,
-                    KeyName=variables["SshKeyName"],
                     Tags=[ec2.Tag('Name', 'nat-gw%s' % suffix)],
-                    DependsOn=GW_ATTACH
+                    **self.nat_instance_kwargs
                 )
             )
             t.add_output(
@@ -433,6 +590,16 @@ class VPC(Blueprint):
                 )
             )
 
+    def create_interface_endpoints(self, subnet_names):
+        t = self.template
+        variables = self.get_variables()
+        if variables["InterfaceEndpoints"]:
+            group = add_interface_endpoint_security_group(
+                t, VPC_ID, variables["CidrBlock"])
+            add_interface_endpoints(
+                t, variables["InterfaceEndpoints"], VPC_ID,
+                [Ref(sn) for sn in subnet_names], [group.Ref()])
+
     def create_template(self):
         self.create_vpc()
         self.create_internal_zone()
@@ -455,6 +622,23 @@ class VPC2(Blueprint):
                            "set to this VPC.",
             "default": None,
         },
+        "CreateInterfaceEndpointSecurityGroup": {
+            "type": bool,
+            "description": "Create a security group for the interface "
+                           "endpoints of the VPC, allowing HTTPS from the "
+                           "VPC's CidrBlock, to pass to the "
+                           "InterfaceEndpointSecurityGroupId of Network "
+                           "stacks.",
+            "default": False,
+        },
+        "EnableIpv6": {
+            "type": bool,
+            "description": "Add an Amazon provided IPv6 block to the VPC, "
+                           "and an egress only internet gateway for the "
+                           "EgressOnlyInternetGatewayId of private Network "
+                           "stacks.",
+            "default": False,
+        },
     }
 
     def create_vpc(self):
@@ -572,8 +756,52 @@ class VPC2(Blueprint):
             )
         )
 
+    def create_ipv6(self):
+        t = self.template
+        variables = self.get_variables()
+
+        if not variables["EnableIpv6"]:
+            return
+
+        self.ipv6_block = t.add_resource(
+            ec2.VPCCidrBlock(
+                IPV6_BLOCK,
+                AmazonProvidedIpv6CidrBlock=True,
+                VpcId=self.vpc.Ref(),
+            )
+        )
+
+        t.add_output(
+            Output(
+                "Ipv6CidrBlock",
+                Value=Select(0, self.vpc.GetAtt("Ipv6CidrBlocks")),
+            )
+        )
+
+        self.egress_gateway = t.add_resource(
+            ec2.EgressOnlyInternetGateway(
+                EGRESS_GATEWAY,
+                VpcId=self.vpc.Ref(),
+            )
+        )
+
+        t.add_output(
+            Output(
+                "EgressOnlyInternetGatewayId",
+                Value=self.egress_gateway.Ref(),
+            )
+        )
+
+    def create_interface_endpoint_security_group(self):
+        variables = self.get_variables()
+        if variables["CreateInterfaceEndpointSecurityGroup"]:
+            add_interface_endpoint_security_group(
+                self.template, self.vpc.Ref(), self.vpc.GetAtt("CidrBlock"))
+
     def create_template(self):
         self.create_vpc()
         self.create_internet_gateway()
         self.create_internal_zone()
         self.create_dhcp_options()
+        self.create_ipv6()
+        self.create_interface_endpoint_security_group()
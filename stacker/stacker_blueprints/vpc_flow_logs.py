@@ -10,7 +10,7 @@ from troposphere import (
 
 from troposphere.iam import Policy as TropoPolicy
 
-from stacker.blueprints.base import Blueprint
+from stacker_blueprints.base import Blueprint
 
 from awacs.aws import (
     Statement,